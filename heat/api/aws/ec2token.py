@@ -12,18 +12,24 @@
 #    under the License.
 
 import hashlib
+import hmac
 
+from keystoneclient.contrib.ec2 import utils as ec2_utils
 from oslo_config import cfg
 from oslo_log import log as logging
 from oslo_serialization import jsonutils as json
+from oslo_utils import encodeutils
 from oslo_utils import importutils
+from oslo_utils import timeutils
 import requests
 import webob
 
 from heat.api.aws import exception
+from heat.common import cache
 from heat.common.i18n import _
 from heat.common.i18n import _LE
 from heat.common.i18n import _LI
+from heat.common.i18n import _LW
 from heat.common import wsgi
 
 LOG = logging.getLogger(__name__)
@@ -54,9 +60,39 @@ opts = [
                 default=False,
                 help=_('If set, then the server\'s certificate will not '
                        'be verified.')),
+    cfg.BoolOpt('cache_credentials',
+                default=False,
+                help=_('Verify request signatures locally using cached EC2 '
+                       'credential secrets and tokens, so that keystone is '
+                       'only consulted the first time an access key is '
+                       'seen, when a cached entry expires or when a '
+                       'signature does not match the cached secret.')),
+    cfg.IntOpt('credentials_cache_ttl',
+               default=300,
+               help=_('Seconds for which a cached EC2 credential secret is '
+                      'used before it is fetched from keystone again. This '
+                      'bounds how long a deleted credential is accepted '
+                      'for.')),
+    cfg.IntOpt('credentials_cache_size',
+               default=1000,
+               help=_('Maximum number of EC2 credentials cached.')),
 ]
 cfg.CONF.register_opts(opts, group='ec2authtoken')
 
+# Cached tokens are not used within this many seconds of their expiry
+TOKEN_EXPIRY_WINDOW = 60
+
+_credentials_cache = None
+
+
+def _credentials():
+    global _credentials_cache
+    if _credentials_cache is None:
+        _credentials_cache = cache.LRUCache(
+            cfg.CONF.ec2authtoken.credentials_cache_size,
+            ttl=cfg.CONF.ec2authtoken.credentials_cache_ttl)
+    return _credentials_cache
+
 
 class EC2Token(wsgi.Middleware):
     """Authenticate an EC2 request with keystone and convert to token."""
@@ -207,6 +243,16 @@ class EC2Token(wsgi.Middleware):
                                     'headers': req.headers,
                                     'body_hash': body_hash
                                     }}
+
+        cache_credentials = self._conf_get('cache_credentials')
+        if cache_credentials:
+            auth = self._cached_auth(auth_uri, creds['ec2Credentials'])
+            if auth is not None:
+                LOG.info(_LI("AWS authentication successful (cached)."))
+                self._set_auth_headers(req, access, signature, auth_uri,
+                                       auth)
+                return self.application
+
         creds_json = json.dumps(creds)
         headers = {'Content-Type': 'application/json'}
 
@@ -239,19 +285,115 @@ class EC2Token(wsgi.Middleware):
                 raise exception.HeatAccessDeniedError()
 
         # Authenticated!
+        metadata = result['access'].get('metadata', {})
+        auth = {'token_id': token_id,
+                'tenant': tenant,
+                'tenant_id': tenant_id,
+                'roles': metadata.get('roles', [])}
+        self._set_auth_headers(req, access, signature, auth_uri, auth)
+
+        if cache_credentials:
+            self._cache_credentials(auth_uri, access, result, auth)
+
+        return self.application
+
+    @staticmethod
+    def _set_auth_headers(req, access, signature, auth_uri, auth):
         ec2_creds = {'ec2Credentials': {'access': access,
                                         'signature': signature}}
         req.headers['X-Auth-EC2-Creds'] = json.dumps(ec2_creds)
-        req.headers['X-Auth-Token'] = token_id
-        req.headers['X-Tenant-Name'] = tenant
-        req.headers['X-Tenant-Id'] = tenant_id
+        req.headers['X-Auth-Token'] = auth['token_id']
+        req.headers['X-Tenant-Name'] = auth['tenant']
+        req.headers['X-Tenant-Id'] = auth['tenant_id']
         req.headers['X-Auth-URL'] = auth_uri
+        req.headers['X-Roles'] = ','.join(auth['roles'])
 
-        metadata = result['access'].get('metadata', {})
-        roles = metadata.get('roles', [])
-        req.headers['X-Roles'] = ','.join(roles)
+    @staticmethod
+    def _signature_matches(secret, credentials):
+        """
+        Check a request signature in the same way as keystone's ec2tokens
+        extension does, including its fallback of signing the host without
+        a port.
+        """
+        credentials = dict(credentials, headers=dict(credentials['headers']))
+        signature = encodeutils.safe_encode(credentials['signature'])
+
+        hosts = [credentials['host']]
+        if ':' in credentials['host']:
+            hosts.append(credentials['host'].split(':')[0])
+        for host in hosts:
+            # Ec2Signer keeps the HMAC it updates, so it is not reusable
+            signer = ec2_utils.Ec2Signer(secret)
+            try:
+                expected = signer.generate(dict(credentials, host=host))
+            except Exception as ex:
+                LOG.debug('Unable to verify signature locally: %s' % ex)
+                return False
+            if hmac.compare_digest(encodeutils.safe_encode(expected),
+                                   signature):
+                return True
+        return False
+
+    def _cached_auth(self, auth_uri, credentials):
+        """
+        Return the cached authentication result for a request, if the request
+        is signed with the cached secret for its access key.
+        """
+        key = (auth_uri, credentials['access'])
+        entry = _credentials().get(key)
+        if entry is None:
+            return None
 
-        return self.application
+        if (entry['expires'] is not None and
+                timeutils.is_soon(entry['expires'], TOKEN_EXPIRY_WINDOW)):
+            _credentials().pop(key)
+            return None
+
+        if not self._signature_matches(entry['secret'], credentials):
+            # The credential may have been deleted or replaced, so let
+            # keystone decide
+            _credentials().pop(key)
+            return None
+
+        return entry['auth']
+
+    @staticmethod
+    def _conf_get_keystone_credential_uri(auth_uri, user_id, access):
+        if auth_uri.endswith('ec2tokens'):
+            auth_uri = auth_uri[:-len('ec2tokens')]
+        return '%s/users/%s/credentials/OS-EC2/%s' % (auth_uri.rstrip('/'),
+                                                      user_id, access)
+
+    def _cache_credentials(self, auth_uri, access, result, auth):
+        """
+        Fetch the secret for an access key just authenticated by keystone,
+        and cache it with the authentication result.
+        """
+        try:
+            user_id = result['access']['user']['id']
+        except KeyError:
+            return
+        expires = result['access']['token'].get('expires')
+
+        credential_uri = self._conf_get_keystone_credential_uri(
+            auth_uri, user_id, access)
+        try:
+            response = requests.get(credential_uri,
+                                    headers={'X-Auth-Token':
+                                             auth['token_id']},
+                                    verify=self.ssl_options['verify'],
+                                    cert=self.ssl_options['cert'])
+            secret = response.json()['credential']['secret']
+        except (requests.exceptions.RequestException,
+                ValueError, KeyError, TypeError) as ex:
+            LOG.warn(_LW('Unable to fetch EC2 credential for caching: %s'),
+                     ex)
+            return
+
+        _credentials().set((auth_uri, access), {
+            'secret': secret,
+            'auth': auth,
+            'expires': timeutils.parse_isotime(expires) if expires else None})
 
 
 def EC2Token_filter_factory(global_conf, **local_conf):
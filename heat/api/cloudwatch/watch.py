@@ -22,7 +22,6 @@ from heat.api.aws import utils as api_utils
 from heat.common import exception as heat_exception
 from heat.common.i18n import _
 from heat.common.i18n import _LE
-from heat.common.i18n import _LW
 from heat.common import policy
 from heat.common import wsgi
 from heat.rpc import api as rpc_api
@@ -38,6 +37,10 @@ class WatchController(object):
     Implements the API actions.
     """
 
+    # The maximum number of datapoints returned by one ListMetrics call,
+    # as in AWS; further pages are requested with the returned NextToken
+    METRICS_PAGE_SIZE = 500
+
     def __init__(self, options):
         self.options = options
         self.rpc_client = rpc_client.EngineClient()
@@ -169,14 +172,8 @@ class WatchController(object):
         """
         self._enforce(req, 'ListMetrics')
 
-        def format_metric_data(d, fil=None):
-            """Reformat engine output into the AWS "Metric" format.
-
-            Takes an optional filter dict, which is traversed
-            so a metric dict is only returned if all keys match
-            the filter dict.
-            """
-            fil = fil or {}
+        def format_metric_data(d):
+            """Reformat engine output into the AWS "Metric" format."""
             dimensions = [
                 {'AlarmName': d[rpc_api.WATCH_DATA_ALARM]},
                 {'Timestamp': d[rpc_api.WATCH_DATA_TIME]}
@@ -186,45 +183,38 @@ class WatchController(object):
 
             newdims = self._reformat_dimensions(dimensions)
 
-            result = {
+            return {
                 'MetricName': d[rpc_api.WATCH_DATA_METRIC],
                 'Dimensions': newdims,
                 'Namespace': d[rpc_api.WATCH_DATA_NAMESPACE],
             }
 
-            for f in fil:
-                try:
-                    value = result[f]
-                    if value != fil[f]:
-                        # Filter criteria not met, return None
-                        return
-                except KeyError:
-                    LOG.warn(_LW("Invalid filter key %s, ignoring"), f)
-
-            return result
-
         con = req.context
         parms = dict(req.params)
         # FIXME : Don't yet handle filtering by Dimensions
-        filter_result = dict((k, v) for (k, v) in six.iteritems(parms) if k in
-                             ("MetricName", "Namespace"))
-        LOG.debug("filter parameters : %s" % filter_result)
+        filter_kwargs = {'metric_namespace': parms.get('Namespace'),
+                         'metric_name': parms.get('MetricName')}
+        LOG.debug("filter parameters : %s" % filter_kwargs)
+
+        marker = None
+        if 'NextToken' in parms:
+            try:
+                marker = int(parms['NextToken'])
+            except ValueError:
+                msg = _('Invalid NextToken %s') % parms['NextToken']
+                return exception.HeatInvalidParameterValueError(detail=msg)
 
         try:
-            # Engine does not currently support query by namespace/metric
-            # so we pass None/None and do any filtering locally
-            null_kwargs = {'metric_namespace': None,
-                           'metric_name': None}
-            watch_data = self.rpc_client.show_watch_metric(con,
-                                                           **null_kwargs)
+            watch_data = self.rpc_client.show_watch_metric(
+                con, limit=self.METRICS_PAGE_SIZE, marker=marker,
+                **filter_kwargs)
         except messaging.RemoteError as ex:
             return exception.map_remote_error(ex)
 
-        res = {'Metrics': []}
-        for d in watch_data:
-            metric = format_metric_data(d, filter_result)
-            if metric:
-                res['Metrics'].append(metric)
+        res = {'Metrics': [format_metric_data(d) for d in watch_data]}
+        if len(watch_data) >= self.METRICS_PAGE_SIZE:
+            res['NextToken'] = six.text_type(
+                watch_data[-1][rpc_api.WATCH_DATA_ID])
 
         result = api_utils.format_response("ListMetrics", res)
         return result
@@ -13,6 +13,8 @@
 
 import itertools
 
+from webob import exc
+
 from heat.api.openstack.v1 import util
 from heat.common import identifier
 from heat.common import param_utils
@@ -112,13 +114,29 @@ class ResourceController(object):
     def metadata(self, req, identity, resource_name):
         """
         Gets metadata information for a resource
-        """
 
-        res = self.rpc_client.describe_stack_resource(req.context,
-                                                      identity,
-                                                      resource_name)
+        The response carries an ETag, and a request whose If-None-Match
+        header matches the current metadata is answered with 304 Not Modified.
+        """
 
-        return {rpc_api.RES_METADATA: res[rpc_api.RES_METADATA]}
+        version = None
+        if_none_match = req.headers.get('If-None-Match')
+        if if_none_match:
+            etag = if_none_match.split(',')[0].strip()
+            if etag.startswith('W/'):
+                etag = etag[2:]
+            version = etag.strip('"')
+        res = self.rpc_client.describe_stack_resource_metadata(
+            req.context, identity, resource_name, metadata_version=version)
+
+        if rpc_api.RES_METADATA not in res:
+            not_modified = exc.HTTPNotModified()
+            not_modified.etag = res[rpc_api.RES_METADATA_VERSION]
+            raise not_modified
+
+        return {rpc_api.RES_METADATA: res[rpc_api.RES_METADATA],
+                rpc_api.RES_METADATA_VERSION:
+                    res[rpc_api.RES_METADATA_VERSION]}
 
     @util.identified_stack
     def signal(self, req, identity, resource_name, body=None):
@@ -128,10 +146,19 @@ class ResourceController(object):
                                         details=body)
 
 
+class ResourceSerializer(serializers.JSONResponseSerializer):
+    """Handles serialization of specific controller method responses."""
+
+    def metadata(self, response, result):
+        response.etag = result.pop(rpc_api.RES_METADATA_VERSION)
+        self.default(response, result)
+        return response
+
+
 def create_resource(options):
     """
     Resources resource factory method.
     """
     deserializer = wsgi.JSONRequestDeserializer()
-    serializer = serializers.JSONResponseSerializer()
+    serializer = ResourceSerializer()
     return wsgi.Resource(ResourceController(options), deserializer, serializer)
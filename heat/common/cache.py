@@ -0,0 +1,72 @@
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Simple in-process caches shared by the services in a single process."""
+
+import collections
+import time
+
+
+class LRUCache(object):
+    """A bounded mapping which discards the least recently used entries.
+
+    If a time to live (in seconds) is given, entries older than that are
+    treated as absent. A maxsize of 0 disables the cache entirely, so that
+    callers need not special-case a disabled cache.
+    """
+
+    def __init__(self, maxsize, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = collections.OrderedDict()
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def _expired(self, stored_at):
+        return self.ttl is not None and time.time() - stored_at > self.ttl
+
+    def get(self, key, default=None):
+        try:
+            value, stored_at = self._data.pop(key)
+        except KeyError:
+            return default
+
+        if self._expired(stored_at):
+            return default
+
+        # Re-insert to mark the entry as the most recently used
+        self._data[key] = (value, stored_at)
+        return value
+
+    def set(self, key, value):
+        if self.maxsize <= 0:
+            return
+
+        self._data.pop(key, None)
+        self._data[key] = (value, time.time())
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key, default=None):
+        try:
+            value, stored_at = self._data.pop(key)
+        except KeyError:
+            return default
+        return default if self._expired(stored_at) else value
+
+    def clear(self):
+        self._data.clear()
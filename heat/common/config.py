@@ -96,6 +96,18 @@ engine_opts = [
                       "If it's empty, Heat will use the default user set up "
                       "with your cloud image (for OS::Nova::Server) or "
                       "'ec2-user' (for AWS::EC2::Instance).")),
+    cfg.IntOpt('bulk_status_poll_interval',
+               default=1,
+               help=_('Seconds for which a single listing of the servers '
+                      'or volumes of a tenant is used to answer the status '
+                      'checks of all resources waiting on them. Set to 0 '
+                      'to fetch each server or volume individually '
+                      'instead.')),
+    cfg.BoolOpt('compress_userdata',
+                default=False,
+                help=_('Gzip the multipart user data built for servers '
+                       'before passing it to Nova. cloud-init decompresses '
+                       'it transparently, but other agents may not.')),
     cfg.ListOpt('plugin_dirs',
                 default=['/usr/lib64/heat', '/usr/lib/heat',
                          '/usr/local/lib/heat', '/usr/local/lib64/heat'],
@@ -113,6 +125,47 @@ engine_opts = [
                 help=_('Subset of trustor roles to be delegated to heat.'
                        ' If left unset, all roles of a user will be'
                        ' delegated to heat when creating a stack.')),
+    cfg.IntOpt('stored_context_cache_size',
+               default=1000,
+               help=_('Maximum number of trust-scoped tokens and decrypted'
+                      ' user credentials cached by each engine process for'
+                      ' operations which use the stored context of a stack.'
+                      ' Set to 0 to disable the cache.')),
+    cfg.IntOpt('trust_token_refresh_margin',
+               default=300,
+               help=_('Number of seconds before its expiry at which a cached'
+                      ' trust-scoped token is discarded and a new one is'
+                      ' requested from keystone.')),
+    cfg.IntOpt('provider_template_cache_size',
+               default=200,
+               help=_('Maximum number of parsed provider templates, together'
+                      ' with their property and attribute schemas, cached by'
+                      ' each engine process. Set to 0 to disable the'
+                      ' cache.')),
+    cfg.IntOpt('metadata_access_cache_size',
+               default=1000,
+               help=_('Maximum number of decisions on whether an in-instance'
+                      ' user may read resource metadata cached by each engine'
+                      ' process. Decisions are discarded whenever the stack'
+                      ' is updated. Set to 0 to disable the cache.')),
+    cfg.IntOpt('blob_cache_size',
+               default=100,
+               help=_('Maximum number of decompressed template files maps'
+                      ' cached by each engine process. Set to 0 to disable'
+                      ' the cache.')),
+    cfg.IntOpt('max_in_process_stack_threads',
+               default=50,
+               help=_('Number of stack threads an engine may be running for'
+                      ' it to still create and update nested stacks'
+                      ' in-process, without sending the child template over'
+                      ' RPC. Above this, nested stack operations are'
+                      ' distributed to all engines over RPC. Set to 0 to'
+                      ' always use RPC.')),
+    cfg.IntOpt('resource_validation_concurrency',
+               default=10,
+               help=_('Maximum number of resources in a stack that are'
+                      ' validated concurrently. Set to 1 to validate'
+                      ' resources one at a time.')),
     cfg.IntOpt('max_resources_per_stack',
                default=1000,
                help=_('Maximum resources allowed per top-level stack.')),
@@ -269,6 +322,34 @@ default_clients_opts = [
                 help=_("If set, then the server's certificate will not "
                        "be verified."))]
 
+# these options size the HTTP connection pools shared by all clients
+client_connection_pool_opts = [
+    cfg.IntOpt('connection_pool_hosts',
+               default=10,
+               help=_('Number of distinct service endpoints for which each '
+                      'shared HTTP session keeps a connection pool.')),
+    cfg.IntOpt('connection_pool_size',
+               default=10,
+               help=_('Maximum number of idle connections kept open to each '
+                      'service endpoint by the shared HTTP sessions.'))]
+
+# these options limit the load that resource actions put on each backend
+client_throttle_opts = [
+    cfg.IntOpt('max_actions_in_progress',
+               default=0,
+               help=_('Maximum number of resource actions (from their '
+                      'handle call until their completion check succeeds) '
+                      'which each engine process runs concurrently against '
+                      'a service on behalf of a single tenant. Set to 0 for '
+                      'no limit.')),
+    cfg.FloatOpt('max_calls_per_second',
+                 default=0,
+                 help=_('Maximum rate at which each engine process makes '
+                        'resource handle and completion check calls against '
+                        'a service on behalf of a single tenant. Bursts of '
+                        'up to one second\'s worth of calls are allowed. Set '
+                        'to 0 for no limit.'))]
+
 # these options can be defined for each client
 # they must not specify defaults, since any options not defined in a client
 # specific group is looked up on the generic group above
@@ -286,7 +367,16 @@ clients_opts = [
                       'private key.')),
     cfg.BoolOpt('insecure',
                 help=_("If set, then the server's certificate will not "
-                       "be verified."))]
+                       "be verified.")),
+    cfg.IntOpt('max_actions_in_progress',
+               help=_('Maximum number of resource actions which each engine '
+                      'process runs concurrently against the service on '
+                      'behalf of a single tenant. Set to 0 for no limit.')),
+    cfg.FloatOpt('max_calls_per_second',
+                 help=_('Maximum rate at which each engine process makes '
+                        'resource handle and completion check calls against '
+                        'the service on behalf of a single tenant. Set to 0 '
+                        'for no limit.'))]
 
 heat_client_opts = [
     cfg.StrOpt('url',
@@ -340,6 +430,8 @@ def list_opts():
     yield revision_group.name, revision_opts
     yield profiler_group.name, profiler_opts
     yield 'clients', default_clients_opts
+    yield 'clients', client_connection_pool_opts
+    yield 'clients', client_throttle_opts
 
     for client in ('nova', 'swift', 'neutron', 'cinder',
                    'ceilometer', 'keystone', 'heat', 'glance', 'trove',
@@ -11,6 +11,8 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import copy
+
 from keystoneclient import access
 from keystoneclient.auth.identity import access as access_plugin
 from keystoneclient.auth.identity import v3
@@ -23,6 +25,7 @@ from oslo_middleware import request_id as oslo_request_id
 from oslo_utils import importutils
 import six
 
+from heat.common import cache
 from heat.common import exception
 from heat.common.i18n import _LE
 from heat.common import policy
@@ -32,6 +35,45 @@ from heat.engine import clients
 
 LOG = logging.getLogger(__name__)
 
+cfg.CONF.import_opt('stored_context_cache_size', 'heat.common.config')
+cfg.CONF.import_opt('trust_token_refresh_margin', 'heat.common.config')
+
+_trust_token_cache = None
+
+
+def _trust_tokens():
+    global _trust_token_cache
+    if _trust_token_cache is None:
+        _trust_token_cache = cache.LRUCache(
+            cfg.CONF.stored_context_cache_size)
+    return _trust_token_cache
+
+
+def get_trust_token(trust_id):
+    """Return a cached trust-scoped token for the trust, if still fresh.
+
+    Tokens which will expire within trust_token_refresh_margin seconds are
+    discarded so that a new one is requested before the old one lapses.
+    """
+    auth_ref = _trust_tokens().get(trust_id)
+    if auth_ref is None:
+        return None
+    if auth_ref.will_expire_soon(
+            stale_duration=cfg.CONF.trust_token_refresh_margin):
+        _trust_tokens().pop(trust_id)
+        return None
+    return auth_ref
+
+
+def store_trust_token(trust_id, auth_ref):
+    """Cache a trust-scoped token so other stored contexts can reuse it."""
+    _trust_tokens().set(trust_id, auth_ref)
+
+
+def forget_trust_token(trust_id):
+    """Discard any cached token for a trust, e.g. when it is deleted."""
+    _trust_tokens().pop(trust_id)
+
 
 class RequestContext(context.RequestContext):
     """
@@ -93,6 +135,15 @@ class RequestContext(context.RequestContext):
             self._clients = clients.Clients(self)
         return self._clients
 
+    def copy_with_new_session(self):
+        '''
+        Return a copy of the context with its own database session, for use
+        by another green thread. The clients and auth plugin are shared.
+        '''
+        ctx = copy.copy(self)
+        ctx._session = None
+        return ctx
+
     def to_dict(self):
         user_idt = '{user} {tenant}'.format(user=self.username or '-',
                                             tenant=self.tenant or '-')
@@ -136,11 +187,16 @@ class RequestContext(context.RequestContext):
             username = cfg.CONF.keystone_authtoken.admin_user
             password = cfg.CONF.keystone_authtoken.admin_password
 
-            return v3.Password(username=username,
-                               password=password,
-                               user_domain_id='default',
-                               auth_url=self._keystone_v3_endpoint,
-                               trust_id=self.trust_id)
+            trust_plugin = v3.Password(username=username,
+                                       password=password,
+                                       user_domain_id='default',
+                                       auth_url=self._keystone_v3_endpoint,
+                                       trust_id=self.trust_id)
+            # Start from a token obtained earlier for the same trust by any
+            # context in this process, so that keystone is only asked for a
+            # new one once that is about to expire.
+            trust_plugin.auth_ref = get_trust_token(self.trust_id)
+            return trust_plugin
 
         if self.auth_token_info:
             auth_ref = access.AccessInfo.factory(body=self.auth_token_info,
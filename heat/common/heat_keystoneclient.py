@@ -18,7 +18,6 @@ import uuid
 
 from keystoneclient.auth.identity import v3 as kc_auth_v3
 import keystoneclient.exceptions as kc_exception
-from keystoneclient import session
 from keystoneclient.v3 import client as kc_v3
 from oslo_config import cfg
 from oslo_log import log as logging
@@ -27,6 +26,7 @@ from oslo_utils import importutils
 
 from heat.common import context
 from heat.common import exception
+from heat.common import http_sessions
 from heat.common.i18n import _
 from heat.common.i18n import _LE
 from heat.common.i18n import _LW
@@ -75,7 +75,7 @@ class KeystoneClientV3(object):
         self._domain_admin_auth = None
         self._domain_admin_client = None
 
-        self.session = session.Session.construct(self._ssl_options())
+        self.session = http_sessions.get_session(**self._ssl_options())
 
         if self.context.auth_url:
             self.v3_endpoint = self.context.auth_url.replace('v2.0', 'v3')
@@ -187,6 +187,8 @@ class KeystoneClientV3(object):
                     LOG.error(_LE("Trust impersonation failed"))
                     raise exception.AuthorizationFailure()
 
+                context.store_trust_token(self.context.trust_id, auth_ref)
+
         return client
 
     def _ssl_options(self):
@@ -259,6 +261,7 @@ class KeystoneClientV3(object):
 
     def delete_trust(self, trust_id):
         """Delete the specified trust."""
+        context.forget_trust_token(trust_id)
         try:
             self.client.trusts.delete(trust_id)
         except kc_exception.NotFound:
@@ -0,0 +1,86 @@
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Process-wide registry of pooled HTTP sessions for OpenStack clients.
+
+Keystone sessions are cheap to create, but each one normally owns its own
+requests.Session and therefore its own TCP/TLS connections. The sessions
+returned here all share a single pooled requests.Session per distinct set of
+SSL options, so connections to each endpoint are kept alive and reused
+across request contexts, stack loads and client plugins.
+"""
+
+from keystoneclient import session
+from oslo_config import cfg
+from oslo_log import log as logging
+import requests
+from requests import adapters
+
+LOG = logging.getLogger(__name__)
+
+cfg.CONF.import_opt('connection_pool_hosts', 'heat.common.config',
+                    group='clients')
+cfg.CONF.import_opt('connection_pool_size', 'heat.common.config',
+                    group='clients')
+
+_http_sessions = {}
+_stats = {'pools_created': 0, 'sessions_served': 0}
+
+
+def _create_http_session():
+    http = requests.Session()
+    adapter = adapters.HTTPAdapter(
+        pool_connections=cfg.CONF.clients.connection_pool_hosts,
+        pool_maxsize=cfg.CONF.clients.connection_pool_size)
+    http.mount('http://', adapter)
+    http.mount('https://', adapter)
+    return http
+
+
+def get_session(cacert=None, insecure=False, cert=None, key=None, auth=None):
+    """Return a keystone session backed by a shared connection pool.
+
+    The SSL arguments have the same meaning as those accepted by
+    keystoneclient.session.Session.construct().
+    """
+    verify = False if insecure else (cacert or True)
+    if cert and key:
+        cert = (cert, key)
+
+    pool_key = (verify, cert)
+    http = _http_sessions.get(pool_key)
+    if http is None:
+        LOG.debug('Creating HTTP connection pool (verify=%(verify)s, '
+                  'cert=%(cert)s)' % {'verify': verify, 'cert': cert})
+        http = _create_http_session()
+        _http_sessions[pool_key] = http
+        _stats['pools_created'] += 1
+
+    _stats['sessions_served'] += 1
+    return session.Session(auth=auth, session=http, verify=verify, cert=cert)
+
+
+def get_stats():
+    """Return counters describing the use of the shared pools."""
+    stats = dict(_stats)
+    stats['pools'] = len(_http_sessions)
+    return stats
+
+
+def reset():
+    """Close every pooled connection and forget the shared sessions."""
+    for http in _http_sessions.values():
+        http.close()
+    _http_sessions.clear()
+    _stats['pools_created'] = 0
+    _stats['sessions_served'] = 0
@@ -21,6 +21,7 @@ Utility methods for serializing responses
 """
 
 import datetime
+import json
 
 from lxml import etree
 from oslo_log import log as logging
@@ -29,22 +30,65 @@ import six
 
 LOG = logging.getLogger(__name__)
 
+# Results containing a list with more items than this are streamed
+STREAM_MIN_ITEMS = 100
+# Approximate size in bytes of each chunk of a streamed response
+STREAM_CHUNK_SIZE = 65536
+
+
+def _sanitizer(obj):
+    if isinstance(obj, datetime.datetime):
+        return obj.isoformat()
+    return obj
+
 
 class JSONResponseSerializer(object):
 
     def to_json(self, data):
-        def sanitizer(obj):
-            if isinstance(obj, datetime.datetime):
-                return obj.isoformat()
-            return obj
-
-        response = jsonutils.dumps(data, default=sanitizer)
+        response = jsonutils.dumps(data, default=_sanitizer)
         LOG.debug("JSON response : %s" % response)
         return response
 
+    def to_json_chunks(self, data, chunk_size=STREAM_CHUNK_SIZE):
+        """
+        Serialize data incrementally, yielding encoded chunks of roughly
+        chunk_size bytes so that the whole document is never held in memory.
+        """
+        encoder = json.JSONEncoder(default=_sanitizer)
+        buf = []
+        buffered = 0
+        for fragment in encoder.iterencode(data):
+            if isinstance(fragment, six.text_type):
+                fragment = fragment.encode('utf-8')
+            buf.append(fragment)
+            buffered += len(fragment)
+            if buffered >= chunk_size:
+                yield b''.join(buf)
+                buf = []
+                buffered = 0
+        if buf:
+            yield b''.join(buf)
+
+    @staticmethod
+    def is_large_collection(data):
+        """
+        Return True if data is, or directly contains, a list long enough to
+        be worth streaming, as in the results of the list API calls.
+        """
+        if isinstance(data, dict):
+            values = six.itervalues(data)
+        else:
+            values = [data]
+        return any(isinstance(v, list) and len(v) > STREAM_MIN_ITEMS
+                   for v in values)
+
     def default(self, response, result):
         response.content_type = 'application/json'
-        response.body = self.to_json(result)
+        if self.is_large_collection(result):
+            LOG.debug("JSON response : streaming large collection")
+            response.app_iter = self.to_json_chunks(result)
+        else:
+            response.body = self.to_json(result)
 
 
 # Escape XML serialization for these keys, as the AWS API defines them as
@@ -165,9 +165,18 @@ json_size_opt = cfg.IntOpt('max_json_body_size',
                                 ' Should be larger than max_template_size.')
 cfg.CONF.register_opt(json_size_opt)
 
+compress_opt = cfg.BoolOpt('compress_api_responses',
+                           default=False,
+                           help=_('Compress API responses with gzip when the '
+                                  'client accepts the gzip content encoding.'))
+cfg.CONF.register_opt(compress_opt)
+
+# Responses of a known size smaller than this are never compressed
+MIN_COMPRESS_SIZE = 1024
+
 
 def list_opts():
-    yield None, [json_size_opt]
+    yield None, [json_size_opt, compress_opt]
     yield 'heat_api', api_opts
     yield 'heat_api_cfn', api_cfn_opts
     yield 'heat_api_cloudwatch', api_cw_opts
@@ -692,6 +701,8 @@ class Resource(object):
 
             response = webob.Response(request=request)
             self.dispatch(serializer, action, response, action_result)
+            if cfg.CONF.compress_api_responses:
+                compress_response(request, response)
             return response
 
         # return unserializable result (typically an exception)
@@ -743,6 +754,25 @@ class Resource(object):
         return args
 
 
+def compress_response(request, response):
+    """
+    Encode the response body with gzip if the client accepts it.
+
+    The body is compressed lazily, so that streamed responses are compressed
+    chunk by chunk as they are written.
+    """
+    if response.content_encoding:
+        return
+    length = response.content_length
+    if length is not None and length < MIN_COMPRESS_SIZE:
+        return
+
+    response.vary = tuple(response.vary or ()) + ('Accept-Encoding',)
+    if request.accept_encoding.best_match(['gzip']) != 'gzip':
+        return
+    response.encode_content('gzip', lazy=True)
+
+
 def log_exception(err, exc_info):
     args = {'exc_info': exc_info} if cfg.CONF.verbose or cfg.CONF.debug else {}
     LOG.error(_LE("Unexpected error occurred serving API: %s") % err,
@@ -43,6 +43,14 @@ def get_session():
     return IMPL.get_session()
 
 
+def blob_get(context, blob_id):
+    return IMPL.blob_get(context, blob_id)
+
+
+def blob_create(context, values):
+    return IMPL.blob_create(context, values)
+
+
 def raw_template_get(context, template_id):
     return IMPL.raw_template_get(context, template_id)
 
@@ -119,11 +127,28 @@ def resource_get_by_name_and_stack(context, resource_name, stack_id):
                                                resource_name, stack_id)
 
 
+def resource_metadata_get_by_name_and_stack(context, resource_name, stack_id):
+    return IMPL.resource_metadata_get_by_name_and_stack(context,
+                                                        resource_name,
+                                                        stack_id)
+
+
+def resource_metadata_update(context, resource_id, metadata, version):
+    return IMPL.resource_metadata_update(context, resource_id, metadata,
+                                         version)
+
+
 def resource_get_by_physical_resource_id(context, physical_resource_id):
     return IMPL.resource_get_by_physical_resource_id(context,
                                                      physical_resource_id)
 
 
+def resource_identity_get_by_physical_resource_id(context,
+                                                  physical_resource_id):
+    return IMPL.resource_identity_get_by_physical_resource_id(
+        context, physical_resource_id)
+
+
 def stack_get(context, stack_id, show_deleted=False, tenant_safe=True,
               eager_load=False):
     return IMPL.stack_get(context, stack_id, show_deleted=show_deleted,
@@ -155,6 +180,10 @@ def stack_get_all_by_owner_id(context, owner_id):
     return IMPL.stack_get_all_by_owner_id(context, owner_id)
 
 
+def stack_get_owner_ids(context, stack_ids):
+    return IMPL.stack_get_owner_ids(context, stack_ids)
+
+
 def stack_count_all(context, filters=None, tenant_safe=True,
                     show_deleted=False, show_nested=False, show_hidden=False,
                     tags=None, tags_any=None, not_tags=None,
@@ -190,6 +219,10 @@ def stack_lock_get_engine_id(stack_id):
     return IMPL.stack_lock_get_engine_id(stack_id)
 
 
+def stack_lock_get_engine_ids(stack_ids):
+    return IMPL.stack_lock_get_engine_ids(stack_ids)
+
+
 def stack_lock_steal(stack_id, old_engine_id, new_engine_id):
     return IMPL.stack_lock_steal(stack_id, old_engine_id, new_engine_id)
 
@@ -262,6 +295,23 @@ def watch_rule_get_all_by_stack(context, stack_id):
     return IMPL.watch_rule_get_all_by_stack(context, stack_id)
 
 
+def watch_rule_get_all_by_ids(context, watch_rule_ids):
+    return IMPL.watch_rule_get_all_by_ids(context, watch_rule_ids)
+
+
+def watch_rule_get_all_summary(context, updated_since=None):
+    return IMPL.watch_rule_get_all_summary(context,
+                                           updated_since=updated_since)
+
+
+def watch_rule_get_active_stack_ids(context):
+    return IMPL.watch_rule_get_active_stack_ids(context)
+
+
+def watch_rule_update_all_by_stack_ids(context, stack_ids, values):
+    return IMPL.watch_rule_update_all_by_stack_ids(context, stack_ids, values)
+
+
 def watch_rule_create(context, values):
     return IMPL.watch_rule_create(context, values)
 
@@ -278,12 +328,20 @@ def watch_data_create(context, values):
     return IMPL.watch_data_create(context, values)
 
 
-def watch_data_get_all(context):
-    return IMPL.watch_data_get_all(context)
+def watch_data_get_all(context, namespace=None, metric_name=None,
+                       limit=None, marker=None):
+    return IMPL.watch_data_get_all(context, namespace=namespace,
+                                   metric_name=metric_name,
+                                   limit=limit, marker=marker)
+
 
+def watch_data_get_all_by_watch_rule_id(context, watch_rule_id, since=None):
+    return IMPL.watch_data_get_all_by_watch_rule_id(context, watch_rule_id,
+                                                    since=since)
 
-def watch_data_get_all_by_watch_rule_id(context, watch_rule_id):
-    return IMPL.watch_data_get_all_by_watch_rule_id(context, watch_rule_id)
+
+def watch_data_delete_expired(context, watch_rule_id, cutoff):
+    return IMPL.watch_data_delete_expired(context, watch_rule_id, cutoff)
 
 
 def software_config_create(context, values):
@@ -362,6 +420,10 @@ def service_get_all(context):
     return IMPL.service_get_all(context)
 
 
+def service_get_all_by_engine_ids(context, engine_ids):
+    return IMPL.service_get_all_by_engine_ids(context, engine_ids)
+
+
 def service_get_all_by_args(context, host, binary, hostname):
     return IMPL.service_get_all_by_args(context, host, binary, hostname)
 
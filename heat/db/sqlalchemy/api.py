@@ -16,6 +16,7 @@ import datetime
 import sys
 
 from oslo_config import cfg
+from oslo_db import exception as db_exception
 from oslo_db.sqlalchemy import session as db_session
 from oslo_db.sqlalchemy import utils
 from oslo_utils import timeutils
@@ -88,6 +89,34 @@ def _session(context):
     return (context and context.session) or get_session()
 
 
+def blob_get(context, blob_id):
+    result = model_query(context, models.Blob).get(blob_id)
+
+    if not result:
+        raise exception.NotFound(_('Blob with id %s not found') % blob_id)
+    return result
+
+
+def blob_create(context, values):
+    """Store a blob, unless one with the same content is already stored."""
+    result = model_query(context, models.Blob).get(values['id'])
+    if result is not None:
+        # Reused by a template which may not be stored yet, so keep
+        # purge_deleted() from treating the blob as long unreferenced
+        result.update({'updated_at': timeutils.utcnow()})
+        result.save(_session(context))
+        return result
+
+    blob_ref = models.Blob()
+    blob_ref.update(values)
+    try:
+        blob_ref.save(_session(context))
+    except db_exception.DBDuplicateEntry:
+        # Stored concurrently by another engine
+        return blob_get(context, values['id'])
+    return blob_ref
+
+
 def raw_template_get(context, template_id):
     result = model_query(context, models.RawTemplate).get(template_id)
 
@@ -136,16 +165,62 @@ def resource_get_by_name_and_stack(context, resource_name, stack_id):
     return result
 
 
+def resource_metadata_get_by_name_and_stack(context, resource_name, stack_id):
+    """Return the metadata of the named resource in a stack.
+
+    Only the columns needed to serve the metadata are selected, so the
+    resource is not hydrated. Returns a tuple of (id, action, rsrc_metadata),
+    or None if the stack has no such resource.
+    """
+    return model_query(
+        context, models.Resource.id, models.Resource.action,
+        models.Resource.rsrc_metadata
+    ).filter_by(
+        name=resource_name
+    ).filter_by(
+        stack_id=stack_id
+    ).first()
+
+
+def _resource_by_physical_resource_id_query(context, physical_resource_id,
+                                            *entities):
+    """Query resources by physical ID, joined to and scoped by their stack.
+
+    The tenant check is done in the database so that matching rows do not
+    each need to lazy-load their stack.
+    """
+    query = (model_query(context, *entities)
+             .join(models.Stack, models.Resource.stack_id == models.Stack.id)
+             .filter(models.Resource.nova_instance == physical_resource_id))
+    if context is not None:
+        query = query.filter(sqlalchemy.or_(
+            models.Stack.tenant == context.tenant_id,
+            models.Stack.stack_user_project_id == context.tenant_id))
+    return query
+
+
 def resource_get_by_physical_resource_id(context, physical_resource_id):
-    results = (model_query(context, models.Resource)
-               .filter_by(nova_instance=physical_resource_id)
-               .all())
+    return (_resource_by_physical_resource_id_query(context,
+                                                    physical_resource_id,
+                                                    models.Resource)
+            .options(orm.contains_eager(models.Resource.stack))
+            .first())
 
-    for result in results:
-        if context is None or context.tenant_id in (
-                result.stack.tenant, result.stack.stack_user_project_id):
-            return result
-    return None
+
+def resource_identity_get_by_physical_resource_id(context,
+                                                  physical_resource_id):
+    """Return the identity of the resource with the given physical ID.
+
+    Only the columns needed to build a ResourceIdentifier are selected, so
+    neither the resource nor its stack are hydrated. Returns a tuple of
+    (resource_name, stack_id, stack_name, tenant), or None if no resource
+    visible to the context matches.
+    """
+    return _resource_by_physical_resource_id_query(
+        context, physical_resource_id,
+        models.Resource.name, models.Stack.id,
+        models.Stack.name, models.Stack.tenant
+    ).filter(models.Stack.deleted_at.is_(None)).first()
 
 
 def resource_get_all(context):
@@ -168,6 +243,36 @@ def resource_update(context, resource_id, values, atomic_key,
         return bool(rows_updated)
 
 
+def resource_metadata_update(context, resource_id, metadata, version):
+    """Replace the metadata of a resource if it is still at a given version.
+
+    The version is incremented with each such update. Returns True if the
+    metadata was updated, or False if its version had changed.
+    """
+    version_column = models.Resource.rsrc_metadata_version
+    session = _session(context)
+    with session.begin():
+        query = session.query(models.Resource).filter_by(id=resource_id)
+        if version:
+            query = query.filter(version_column == version)
+        else:
+            query = query.filter(sqlalchemy.or_(version_column.is_(None),
+                                                version_column == 0))
+        values = {'rsrc_metadata': metadata,
+                  'rsrc_metadata_version': (version or 0) + 1}
+        rows_updated = query.update(values,
+                                    synchronize_session='evaluate')
+        if not rows_updated:
+            # Another writer changed the metadata first, so make sure that
+            # the resource is read afresh rather than from this session
+            # before the caller tries again
+            resource = session.query(models.Resource).get(resource_id)
+            if resource is not None:
+                session.expire(resource)
+
+        return bool(rows_updated)
+
+
 def resource_data_get_all(resource, data=None):
     """
     Looks up resource_data by resource.id.  If data is encrypted,
@@ -358,6 +463,17 @@ def stack_get(context, stack_id, show_deleted=False, tenant_safe=True,
     return result
 
 
+def stack_get_owner_ids(context, stack_ids):
+    """Return a dict mapping each live stack id given to its owner id."""
+    if not stack_ids:
+        return {}
+    query = model_query(
+        context, models.Stack.id, models.Stack.owner_id).filter(
+            models.Stack.id.in_(stack_ids)).filter(
+                models.Stack.deleted_at.is_(None))
+    return dict(query.all())
+
+
 def stack_get_all_by_owner_id(context, owner_id):
     results = soft_delete_aware_query(
         context, models.Stack).filter_by(owner_id=owner_id).all()
@@ -554,6 +670,16 @@ def stack_lock_get_engine_id(stack_id):
             return lock.engine_id
 
 
+def stack_lock_get_engine_ids(stack_ids):
+    if not stack_ids:
+        return {}
+    session = get_session()
+    query = session.query(models.StackLock.stack_id,
+                          models.StackLock.engine_id).filter(
+        models.StackLock.stack_id.in_(stack_ids))
+    return dict(query.all())
+
+
 def stack_lock_steal(stack_id, old_engine_id, new_engine_id):
     session = get_session()
     with session.begin():
@@ -762,6 +888,45 @@ def watch_rule_get_all_by_stack(context, stack_id):
     return results
 
 
+def watch_rule_get_all_by_ids(context, watch_rule_ids):
+    if not watch_rule_ids:
+        return []
+    results = model_query(context, models.WatchRule).filter(
+        models.WatchRule.id.in_(watch_rule_ids)).all()
+    return results
+
+
+def watch_rule_get_all_summary(context, updated_since=None):
+    query = model_query(context, models.WatchRule.id,
+                        models.WatchRule.rule,
+                        models.WatchRule.state,
+                        models.WatchRule.created_at,
+                        models.WatchRule.updated_at)
+    if updated_since is not None:
+        query = query.filter(sqlalchemy.or_(
+            models.WatchRule.created_at >= updated_since,
+            models.WatchRule.updated_at >= updated_since))
+    return query.all()
+
+
+def watch_rule_get_active_stack_ids(context):
+    """Return the ids of live stacks with rules evaluated by the engine."""
+    query = model_query(context, models.WatchRule.stack_id).join(
+        models.Stack, models.WatchRule.stack_id == models.Stack.id).filter(
+            models.Stack.deleted_at.is_(None)).filter(
+                models.WatchRule.state !=
+                rpc_api.WATCH_STATE_CEILOMETER_CONTROLLED).distinct()
+    return [stack_id for (stack_id,) in query.all()]
+
+
+def watch_rule_update_all_by_stack_ids(context, stack_ids, values):
+    if not stack_ids:
+        return 0
+    return model_query(context, models.WatchRule).filter(
+        models.WatchRule.stack_id.in_(stack_ids)).update(
+            values, synchronize_session='fetch')
+
+
 def watch_rule_create(context, values):
     obj_ref = models.WatchRule()
     obj_ref.update(values)
@@ -797,24 +962,59 @@ def watch_rule_delete(context, watch_id):
     session.flush()
 
 
+def _watch_data_metric(data):
+    """Return the namespace and metric name of a sample's data."""
+    if not isinstance(data, dict):
+        return None, None
+    metrics = [k for k in data if k != 'Namespace']
+    return (data.get('Namespace'),
+            metrics[0] if len(metrics) == 1 else None)
+
+
 def watch_data_create(context, values):
+    namespace, metric_name = _watch_data_metric(values.get('data'))
+    values = dict({'namespace': namespace, 'metric_name': metric_name},
+                  **values)
+
     obj_ref = models.WatchData()
     obj_ref.update(values)
     obj_ref.save(_session(context))
     return obj_ref
 
 
-def watch_data_get_all(context):
-    results = model_query(context, models.WatchData).all()
+def watch_data_get_all(context, namespace=None, metric_name=None,
+                       limit=None, marker=None):
+    query = model_query(context, models.WatchData)
+    if namespace is not None:
+        query = query.filter_by(namespace=namespace)
+    if metric_name is not None:
+        query = query.filter_by(metric_name=metric_name)
+    if marker is not None:
+        query = query.filter(models.WatchData.id > marker)
+    query = query.order_by(models.WatchData.id)
+    if limit is not None:
+        query = query.limit(limit)
+    results = query.options(orm.joinedload(models.WatchData.watch_rule)).all()
     return results
 
 
-def watch_data_get_all_by_watch_rule_id(context, watch_rule_id):
-    results = model_query(context, models.WatchData).filter_by(
-        watch_rule_id=watch_rule_id).all()
+def watch_data_get_all_by_watch_rule_id(context, watch_rule_id, since=None):
+    query = model_query(context, models.WatchData).filter_by(
+        watch_rule_id=watch_rule_id)
+    if since is not None:
+        query = query.filter(models.WatchData.created_at >= since)
+    results = query.order_by(models.WatchData.created_at,
+                             models.WatchData.id).all()
     return results
 
 
+def watch_data_delete_expired(context, watch_rule_id, cutoff):
+    return model_query(context, models.WatchData).filter_by(
+        watch_rule_id=watch_rule_id).filter(
+            models.WatchData.created_at < cutoff).delete(
+                synchronize_session=False)
+
+
 def software_config_create(context, values):
     obj_ref = models.SoftwareConfig()
     obj_ref.update(values)
@@ -868,7 +1068,7 @@ def software_deployment_get_all(context, server_id=None):
     ).filter(sqlalchemy.or_(
              sd.tenant == context.tenant_id,
              sd.stack_user_project_id == context.tenant_id)
-             ).order_by(sd.created_at)
+             ).options(orm.joinedload('config')).order_by(sd.created_at)
     if server_id:
         query = query.filter_by(server_id=server_id)
     return query.all()
@@ -972,6 +1172,14 @@ def service_get_all(context):
             filter_by(deleted_at=None).all())
 
 
+def service_get_all_by_engine_ids(context, engine_ids):
+    """Return the service records, deleted or not, of the given engines."""
+    if not engine_ids:
+        return []
+    return (model_query(context, models.Service).
+            filter(models.Service.engine_id.in_(engine_ids)).all())
+
+
 def service_get_all_by_args(context, host, binary, hostname):
     return (model_query(context, models.Service).
             filter_by(host=host).
@@ -1027,6 +1235,19 @@ def purge_deleted(age, granularity='days'):
         user_creds_del = user_creds.delete().where(user_creds.c.id == s[2])
         engine.execute(user_creds_del)
 
+    # Purge blobs no longer referenced by any template. Recently stored or
+    # reused blobs are kept, as the templates referring to them may not be
+    # stored yet.
+    blob = sqlalchemy.Table('blob', meta, autoload=True)
+    referenced = sqlalchemy.select([raw_template.c.files_id]).where(
+        raw_template.c.files_id.isnot(None))
+    blob_del = blob.delete().where(
+        sqlalchemy.and_(sqlalchemy.func.coalesce(blob.c.updated_at,
+                                                 blob.c.created_at) <
+                        time_line,
+                        ~blob.c.id.in_(referenced)))
+    engine.execute(blob_del)
+
     # Purge deleted services
     service = sqlalchemy.Table('service', meta, autoload=True)
     stmt = (sqlalchemy.select([service.c.id]).
@@ -0,0 +1,63 @@
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import json
+
+import sqlalchemy
+
+# Number of samples read at once while populating the new columns
+BATCH_SIZE = 1000
+
+
+def upgrade(migrate_engine):
+    meta = sqlalchemy.MetaData(bind=migrate_engine)
+
+    watch_data = sqlalchemy.Table('watch_data', meta, autoload=True)
+    namespace = sqlalchemy.Column('namespace', sqlalchemy.String(255))
+    namespace.create(watch_data)
+    metric_name = sqlalchemy.Column('metric_name', sqlalchemy.String(255))
+    metric_name.create(watch_data)
+
+    metric_index = sqlalchemy.Index('ix_watch_data_namespace_metric_name',
+                                    watch_data.c.namespace,
+                                    watch_data.c.metric_name,
+                                    mysql_length={'namespace': 100,
+                                                  'metric_name': 100})
+    metric_index.create(migrate_engine)
+
+    # Populate the new columns from the stored samples, a batch at a time
+    last_id = None
+    while True:
+        stmt = sqlalchemy.select([watch_data.c.id, watch_data.c.data])
+        if last_id is not None:
+            stmt = stmt.where(watch_data.c.id > last_id)
+        stmt = stmt.order_by(watch_data.c.id).limit(BATCH_SIZE)
+        rows = migrate_engine.execute(stmt).fetchall()
+        if not rows:
+            break
+        last_id = rows[-1].id
+
+        for wd in rows:
+            try:
+                data = json.loads(wd.data)
+            except (TypeError, ValueError):
+                continue
+            if not isinstance(data, dict):
+                continue
+            metrics = [k for k in data if k != 'Namespace']
+            values = {'namespace': data.get('Namespace'),
+                      'metric_name': (metrics[0] if len(metrics) == 1
+                                      else None)}
+            update = watch_data.update().where(
+                watch_data.c.id == wd.id).values(values)
+            migrate_engine.execute(update)
@@ -0,0 +1,49 @@
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import migrate
+import sqlalchemy
+
+from heat.db.sqlalchemy import types
+
+
+def upgrade(migrate_engine):
+    meta = sqlalchemy.MetaData(bind=migrate_engine)
+
+    blob = sqlalchemy.Table(
+        'blob', meta,
+        sqlalchemy.Column('id',
+                          sqlalchemy.String(64),
+                          primary_key=True,
+                          nullable=False),
+        sqlalchemy.Column('created_at', sqlalchemy.DateTime),
+        sqlalchemy.Column('updated_at', sqlalchemy.DateTime),
+        sqlalchemy.Column('data', types.LongBlob),
+        sqlalchemy.Column('size', sqlalchemy.Integer),
+        mysql_engine='InnoDB',
+        mysql_charset='utf8'
+    )
+    blob.create()
+
+    raw_template = sqlalchemy.Table('raw_template', meta, autoload=True)
+    files_id = sqlalchemy.Column('files_id', sqlalchemy.String(64),
+                                 nullable=True)
+    files_id.create(raw_template)
+
+    # SQLite cannot add a constraint to an existing table
+    if migrate_engine.name != 'sqlite':
+        fkey = migrate.ForeignKeyConstraint(
+            columns=[raw_template.c.files_id],
+            refcolumns=[blob.c.id],
+            name='raw_template_files_blob_fkey_ref')
+        fkey.create()
@@ -91,6 +91,15 @@ class StateAware(object):
     status_reason = sqlalchemy.Column('status_reason', sqlalchemy.Text)
 
 
+class Blob(BASE, HeatBase):
+    """Represents compressed content addressed by the digest of its data."""
+
+    __tablename__ = 'blob'
+    id = sqlalchemy.Column(sqlalchemy.String(64), primary_key=True)
+    data = sqlalchemy.Column(types.LongBlob)
+    size = sqlalchemy.Column(sqlalchemy.Integer)
+
+
 class RawTemplate(BASE, HeatBase):
     """Represents an unparsed template which should be in JSON format."""
 
@@ -98,6 +107,9 @@ class RawTemplate(BASE, HeatBase):
     id = sqlalchemy.Column(sqlalchemy.Integer, primary_key=True)
     template = sqlalchemy.Column(types.Json)
     files = sqlalchemy.Column(types.Json)
+    files_id = sqlalchemy.Column(sqlalchemy.String(64),
+                                 sqlalchemy.ForeignKey('blob.id'),
+                                 nullable=True)
     environment = sqlalchemy.Column('environment', types.Json)
     predecessor = sqlalchemy.Column('predecessor', sqlalchemy.Integer,
                                     sqlalchemy.ForeignKey('raw_template.id'))
@@ -284,6 +296,7 @@ class Resource(BASE, HeatBase, StateAware):
     nova_instance = sqlalchemy.Column('nova_instance', sqlalchemy.String(255))
     # odd name as "metadata" is reserved
     rsrc_metadata = sqlalchemy.Column('rsrc_metadata', types.Json)
+    rsrc_metadata_version = sqlalchemy.Column(sqlalchemy.Integer, default=0)
 
     stack_id = sqlalchemy.Column(sqlalchemy.String(36),
                                  sqlalchemy.ForeignKey('stack.id'),
@@ -298,6 +311,7 @@ class Resource(BASE, HeatBase, StateAware):
     # created/modified. (bug #1193269)
     updated_at = sqlalchemy.Column(sqlalchemy.DateTime)
     properties_data = sqlalchemy.Column('properties_data', types.Json)
+    definition_digest = sqlalchemy.Column(sqlalchemy.String(64))
     engine_id = sqlalchemy.Column(sqlalchemy.String(36))
     atomic_key = sqlalchemy.Column(sqlalchemy.Integer)
 
@@ -335,9 +349,16 @@ class WatchData(BASE, HeatBase):
     """Represents a watch_data created by the heat engine."""
 
     __tablename__ = 'watch_data'
+    __table_args__ = (
+        sqlalchemy.Index('ix_watch_data_namespace_metric_name',
+                         'namespace', 'metric_name',
+                         mysql_length={'namespace': 100,
+                                       'metric_name': 100}),)
 
     id = sqlalchemy.Column(sqlalchemy.Integer, primary_key=True)
     data = sqlalchemy.Column('data', types.Json)
+    namespace = sqlalchemy.Column(sqlalchemy.String(255))
+    metric_name = sqlalchemy.Column(sqlalchemy.String(255))
 
     watch_rule_id = sqlalchemy.Column(
         sqlalchemy.Integer,
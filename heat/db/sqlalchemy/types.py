@@ -31,6 +31,16 @@ class LongText(types.TypeDecorator):
             return self.impl
 
 
+class LongBlob(types.TypeDecorator):
+    impl = types.LargeBinary
+
+    def load_dialect_impl(self, dialect):
+        if dialect.name == 'mysql':
+            return dialect.type_descriptor(mysql.LONGBLOB())
+        else:
+            return self.impl
+
+
 class Json(LongText):
 
     def process_bind_param(self, value, dialect):
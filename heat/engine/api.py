@@ -209,6 +209,7 @@ def format_stack_resource(resource, detail=True, with_props=False,
     if detail:
         res[rpc_api.RES_DESCRIPTION] = resource.t.description
         res[rpc_api.RES_METADATA] = resource.metadata_get()
+        res[rpc_api.RES_DEFINITION_DIGEST] = resource.definition_digest()
         res[rpc_api.RES_SCHEMA_ATTRIBUTES] = format_resource_attributes(
             resource, with_attr)
 
@@ -315,14 +316,19 @@ def format_watch_data(wd):
     # We are expecting a dict with exactly two items, Namespace and
     # a metric key
     namespace = wd.data['Namespace']
-    metric = [(k, v) for k, v in wd.data.items() if k != 'Namespace']
-    if len(metric) == 1:
-        metric_name, metric_data = metric[0]
+    if wd.metric_name in wd.data:
+        metric_name = wd.metric_name
+        metric_data = wd.data[metric_name]
     else:
-        LOG.error(_LE("Unexpected number of keys in watch_data.data!"))
-        return
+        metric = [(k, v) for k, v in wd.data.items() if k != 'Namespace']
+        if len(metric) == 1:
+            metric_name, metric_data = metric[0]
+        else:
+            LOG.error(_LE("Unexpected number of keys in watch_data.data!"))
+            return
 
     result = {
+        rpc_api.WATCH_DATA_ID: wd.id,
         rpc_api.WATCH_DATA_ALARM: wd.watch_rule.name,
         rpc_api.WATCH_DATA_METRIC: metric_name,
         rpc_api.WATCH_DATA_TIME: timeutils.isotime(wd.created_at),
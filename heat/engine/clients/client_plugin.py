@@ -17,11 +17,11 @@ from keystoneclient import auth
 from keystoneclient.auth.identity import v2
 from keystoneclient.auth.identity import v3
 from keystoneclient import exceptions
-from keystoneclient import session
 from oslo_config import cfg
 import six
 
 from heat.common import context
+from heat.common import http_sessions
 from heat.common.i18n import _
 
 
@@ -38,22 +38,32 @@ class ClientPlugin(object):
         self._client = None
         self._keystone_session_obj = None
 
+    def _ssl_options(self, client):
+        return {'cacert': self._get_client_option(client, 'ca_file'),
+                'insecure': self._get_client_option(client, 'insecure'),
+                'cert': self._get_client_option(client, 'cert_file'),
+                'key': self._get_client_option(client, 'key_file')}
+
     @property
     def _keystone_session(self):
-        # FIXME(jamielennox): This session object is essentially static as the
-        # options won't change. Further it is allowed to be shared by multiple
-        # authentication requests so there is no reason to construct it fresh
-        # for every client plugin. It should be global and shared amongst them.
+        # The session object itself is per plugin, since some plugins set
+        # its auth, but the underlying HTTP connections are pooled and shared
+        # by every plugin in the process.
         if not self._keystone_session_obj:
-            o = {'cacert': self._get_client_option('keystone', 'ca_file'),
-                 'insecure': self._get_client_option('keystone', 'insecure'),
-                 'cert': self._get_client_option('keystone', 'cert_file'),
-                 'key': self._get_client_option('keystone', 'key_file')}
-
-            self._keystone_session_obj = session.Session.construct(o)
+            self._keystone_session_obj = http_sessions.get_session(
+                **self._ssl_options('keystone'))
 
         return self._keystone_session_obj
 
+    def _client_session(self, client):
+        '''Return a session for the API calls of a client.
+
+        The session is authenticated by the context, and its HTTP connections
+        are pooled and shared by every client with the same SSL options.
+        '''
+        return http_sessions.get_session(auth=self.context.auth_plugin,
+                                         **self._ssl_options(client))
+
     def client(self):
         if not self._client:
             self._client = self._create()
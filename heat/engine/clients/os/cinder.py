@@ -21,6 +21,7 @@ from heat.common import exception
 from heat.common.i18n import _
 from heat.common.i18n import _LI
 from heat.engine.clients import client_plugin
+from heat.engine.clients import status_poller
 from heat.engine import constraints
 
 
@@ -48,8 +49,6 @@ class CinderClientPlugin(client_plugin.ClientPlugin):
 
     def _create(self):
 
-        con = self.context
-
         volume_api_version = self.get_volume_api_version()
         if volume_api_version == 1:
             service_type = 'volume'
@@ -63,25 +62,18 @@ class CinderClientPlugin(client_plugin.ClientPlugin):
                  volume_api_version)
 
         endpoint_type = self._get_client_option('cinder', 'endpoint_type')
+        management_url = self.url_for(service_type=service_type,
+                                      endpoint_type=endpoint_type)
         args = {
+            'session': self._client_session('cinder'),
             'service_type': service_type,
-            'auth_url': con.auth_url or '',
-            'project_id': con.tenant,
-            'username': None,
-            'api_key': None,
             'endpoint_type': endpoint_type,
+            'endpoint_override': management_url,
             'http_log_debug': self._get_client_option('cinder',
-                                                      'http_log_debug'),
-            'cacert': self._get_client_option('cinder', 'ca_file'),
-            'insecure': self._get_client_option('cinder', 'insecure')
+                                                      'http_log_debug')
         }
 
         client = cc.Client(client_version, **args)
-        management_url = self.url_for(service_type=service_type,
-                                      endpoint_type=endpoint_type)
-        client.client.auth_token = self.auth_token
-        client.client.management_url = management_url
-
         client.volume_api_version = volume_api_version
 
         return client
@@ -94,6 +86,18 @@ class CinderClientPlugin(client_plugin.ClientPlugin):
                      {'volume': volume, 'ex': ex})
             raise exception.VolumeNotFound(volume=volume)
 
+    def poll_volume(self, volume_id):
+        """Return the volume for checking its progress.
+
+        The volume comes from a listing of the tenant's volumes shared with
+        the other resources waiting on volumes, when possible.
+        """
+        poller = status_poller.get_poller(VolumeStatusPoller, self.context)
+        listed = poller and poller.get(self.client(), volume_id)
+        if listed is None:
+            return self.client().volumes.get(volume_id)
+        return listed
+
     def get_volume_snapshot(self, snapshot):
         try:
             return self.client().volume_snapshots.get(snapshot)
@@ -128,6 +132,13 @@ class CinderClientPlugin(client_plugin.ClientPlugin):
                 ex.code == 409)
 
 
+class VolumeStatusPoller(status_poller.BulkStatusPoller):
+    """Polls the status of a tenant's volumes with one detailed listing."""
+
+    def _list(self, client):
+        return client.volumes.list(detailed=True)
+
+
 class VolumeConstraint(constraints.BaseCustomConstraint):
 
     expected_exceptions = (exception.VolumeNotFound,)
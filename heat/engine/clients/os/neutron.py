@@ -11,6 +11,8 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import collections
+
 import netaddr
 import six
 
@@ -29,22 +31,23 @@ class NeutronClientPlugin(client_plugin.ClientPlugin):
 
     exceptions_module = exceptions
 
-    def _create(self):
+    def __init__(self, context):
+        super(NeutronClientPlugin, self).__init__(context)
+        self._queued_ids = collections.defaultdict(set)
+        self._resolved_ids = {}
+        self._security_groups = None
 
-        con = self.context
+    def _create(self):
 
         endpoint_type = self._get_client_option('neutron', 'endpoint_type')
         endpoint = self.url_for(service_type='network',
                                 endpoint_type=endpoint_type)
 
         args = {
-            'auth_url': con.auth_url,
+            'session': self._client_session('neutron'),
             'service_type': 'network',
-            'token': self.auth_token,
-            'endpoint_url': endpoint,
             'endpoint_type': endpoint_type,
-            'ca_cert': self._get_client_option('neutron', 'ca_file'),
-            'insecure': self._get_client_option('neutron', 'insecure')
+            'endpoint_override': endpoint
         }
 
         return nc.Client(**args)
@@ -70,9 +73,63 @@ class NeutronClientPlugin(client_plugin.ClientPlugin):
     def is_no_unique(self, ex):
         return isinstance(ex, exceptions.NeutronClientNoUniqueMatch)
 
+    def queue_resource_ids(self, key_type, identifiers):
+        """Queue names or ids of resources to be resolved in one batch.
+
+        The next lookup of a resource of the given type resolves everything
+        queued for that type with at most two filtered list calls (one call
+        listing all of them for security groups). The results are kept by
+        this plugin, and so shared by every resource of the stack operation.
+        """
+        if key_type == 'security_group':
+            if self._security_groups is not None:
+                return
+            identifiers = [i for i in identifiers
+                           if not uuidutils.is_uuid_like(i)]
+        self._queued_ids[key_type].update(
+            i for i in identifiers
+            if i and (key_type, i) not in self._resolved_ids)
+
+    def _resolve_queued(self, key_type):
+        pending = self._queued_ids.pop(key_type, None)
+        if not pending:
+            return
+
+        if key_type == 'security_group':
+            response = self.client().list_security_groups()
+            self._security_groups = response['security_groups']
+            return
+
+        collection = '%ss' % key_type
+        list_resources = getattr(self.client(), 'list_%s' % collection)
+
+        ids = [i for i in pending if uuidutils.is_uuid_like(i)]
+        if ids:
+            response = list_resources(id=ids, fields=['id'])
+            for res in response[collection]:
+                self._resolved_ids[(key_type, res['id'])] = res['id']
+                pending.discard(res['id'])
+
+        if pending:
+            response = list_resources(name=list(pending),
+                                      fields=['id', 'name'])
+            matches = collections.defaultdict(list)
+            for res in response[collection]:
+                matches[res['name']].append(res['id'])
+            for name, res_ids in six.iteritems(matches):
+                # Missing and ambiguous names are left to be reported by
+                # the individual lookup
+                if name in pending and len(res_ids) == 1:
+                    self._resolved_ids[(key_type, name)] = res_ids[0]
+
     def find_neutron_resource(self, props, key, key_type):
-        return neutronV20.find_resourceid_by_name_or_id(
-            self.client(), key_type, props.get(key))
+        name_or_id = props.get(key)
+        self._resolve_queued(key_type)
+        res_id = self._resolved_ids.get((key_type, name_or_id))
+        if res_id is None:
+            res_id = neutronV20.find_resourceid_by_name_or_id(
+                self.client(), key_type, name_or_id)
+        return res_id
 
     def _resolve(self, props, key, id_key, key_type):
         if props.get(key):
@@ -104,15 +161,22 @@ class NeutronClientPlugin(client_plugin.ClientPlugin):
         security_groups: List of security group names or UUIDs
         '''
         seclist = []
-        all_groups = None
+        self._resolve_queued('security_group')
+        # A group missing from the listing shared by the stack operation
+        # may have been created since, so look for it in a fresh listing
+        all_groups = self._security_groups or []
+        fresh = False
         for sg in security_groups:
             if uuidutils.is_uuid_like(sg):
                 seclist.append(sg)
             else:
-                if not all_groups:
+                same_name_groups = [g for g in all_groups if g['name'] == sg]
+                if not same_name_groups and not fresh:
                     response = self.client().list_security_groups()
                     all_groups = response['security_groups']
-                same_name_groups = [g for g in all_groups if g['name'] == sg]
+                    fresh = True
+                    same_name_groups = [g for g in all_groups
+                                        if g['name'] == sg]
                 groups = [g['id'] for g in same_name_groups]
                 if len(groups) == 0:
                     raise exception.PhysicalResourceNotFound(resource_id=sg)
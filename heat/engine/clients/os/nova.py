@@ -13,27 +13,31 @@
 
 import collections
 import email
-from email.mime import multipart
 from email.mime import text
+import gzip
 import logging
 import os
 import pkgutil
 import string
+import uuid
 
 from novaclient import client as nc
 from novaclient import exceptions
 from novaclient import shell as novashell
 from oslo_config import cfg
 from oslo_serialization import jsonutils
+from oslo_utils import encodeutils
 from oslo_utils import netutils
 from oslo_utils import uuidutils
 import six
 from six.moves.urllib import parse as urlparse
 
+from heat.common import cache
 from heat.common import exception
 from heat.common.i18n import _
 from heat.common.i18n import _LW
 from heat.engine.clients import client_plugin
+from heat.engine.clients import status_poller
 from heat.engine import constraints
 from heat.engine import scheduler
 
@@ -67,24 +71,16 @@ class NovaClientPlugin(client_plugin.ClientPlugin):
         extensions = computeshell._discover_extensions(NOVACLIENT_VERSION)
 
         args = {
-            'project_id': self.context.tenant,
-            'auth_url': self.context.auth_url,
+            'session': self._client_session('nova'),
             'service_type': 'compute',
-            'username': None,
-            'api_key': None,
             'extensions': extensions,
             'endpoint_type': endpoint_type,
+            'endpoint_override': management_url,
             'http_log_debug': self._get_client_option('nova',
-                                                      'http_log_debug'),
-            'cacert': self._get_client_option('nova', 'ca_file'),
-            'insecure': self._get_client_option('nova', 'insecure')
+                                                      'http_log_debug')
         }
 
-        client = nc.Client(NOVACLIENT_VERSION, **args)
-        client.client.auth_token = self.auth_token
-        client.client.management_url = management_url
-
-        return client
+        return nc.Client(NOVACLIENT_VERSION, **args)
 
     def is_not_found(self, ex):
         return isinstance(ex, exceptions.NotFound)
@@ -110,7 +106,7 @@ class NovaClientPlugin(client_plugin.ClientPlugin):
         API errors.
         '''
         try:
-            server.get()
+            self._fetch_server(server)
         except exceptions.OverLimit as exc:
             LOG.warn(_LW("Server %(name)s (%(id)s) received an OverLimit "
                          "response during server.get(): %(exception)s"),
@@ -129,6 +125,21 @@ class NovaClientPlugin(client_plugin.ClientPlugin):
             else:
                 raise
 
+    def _fetch_server(self, server):
+        poller = status_poller.get_poller(ServerStatusPoller, self.context)
+        listed = poller and poller.get(self.client(), server.id)
+        if listed is None:
+            server.get()
+        else:
+            server._add_details(listed._info)
+
+    def _server_changed(self, server):
+        # Listings made before a resize or rebuild was accepted still show
+        # the server ACTIVE, which would end the wait for it early.
+        poller = status_poller.get_poller(ServerStatusPoller, self.context)
+        if poller:
+            poller.changed(server.id)
+
     def get_ip(self, server, net_type, ip_version):
         """Return the server's IP of the given type and version."""
         if net_type in server.addresses:
@@ -194,108 +205,18 @@ class NovaClientPlugin(client_plugin.ClientPlugin):
         :type instance_user: string
         :param user_data_format: Format of user data to return
         :type user_data_format: string
-        :returns: multipart mime as a string
+        :returns: multipart mime as a string, gzipped if the
+                  compress_userdata option is set
         '''
 
         if user_data_format == 'RAW':
             return userdata
 
-        is_cfntools = user_data_format == 'HEAT_CFNTOOLS'
-        is_software_config = user_data_format == 'SOFTWARE_CONFIG'
-
-        def make_subpart(content, filename, subtype=None):
-            if subtype is None:
-                subtype = os.path.splitext(filename)[0]
-            msg = text.MIMEText(content, _subtype=subtype)
-            msg.add_header('Content-Disposition', 'attachment',
-                           filename=filename)
-            return msg
-
-        def read_cloudinit_file(fn):
-            return pkgutil.get_data('heat', 'cloudinit/%s' % fn)
-
-        if instance_user:
-            config_custom_user = 'user: %s' % instance_user
-            # FIXME(shadower): compatibility workaround for cloud-init 0.6.3.
-            # We can drop this once we stop supporting 0.6.3 (which ships
-            # with Ubuntu 12.04 LTS).
-            #
-            # See bug https://bugs.launchpad.net/heat/+bug/1257410
-            boothook_custom_user = r"""useradd -m %s
-echo -e '%s\tALL=(ALL)\tNOPASSWD: ALL' >> /etc/sudoers
-""" % (instance_user, instance_user)
-        else:
-            config_custom_user = ''
-            boothook_custom_user = ''
-
-        cloudinit_config = string.Template(
-            read_cloudinit_file('config')).safe_substitute(
-                add_custom_user=config_custom_user)
-        cloudinit_boothook = string.Template(
-            read_cloudinit_file('boothook.sh')).safe_substitute(
-                add_custom_user=boothook_custom_user)
-
-        attachments = [(cloudinit_config, 'cloud-config'),
-                       (cloudinit_boothook, 'boothook.sh', 'cloud-boothook'),
-                       (read_cloudinit_file('part_handler.py'),
-                        'part-handler.py')]
-
-        if is_cfntools:
-            attachments.append((userdata, 'cfn-userdata', 'x-cfninitdata'))
-        elif is_software_config:
-            # attempt to parse userdata as a multipart message, and if it
-            # is, add each part as an attachment
-            userdata_parts = None
-            try:
-                userdata_parts = email.message_from_string(userdata)
-            except Exception:
-                pass
-            if userdata_parts and userdata_parts.is_multipart():
-                for part in userdata_parts.get_payload():
-                    attachments.append((part.get_payload(),
-                                        part.get_filename(),
-                                        part.get_content_subtype()))
-            else:
-                attachments.append((userdata, 'userdata', 'x-shellscript'))
-
-        if is_cfntools:
-            attachments.append((read_cloudinit_file('loguserdata.py'),
-                               'loguserdata.py', 'x-shellscript'))
-
-        if metadata:
-            attachments.append((jsonutils.dumps(metadata),
-                                'cfn-init-data', 'x-cfninitdata'))
-
-        attachments.append((cfg.CONF.heat_watch_server_url,
-                            'cfn-watch-server', 'x-cfninitdata'))
-
-        if is_cfntools:
-            attachments.append((cfg.CONF.heat_metadata_server_url,
-                                'cfn-metadata-server', 'x-cfninitdata'))
-
-            # Create a boto config which the cfntools on the host use to know
-            # where the cfn and cw API's are to be accessed
-            cfn_url = urlparse.urlparse(cfg.CONF.heat_metadata_server_url)
-            cw_url = urlparse.urlparse(cfg.CONF.heat_watch_server_url)
-            is_secure = cfg.CONF.instance_connection_is_secure
-            vcerts = cfg.CONF.instance_connection_https_validate_certificates
-            boto_cfg = "\n".join(["[Boto]",
-                                  "debug = 0",
-                                  "is_secure = %s" % is_secure,
-                                  "https_validate_certificates = %s" % vcerts,
-                                  "cfn_region_name = heat",
-                                  "cfn_region_endpoint = %s" %
-                                  cfn_url.hostname,
-                                  "cloudwatch_region_name = heat",
-                                  "cloudwatch_region_endpoint = %s" %
-                                  cw_url.hostname])
-            attachments.append((boto_cfg,
-                                'cfn-boto-cfg', 'x-cfninitdata'))
-
-        subparts = [make_subpart(*args) for args in attachments]
-        mime_blob = multipart.MIMEMultipart(_subparts=subparts)
-
-        return mime_blob.as_string()
+        mime_blob = build_multipart_userdata(metadata, userdata,
+                                             instance_user, user_data_format)
+        if cfg.CONF.compress_userdata:
+            return _compress(mime_blob)
+        return mime_blob
 
     def delete_server(self, server):
         '''
@@ -347,6 +268,7 @@ echo -e '%s\tALL=(ALL)\tNOPASSWD: ALL' >> /etc/sudoers
         Verify that a resizing server is properly resized.
         If that's the case, confirm the resize, if not raise an error.
         """
+        self._server_changed(server)
         self.refresh_server(server)
         while server.status == 'RESIZE':
             yield
@@ -371,6 +293,7 @@ echo -e '%s\tALL=(ALL)\tNOPASSWD: ALL' >> /etc/sudoers
         Verify that a rebuilding server is rebuilt.
         Raise error if it ends up in an ERROR state.
         """
+        self._server_changed(server)
         self.refresh_server(server)
         while server.status == 'REBUILD':
             yield
@@ -496,6 +419,13 @@ echo -e '%s\tALL=(ALL)\tNOPASSWD: ALL' >> /etc/sudoers
         return net_id
 
 
+class ServerStatusPoller(status_poller.BulkStatusPoller):
+    """Polls the status of a tenant's servers with one detailed listing."""
+
+    def _list(self, client):
+        return client.servers.list(detailed=True)
+
+
 class ServerConstraint(constraints.BaseCustomConstraint):
 
     expected_exceptions = (exception.ServerNotFound,)
@@ -522,3 +452,174 @@ class FlavorConstraint(constraints.BaseCustomConstraint):
 
     def validate_with_client(self, client, flavor):
         client.client_plugin('nova').get_flavor_id(flavor)
+
+
+USERDATA_SKELETON_CACHE_SIZE = 32
+
+_userdata_skeleton_cache = None
+
+UserdataSkeleton = collections.namedtuple('UserdataSkeleton',
+                                          ['head', 'middle', 'tail'])
+
+
+def _make_subpart(content, filename, subtype=None):
+    if subtype is None:
+        subtype = os.path.splitext(filename)[0]
+    msg = text.MIMEText(content, _subtype=subtype)
+    msg.add_header('Content-Disposition', 'attachment',
+                   filename=filename)
+    return msg.as_string()
+
+
+def _read_cloudinit_file(fn):
+    return pkgutil.get_data('heat', 'cloudinit/%s' % fn)
+
+
+def _render_userdata_skeleton(instance_user, is_cfntools):
+    if instance_user:
+        config_custom_user = 'user: %s' % instance_user
+        # FIXME(shadower): compatibility workaround for cloud-init 0.6.3.
+        # We can drop this once we stop supporting 0.6.3 (which ships
+        # with Ubuntu 12.04 LTS).
+        #
+        # See bug https://bugs.launchpad.net/heat/+bug/1257410
+        boothook_custom_user = r"""useradd -m %s
+echo -e '%s\tALL=(ALL)\tNOPASSWD: ALL' >> /etc/sudoers
+""" % (instance_user, instance_user)
+    else:
+        config_custom_user = ''
+        boothook_custom_user = ''
+
+    cloudinit_config = string.Template(
+        _read_cloudinit_file('config')).safe_substitute(
+            add_custom_user=config_custom_user)
+    cloudinit_boothook = string.Template(
+        _read_cloudinit_file('boothook.sh')).safe_substitute(
+            add_custom_user=boothook_custom_user)
+
+    head = [_make_subpart(cloudinit_config, 'cloud-config'),
+            _make_subpart(cloudinit_boothook, 'boothook.sh',
+                          'cloud-boothook'),
+            _make_subpart(_read_cloudinit_file('part_handler.py'),
+                          'part-handler.py')]
+
+    middle = []
+    if is_cfntools:
+        middle.append(_make_subpart(_read_cloudinit_file('loguserdata.py'),
+                                    'loguserdata.py', 'x-shellscript'))
+
+    tail = [_make_subpart(cfg.CONF.heat_watch_server_url,
+                          'cfn-watch-server', 'x-cfninitdata')]
+
+    if is_cfntools:
+        tail.append(_make_subpart(cfg.CONF.heat_metadata_server_url,
+                                  'cfn-metadata-server', 'x-cfninitdata'))
+
+        # Create a boto config which the cfntools on the host use to know
+        # where the cfn and cw API's are to be accessed
+        cfn_url = urlparse.urlparse(cfg.CONF.heat_metadata_server_url)
+        cw_url = urlparse.urlparse(cfg.CONF.heat_watch_server_url)
+        is_secure = cfg.CONF.instance_connection_is_secure
+        vcerts = cfg.CONF.instance_connection_https_validate_certificates
+        boto_cfg = "\n".join(["[Boto]",
+                              "debug = 0",
+                              "is_secure = %s" % is_secure,
+                              "https_validate_certificates = %s" % vcerts,
+                              "cfn_region_name = heat",
+                              "cfn_region_endpoint = %s" %
+                              cfn_url.hostname,
+                              "cloudwatch_region_name = heat",
+                              "cloudwatch_region_endpoint = %s" %
+                              cw_url.hostname])
+        tail.append(_make_subpart(boto_cfg, 'cfn-boto-cfg', 'x-cfninitdata'))
+
+    return UserdataSkeleton(tuple(head), tuple(middle), tuple(tail))
+
+
+def _userdata_skeleton(instance_user, is_cfntools):
+    """Return the rendered parts of the user data common to many servers.
+
+    Everything except the user's own data and the resource metadata depends
+    only on the instance user, the format and the server URL configuration,
+    so it is rendered once and shared by every server with the same values.
+    """
+    global _userdata_skeleton_cache
+    if _userdata_skeleton_cache is None:
+        _userdata_skeleton_cache = cache.LRUCache(
+            USERDATA_SKELETON_CACHE_SIZE)
+
+    key = (instance_user, is_cfntools,
+           cfg.CONF.heat_watch_server_url,
+           cfg.CONF.heat_metadata_server_url,
+           cfg.CONF.instance_connection_is_secure,
+           cfg.CONF.instance_connection_https_validate_certificates)
+    skeleton = _userdata_skeleton_cache.get(key)
+    if skeleton is None:
+        skeleton = _render_userdata_skeleton(instance_user, is_cfntools)
+        _userdata_skeleton_cache.set(key, skeleton)
+    return skeleton
+
+
+def _join_subparts(subparts):
+    """Join rendered MIME parts into a single multipart/mixed message."""
+    boundary = None
+    while boundary is None or any(boundary in part for part in subparts):
+        boundary = '=' * 15 + uuid.uuid4().hex + '=='
+
+    lines = ['Content-Type: multipart/mixed; boundary="%s"' % boundary,
+             'MIME-Version: 1.0',
+             '']
+    for part in subparts:
+        lines.append('--' + boundary)
+        lines.append(part)
+    lines.append('--%s--' % boundary)
+    return '\n'.join(lines)
+
+
+def build_multipart_userdata(metadata, userdata, instance_user,
+                             user_data_format):
+    """Return the multipart MIME user data for a non-RAW format."""
+    is_cfntools = user_data_format == 'HEAT_CFNTOOLS'
+    is_software_config = user_data_format == 'SOFTWARE_CONFIG'
+
+    skeleton = _userdata_skeleton(instance_user, is_cfntools)
+
+    subparts = list(skeleton.head)
+    if is_cfntools:
+        subparts.append(_make_subpart(userdata, 'cfn-userdata',
+                                      'x-cfninitdata'))
+    elif is_software_config:
+        # attempt to parse userdata as a multipart message, and if it
+        # is, add each part as an attachment
+        userdata_parts = None
+        try:
+            userdata_parts = email.message_from_string(userdata)
+        except Exception:
+            pass
+        if userdata_parts and userdata_parts.is_multipart():
+            for part in userdata_parts.get_payload():
+                subparts.append(_make_subpart(
+                    part.get_payload(),
+                    part.get_filename(),
+                    part.get_content_subtype()))
+        else:
+            subparts.append(_make_subpart(userdata, 'userdata',
+                                          'x-shellscript'))
+
+    subparts.extend(skeleton.middle)
+
+    if metadata:
+        subparts.append(_make_subpart(jsonutils.dumps(metadata),
+                                      'cfn-init-data', 'x-cfninitdata'))
+
+    subparts.extend(skeleton.tail)
+
+    return _join_subparts(subparts)
+
+
+def _compress(data):
+    buf = six.BytesIO()
+    # A fixed mtime keeps the compressed data stable for the same input
+    with gzip.GzipFile(fileobj=buf, mode='wb', mtime=0) as gz:
+        gz.write(encodeutils.safe_encode(data))
+    return buf.getvalue()
@@ -0,0 +1,177 @@
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Shared bulk status polling of the resources of a tenant.
+
+Resources waiting for a server or volume to change state normally fetch
+it individually on every scheduler step. A poller instead answers all such
+requests for a tenant and region from a single listing, made at most once
+per bulk_status_poll_interval, so the number of API calls no longer grows
+with the number of resources in progress.
+"""
+
+import abc
+import time
+
+from eventlet import semaphore
+from oslo_config import cfg
+from oslo_log import log as logging
+import six
+
+from heat.common import cache
+
+cfg.CONF.import_opt('bulk_status_poll_interval', 'heat.common.config')
+
+LOG = logging.getLogger(__name__)
+
+MAX_POLLERS = 128
+
+# Number of resources which must be waiting at the same time for a shared
+# listing to be worth making
+MIN_WAITERS = 2
+
+# Seconds between logging how many API calls each poller has saved
+STATS_LOG_INTERVAL = 60
+
+_pollers = None
+
+
+@six.add_metaclass(abc.ABCMeta)
+class BulkStatusPoller(object):
+    """Answers status requests for single resources from bulk listings.
+
+    A new listing is made at most once per interval. A listing is only used
+    to answer for a resource if it was started after the listing which last
+    answered for that same resource, and after the last change requested to
+    it, so that every poll of a resource sees newer data than the one before
+    it. When the current listing cannot be used for a resource, or the
+    resource is missing from it (e.g. created since, deleted or beyond the
+    API's page size), None is reported and the caller should fetch the
+    resource individually. So is every resource while fewer than
+    MIN_WAITERS are being polled, since a listing would then cost more than
+    the individual requests it saves.
+    """
+
+    def __init__(self, interval):
+        self.interval = interval
+        self._lock = semaphore.Semaphore()
+        self._listing = {}
+        self._listed_at = None
+        self._last_seen = {}
+        self._waiters = {}
+        self._stats = {'requests': 0, 'list_calls': 0, 'misses': 0}
+        self._reported = self.stats()
+        self._reported_at = time.time()
+
+    @abc.abstractmethod
+    def _list(self, client):
+        """Return every resource of the tenant, with details."""
+        pass
+
+    def _is_current(self, now):
+        return (self._listed_at is not None and
+                now - self._listed_at < self.interval)
+
+    def _is_newer(self, resource_id):
+        return self._listed_at > self._last_seen.get(resource_id, 0)
+
+    def _refresh(self, client):
+        listed_at = time.time()
+        listing = dict((item.id, item) for item in self._list(client))
+        self._stats['list_calls'] += 1
+
+        # Forget about resources which are no longer being polled
+        expired = listed_at - 10 * self.interval
+        self._last_seen = dict((k, v) for k, v in self._last_seen.items()
+                               if v > expired)
+        self._waiters = dict((k, v) for k, v in self._waiters.items()
+                             if v > expired)
+        self._listing = listing
+        self._listed_at = listed_at
+        self._report_stats(listed_at)
+
+    def _report_stats(self, now):
+        if now - self._reported_at < STATS_LOG_INTERVAL:
+            return
+        stats = self.stats()
+        window = dict((k, v - self._reported[k]) for k, v in stats.items())
+        window.update(poller=type(self).__name__,
+                      seconds=now - self._reported_at)
+        LOG.debug('%(poller)s answered %(requests)d status requests with '
+                  '%(list_calls)d listings and %(misses)d individual '
+                  'requests in the last %(seconds)d seconds, saving '
+                  '%(calls_saved)d API calls' % window)
+        self._reported = stats
+        self._reported_at = now
+
+    def get(self, client, resource_id):
+        """Return the listed resource with the given id, or None."""
+        self._stats['requests'] += 1
+        with self._lock:
+            now = time.time()
+            self._waiters[resource_id] = now
+            if len(self._waiters) < MIN_WAITERS:
+                self._stats['misses'] += 1
+                return None
+
+            if not self._is_current(now):
+                self._refresh(client)
+
+            item = None
+            if self._is_newer(resource_id):
+                item = self._listing.get(resource_id)
+            if item is None:
+                self._stats['misses'] += 1
+            else:
+                self._last_seen[resource_id] = self._listed_at
+            return item
+
+    def changed(self, resource_id):
+        """Note that a change to the resource was just requested.
+
+        Listings started before now would show the resource as it was before
+        the change, so they are no longer used to answer for it.
+        """
+        with self._lock:
+            self._last_seen[resource_id] = time.time()
+
+    def stats(self):
+        """Return the request counters, and how many API calls were saved.
+
+        Every request would otherwise have been one API call; misses still
+        cost one, in addition to the listings.
+        """
+        stats = dict(self._stats)
+        stats['calls_saved'] = (stats['requests'] - stats['list_calls'] -
+                                stats['misses'])
+        return stats
+
+
+def get_poller(poller_class, context):
+    """Return the shared poller of the class for the context's tenant.
+
+    Returns None if bulk polling is disabled.
+    """
+    global _pollers
+    interval = cfg.CONF.bulk_status_poll_interval
+    if interval <= 0:
+        return None
+    if _pollers is None:
+        _pollers = cache.LRUCache(MAX_POLLERS)
+
+    key = (poller_class.__name__, context.tenant_id, context.region_name)
+    poller = _pollers.get(key)
+    if poller is None:
+        poller = poller_class(interval)
+        _pollers.set(key, poller)
+    return poller
@@ -183,6 +183,36 @@ class ResourceRegistry(object):
         self._registry = {'resources': {}}
         self.global_registry = global_registry
         self.environment = env
+        self._version = 0
+        self._glob_index = None
+        self._lookup_cache = {}
+        self._lookup_cache_version = None
+
+    def _invalidate_index(self):
+        """Discard the lookup index after any change to the registry."""
+        self._version += 1
+        self._glob_index = None
+        self._lookup_cache = {}
+
+    def _globs(self):
+        """Return the (memoized) list of wildcard entries in the registry."""
+        if self._glob_index is None:
+            self._glob_index = [info for name, info
+                                in six.iteritems(self._registry)
+                                if name.endswith('*') and
+                                isinstance(info, ResourceInfo)]
+        return self._glob_index
+
+    def _versions(self):
+        if self.global_registry is None:
+            return self._version, None
+        return self._version, self.global_registry._version
+
+    def _has_name_overrides(self, resource_name):
+        if resource_name in self._registry['resources']:
+            return True
+        return (self.global_registry is not None and
+                resource_name in self.global_registry._registry['resources'])
 
     def load(self, json_snippet):
         self._load_registry([], json_snippet)
@@ -204,6 +234,7 @@ class ResourceRegistry(object):
                                     ResourceInfo(self, path + [k], v))
 
     def _register_hook(self, path, hook):
+        self._invalidate_index()
         name = path[-1]
         registry = self._registry
         for key in path[:-1]:
@@ -241,6 +272,7 @@ class ResourceRegistry(object):
                     'item': name,
                     'path': descriptive_path})
                 registry.pop(name, None)
+            self._invalidate_index()
             return
 
         if name in registry and isinstance(registry[name], ResourceInfo):
@@ -264,6 +296,7 @@ class ResourceRegistry(object):
 
         info.user_resource = (self.global_registry is not None)
         registry[name] = info
+        self._invalidate_index()
 
     def remove_item(self, info):
         if not isinstance(info, TemplateResourceInfo):
@@ -274,6 +307,7 @@ class ResourceRegistry(object):
             registry = registry[key]
         if info.path[-1] in registry:
             registry.pop(info.path[-1])
+            self._invalidate_index()
 
     def matches_hook(self, resource_name, hook):
         '''Return whether a resource have a hook set in the environment.
@@ -321,6 +355,7 @@ class ResourceRegistry(object):
         if resource_name in ress:
             new_resources.update(ress[resource_name])
         self._registry['resources'] = new_resources
+        self._invalidate_index()
 
     def iterable_by(self, resource_type, resource_name=None):
         is_templ_type = resource_type.endswith(('.yaml', '.template'))
@@ -346,12 +381,9 @@ class ResourceRegistry(object):
             yield impl
 
         # handle: "OS::*" -> "Dreamhost::*"
-        def is_a_glob(resource_type):
-            return resource_type.endswith('*')
-        globs = six.moves.filter(is_a_glob, six.iterkeys(self._registry))
-        for pattern in globs:
-            if self._registry[pattern].matches(resource_type):
-                yield self._registry[pattern]
+        for info in self._globs():
+            if info.matches(resource_type):
+                yield info
 
     def get_resource_info(self, resource_type, resource_name=None,
                           registry_type=None):
@@ -372,6 +404,32 @@ class ResourceRegistry(object):
         #    - filter_by(is_user=False)
         # 4) as_dict() to write to the db
         #    - filter_by(is_user=True)
+        #
+        # The result only depends on the contents of this registry and the
+        # global one, so it is memoized until either of them changes. Resource
+        # names only matter if they have an entry under "resources", so other
+        # names share a single cache entry.
+        versions = self._versions()
+        if self._lookup_cache_version != versions:
+            self._lookup_cache = {}
+            self._lookup_cache_version = versions
+
+        if resource_name and self._has_name_overrides(resource_name):
+            cache_key = (resource_type, resource_name, registry_type)
+        else:
+            cache_key = (resource_type, None, registry_type)
+
+        try:
+            return self._lookup_cache[cache_key]
+        except KeyError:
+            match = self._find_resource_info(resource_type, resource_name,
+                                             registry_type)
+            if self._lookup_cache_version == self._versions():
+                self._lookup_cache[cache_key] = match
+            return match
+
+    def _find_resource_info(self, resource_type, resource_name,
+                            registry_type):
         if self.global_registry is not None:
             giter = self.global_registry.iterable_by(resource_type,
                                                      resource_name)
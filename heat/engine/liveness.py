@@ -0,0 +1,134 @@
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import datetime
+
+from eventlet import greenpool
+from oslo_config import cfg
+from oslo_log import log as logging
+import oslo_messaging as messaging
+from oslo_utils import timeutils
+
+from heat.common import cache
+from heat.common import messaging as rpc_messaging
+from heat.objects import service as service_objects
+from heat.rpc import api as rpc_api
+
+cfg.CONF.import_opt('engine_life_check_timeout', 'heat.common.config')
+cfg.CONF.import_opt('periodic_interval', 'heat.common.config')
+
+LOG = logging.getLogger(__name__)
+
+
+class EngineLivenessRegistry(object):
+    """Answers whether engines are alive, based on their heartbeats.
+
+    Every engine reports to the service table each periodic_interval. An
+    engine which has missed many more reports than a busy engine or a
+    database outage could explain is dead, and all of those are identified
+    with a single query. Engine ids are unique per process, so those are
+    remembered as dead for good.
+
+    Any other engine is asked directly over RPC, with the checks running
+    concurrently. A missed reply may be a transient failure, so it is only
+    remembered for a short while.
+    """
+
+    MAX_DEAD_ENGINES = 1000
+
+    # Number of missed reports after which an engine is certainly dead
+    DEAD_AFTER_REPORTS = 10
+
+    # Seconds for which an engine which did not reply is taken to be dead
+    UNRESPONSIVE_TTL = 10
+
+    def __init__(self):
+        self._dead = cache.LRUCache(self.MAX_DEAD_ENGINES)
+        self._unresponsive = cache.LRUCache(self.MAX_DEAD_ENGINES,
+                                            ttl=self.UNRESPONSIVE_TTL)
+
+    @staticmethod
+    def _listening(context, engine_id):
+        client = rpc_messaging.get_rpc_client(
+            version='1.0', topic=rpc_api.LISTENER_TOPIC,
+            server=engine_id)
+        client_context = client.prepare(
+            timeout=cfg.CONF.engine_life_check_timeout)
+        try:
+            return client_context.call(context, 'listening')
+        except messaging.MessagingTimeout:
+            return False
+
+    def _heartbeats(self, context, engine_ids):
+        """Return whether each engine with a service record may be alive.
+
+        Engines whose service records have not been updated for
+        DEAD_AFTER_REPORTS periodic intervals are dead. Whether a record is
+        deleted is not taken into account, because a record is soft-deleted
+        by the other engines after only a few missed reports, and a slow
+        engine undeletes it again with its next report.
+        """
+        time_line = timeutils.utcnow() - datetime.timedelta(
+            seconds=self.DEAD_AFTER_REPORTS * cfg.CONF.periodic_interval)
+        reporting = {}
+        for service in service_objects.Service.get_all_by_engine_ids(
+                context, engine_ids):
+            reported_at = service['updated_at'] or service['created_at']
+            recent = (reported_at is None or
+                      timeutils.normalize_time(reported_at) >= time_line)
+            engine_id = service['engine_id']
+            reporting[engine_id] = reporting.get(engine_id, False) or recent
+        return reporting
+
+    def engines_alive(self, context, engine_ids):
+        """Return a dict mapping each of the engine ids to its liveness."""
+        engine_ids = set(engine_ids)
+        alive = dict((engine_id, False) for engine_id in engine_ids
+                     if engine_id in self._dead or
+                     engine_id in self._unresponsive)
+
+        unknown = list(engine_ids - set(alive))
+        if unknown:
+            reporting = self._heartbeats(context, unknown)
+            to_check = []
+            for engine_id in unknown:
+                if reporting.get(engine_id, True):
+                    to_check.append(engine_id)
+                else:
+                    LOG.debug('Engine %s is dead' % engine_id)
+                    self._dead.set(engine_id, True)
+                    alive[engine_id] = False
+
+            pool = greenpool.GreenPool(max(len(to_check), 1))
+            checked = pool.imap(lambda e: self._listening(context, e),
+                                to_check)
+            for engine_id, is_alive in zip(to_check, checked):
+                if not is_alive:
+                    LOG.debug('Engine %s is not responding' % engine_id)
+                    self._unresponsive.set(engine_id, True)
+                alive[engine_id] = is_alive
+
+        return alive
+
+    def engine_alive(self, context, engine_id):
+        return self.engines_alive(context, [engine_id])[engine_id]
+
+
+_registry = None
+
+
+def registry():
+    global _registry
+    if _registry is None:
+        _registry = EngineLivenessRegistry()
+    return _registry
@@ -0,0 +1,61 @@
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Access to the engine service running in the current process.
+
+Nested stack operations started by a resource are normally sent over RPC,
+which serializes the child template, environment and files to the message
+bus only for them to be parsed again, often by the very same engine. While
+the engine in this process is lightly loaded it takes those operations
+in-process instead, and RPC is used only to spread the load over the other
+engines.
+"""
+
+from oslo_config import cfg
+from oslo_log import log as logging
+
+cfg.CONF.import_opt('max_in_process_stack_threads', 'heat.common.config')
+
+LOG = logging.getLogger(__name__)
+
+_engine = None
+
+
+def register(engine):
+    """Register the engine service started in this process."""
+    global _engine
+    _engine = engine
+
+
+def unregister(engine):
+    """Forget the engine service, which is stopping."""
+    global _engine
+    if _engine is engine:
+        _engine = None
+
+
+def get():
+    """
+    Return the engine service running in this process, or None if there is
+    none or it is too busy to take on more work.
+    """
+    engine = _engine
+    if engine is None or engine.thread_group_mgr is None:
+        return None
+
+    busy = engine.thread_group_mgr.thread_count()
+    if busy >= cfg.CONF.max_in_process_stack_threads:
+        LOG.debug('Engine has %d stack threads running, distributing '
+                  'nested stack operation over RPC' % busy)
+        return None
+    return engine
@@ -12,24 +12,17 @@
 #    under the License.
 """Utilities for Resources that use the OpenStack Nova API."""
 
-import email
-from email.mime import multipart
-from email.mime import text
-import os
-import pkgutil
-import string
 import warnings
 
 from novaclient import exceptions as nova_exceptions
-from oslo_config import cfg
 from oslo_log import log as logging
 from oslo_serialization import jsonutils
 import six
-from six.moves.urllib import parse as urlparse
 
 from heat.common import exception
 from heat.common.i18n import _
 from heat.common.i18n import _LW
+from heat.engine.clients.os import nova
 from heat.engine import scheduler
 
 LOG = logging.getLogger(__name__)
@@ -149,103 +142,8 @@ def build_userdata(resource, userdata=None, instance_user=None,
     if user_data_format == 'RAW':
         return userdata
 
-    is_cfntools = user_data_format == 'HEAT_CFNTOOLS'
-    is_software_config = user_data_format == 'SOFTWARE_CONFIG'
-
-    def make_subpart(content, filename, subtype=None):
-        if subtype is None:
-            subtype = os.path.splitext(filename)[0]
-        msg = text.MIMEText(content, _subtype=subtype)
-        msg.add_header('Content-Disposition', 'attachment',
-                       filename=filename)
-        return msg
-
-    def read_cloudinit_file(fn):
-        return pkgutil.get_data('heat', 'cloudinit/%s' % fn)
-
-    if instance_user:
-        config_custom_user = 'user: %s' % instance_user
-        # FIXME(shadower): compatibility workaround for cloud-init 0.6.3. We
-        # can drop this once we stop supporting 0.6.3 (which ships with Ubuntu
-        # 12.04 LTS).
-        #
-        # See bug https://bugs.launchpad.net/heat/+bug/1257410
-        boothook_custom_user = r"""useradd -m %s
-echo -e '%s\tALL=(ALL)\tNOPASSWD: ALL' >> /etc/sudoers
-""" % (instance_user, instance_user)
-    else:
-        config_custom_user = ''
-        boothook_custom_user = ''
-
-    cloudinit_config = string.Template(
-        read_cloudinit_file('config')).safe_substitute(
-            add_custom_user=config_custom_user)
-    cloudinit_boothook = string.Template(
-        read_cloudinit_file('boothook.sh')).safe_substitute(
-            add_custom_user=boothook_custom_user)
-
-    attachments = [(cloudinit_config, 'cloud-config'),
-                   (cloudinit_boothook, 'boothook.sh', 'cloud-boothook'),
-                   (read_cloudinit_file('part_handler.py'),
-                    'part-handler.py')]
-
-    if is_cfntools:
-        attachments.append((userdata, 'cfn-userdata', 'x-cfninitdata'))
-    elif is_software_config:
-        # attempt to parse userdata as a multipart message, and if it
-        # is, add each part as an attachment
-        userdata_parts = None
-        try:
-            userdata_parts = email.message_from_string(userdata)
-        except Exception:
-            pass
-        if userdata_parts and userdata_parts.is_multipart():
-            for part in userdata_parts.get_payload():
-                attachments.append((part.get_payload(),
-                                    part.get_filename(),
-                                    part.get_content_subtype()))
-        else:
-            attachments.append((userdata, 'userdata', 'x-shellscript'))
-
-    if is_cfntools:
-        attachments.append((read_cloudinit_file('loguserdata.py'),
-                           'loguserdata.py', 'x-shellscript'))
-
-    metadata = resource.metadata_get()
-    if metadata:
-        attachments.append((jsonutils.dumps(metadata),
-                            'cfn-init-data', 'x-cfninitdata'))
-
-    attachments.append((cfg.CONF.heat_watch_server_url,
-                        'cfn-watch-server', 'x-cfninitdata'))
-
-    if is_cfntools:
-        attachments.append((cfg.CONF.heat_metadata_server_url,
-                            'cfn-metadata-server', 'x-cfninitdata'))
-
-        # Create a boto config which the cfntools on the host use to know
-        # where the cfn and cw API's are to be accessed
-        cfn_url = urlparse.urlparse(cfg.CONF.heat_metadata_server_url)
-        cw_url = urlparse.urlparse(cfg.CONF.heat_watch_server_url)
-        is_secure = cfg.CONF.instance_connection_is_secure
-        vcerts = cfg.CONF.instance_connection_https_validate_certificates
-        boto_cfg = "\n".join(["[Boto]",
-                              "debug = 0",
-                              "is_secure = %s" % is_secure,
-                              "https_validate_certificates = %s" % vcerts,
-                              "cfn_region_name = heat",
-                              "cfn_region_endpoint = %s" %
-                              cfn_url.hostname,
-                              "cloudwatch_region_name = heat",
-                              "cloudwatch_region_endpoint = %s" %
-                              cw_url.hostname])
-        attachments.append((boto_cfg,
-                            'cfn-boto-cfg', 'x-cfninitdata'))
-
-    subparts = [make_subpart(*args) for args in attachments]
-    mime_blob = multipart.MIMEMultipart(_subparts=subparts)
-
-    return mime_blob.as_string()
+    return nova.build_multipart_userdata(resource.metadata_get(), userdata,
+                                         instance_user, user_data_format)
 
 
 def delete_server(server):
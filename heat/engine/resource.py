@@ -42,6 +42,7 @@ from heat.engine import resources
 from heat.engine import rsrc_defn
 from heat.engine import scheduler
 from heat.engine import support
+from heat.engine import throttling
 from heat.objects import resource as resource_objects
 from heat.objects import resource_data as resource_data_objects
 from heat.rpc import client as rpc_client
@@ -176,6 +177,7 @@ class Resource(object):
         self._data = {}
         self._rsrc_metadata = None
         self._stored_properties_data = None
+        self._definition_digest = None
         self.created_time = None
         self.updated_time = None
         self._rpc_client = None
@@ -211,6 +213,7 @@ class Resource(object):
             self._data = {}
         self._rsrc_metadata = resource.rsrc_metadata
         self._stored_properties_data = resource.properties_data
+        self._definition_digest = resource.definition_digest
         self.created_time = resource.created_at
         self.updated_time = resource.updated_at
         self.needed_by = resource.needed_by
@@ -281,7 +284,9 @@ class Resource(object):
         if self.id is None or self.action == self.INIT:
             raise exception.ResourceNotAvailable(resource_name=self.name)
         rs = resource_objects.Resource.get_obj(self.stack.context, self.id)
-        rs.update_and_save({'rsrc_metadata': metadata})
+        rs.update_and_save({'rsrc_metadata': metadata,
+                            'rsrc_metadata_version':
+                                (rs.rsrc_metadata_version or 0) + 1})
         self._rsrc_metadata = metadata
 
     @classmethod
@@ -374,6 +379,13 @@ class Resource(object):
             args = {}
         return self.t.freeze(**args)
 
+    def definition_digest(self):
+        '''
+        Return the digest of the definition, with resolved properties, that
+        was last applied to the resource, or None if it is not known.
+        '''
+        return self._definition_digest
+
     def update_template_diff(self, after, before):
         '''
         Returns the difference between the before and after json snippets. If
@@ -544,7 +556,11 @@ class Resource(object):
 
         Calls the handle_<ACTION>() method for the given action and then calls
         the check_<ACTION>_complete() method with the result in a loop until it
-        returns True. If the methods are not provided, the call is omitted.
+        returns True, polling frequently at first and then backing off to once
+        a second. If the methods are not provided, the call is omitted.
+
+        The action and each of the calls are subject to the limits of the
+        throttle for the resource's client plugin and tenant.
 
         Any args provided are passed to the handler.
 
@@ -558,12 +574,28 @@ class Resource(object):
             handler_action = '%s_%s' % (action_prefix.lower(), handler_action)
         handler = getattr(self, 'handle_%s' % handler_action, None)
 
-        if callable(handler):
+        if not callable(handler):
+            return
+
+        # Wait for the backend's throttle to admit the action
+        throttle = throttling.get_throttle(self.default_client_name,
+                                           self.context)
+        for delay in throttle.start_action():
+            yield delay
+
+        try:
             handler_data = handler(*args)
             yield
             if callable(check):
-                while not check(handler_data):
-                    yield
+                delays = scheduler.backoff_delays()
+                while True:
+                    for delay in throttle.call():
+                        yield delay
+                    if check(handler_data):
+                        break
+                    yield next(delays)
+        finally:
+            throttle.end_action()
 
     @scheduler.wrappertask
     def _do_action(self, action, pre_func=None, resource_data=None):
@@ -592,6 +624,10 @@ class Resource(object):
 
     def _update_stored_properties(self):
         self._stored_properties_data = function.resolve(self.properties.data)
+        # Use the template form of the rest of the definition, so that
+        # functions in e.g. the Metadata are not resolved again here
+        self._definition_digest = self.t.digest(
+            properties=self._stored_properties_data)
 
     def preview(self):
         '''
@@ -734,7 +770,16 @@ class Resource(object):
             if prev_ver != cur_ver:
                 return True
 
-        if before != after.freeze():
+        after_frozen = after.freeze()
+        if (self._definition_digest is not None and
+                after_frozen.digest() == self._definition_digest):
+            # The definition is unchanged since it was last applied, so there
+            # is no need to compare it and the properties in full. The stored
+            # digest covers everything but the properties in template form,
+            # so this only matches when those parts contain no functions.
+            return False
+
+        if before != after_frozen:
             return True
 
         try:
@@ -1000,6 +1045,7 @@ class Resource(object):
                   'name': self.name,
                   'rsrc_metadata': metadata,
                   'properties_data': self._stored_properties_data,
+                  'definition_digest': self._definition_digest,
                   'needed_by': self.needed_by,
                   'requires': self.requires,
                   'replaces': self.replaces,
@@ -1036,6 +1082,7 @@ class Resource(object):
             'stack_id': self.stack.id,
             'updated_at': self.updated_time,
             'properties_data': self._stored_properties_data,
+            'definition_digest': self._definition_digest,
             'needed_by': self.needed_by,
             'requires': self.requires,
             'replaces': self.replaces,
@@ -1052,6 +1099,9 @@ class Resource(object):
         if self.id is not None:
             try:
                 rs = resource_objects.Resource.get_obj(self.context, self.id)
+                if 'rsrc_metadata' in data:
+                    data['rsrc_metadata_version'] = (
+                        rs.rsrc_metadata_version or 0) + 1
                 rs.update_and_save(data)
             except Exception as ex:
                 LOG.error(_LE('DB error %s'), ex)
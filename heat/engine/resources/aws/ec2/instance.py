@@ -440,8 +440,12 @@ class Instance(resource.Resource):
                     }
 
                     if security_groups:
-                        props['security_groups'] = self.client_plugin(
-                            'neutron').get_secgroup_uuids(security_groups)
+                        neutron_plugin = self.client_plugin('neutron')
+                        neutron_plugin.queue_resource_ids('security_group',
+                                                          security_groups)
+                        props['security_groups'] = (
+                            neutron_plugin.get_secgroup_uuids(
+                                security_groups))
 
                     port = neutronclient.create_port({'port': props})['port']
 
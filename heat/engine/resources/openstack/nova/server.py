@@ -846,6 +846,9 @@ class Server(stack_user.StackUser):
 
         nics = []
 
+        if self.is_using_neutron():
+            self._queue_network_ids(networks)
+
         for net_data in networks:
             nic_info = {}
             net_identifier = (net_data.get(self.NETWORK_UUID) or
@@ -955,6 +958,12 @@ class Server(stack_user.StackUser):
             old_networks.remove(net)
         return not_updated_networks
 
+    def _queue_network_ids(self, networks):
+        """Let Neutron resolve the networks by name together, and once."""
+        self.client_plugin('neutron').queue_resource_ids(
+            'network', [net.get(self.NETWORK_ID) for net in networks
+                        if not net.get(self.NETWORK_UUID)])
+
     def _get_network_id(self, net):
         net_id = None
         if net.get(self.NETWORK_ID):
@@ -986,6 +995,9 @@ class Server(stack_user.StackUser):
                          net.get('uuid') == net_id)):
                     return net
 
+        if self.is_using_neutron():
+            self._queue_network_ids(nets)
+
         for iface in interfaces:
             # get interface properties
             props = {'port': iface.port_id,
@@ -21,6 +21,7 @@ from oslo_serialization import jsonutils
 from oslo_utils import excutils
 import six
 
+from heat.common import context
 from heat.common import exception
 from heat.common.i18n import _
 from heat.common.i18n import _LW
@@ -28,6 +29,7 @@ from heat.common import identifier
 from heat.common import template_format
 from heat.engine import attributes
 from heat.engine import environment
+from heat.engine import local_engine
 from heat.engine import resource
 from heat.engine import scheduler
 from heat.engine import stack as parser
@@ -264,24 +266,49 @@ class StackResource(resource.Resource):
         args = {rpc_api.PARAM_TIMEOUT: timeout_mins,
                 rpc_api.PARAM_DISABLE_ROLLBACK: True,
                 rpc_api.PARAM_ADOPT_STACK_DATA: adopt_data_str}
+        # Adopt data may override the parameters, which only the RPC
+        # interface handles
+        engine = local_engine.get() if adopt_data is None else None
         try:
-            result = self.rpc_client()._create_stack(
-                self.context,
-                name,
-                parsed_template.t,
-                child_env.user_env_as_dict(),
-                parsed_template.files,
-                args,
-                owner_id=self.stack.id,
-                user_creds_id=self.stack.user_creds_id,
-                stack_user_project_id=stack_user_project_id,
-                nested_depth=new_nested_depth,
-                parent_resource_name=self.name)
+            if engine is not None:
+                result = engine.create_nested_stack(
+                    self._engine_context(),
+                    name,
+                    parsed_template,
+                    args,
+                    owner_id=self.stack.id,
+                    nested_depth=new_nested_depth,
+                    user_creds_id=self.stack.user_creds_id,
+                    stack_user_project_id=stack_user_project_id,
+                    parent_resource_name=self.name)
+            else:
+                result = self.rpc_client()._create_stack(
+                    self.context,
+                    name,
+                    parsed_template.t,
+                    child_env.user_env_as_dict(),
+                    parsed_template.files,
+                    args,
+                    owner_id=self.stack.id,
+                    user_creds_id=self.stack.user_creds_id,
+                    stack_user_project_id=stack_user_project_id,
+                    nested_depth=new_nested_depth,
+                    parent_resource_name=self.name)
         except Exception as ex:
             self.raise_local_exception(ex)
 
         self.resource_id_set(result['stack_id'])
 
+    def _engine_context(self):
+        """
+        Return a copy of the context for an in-process engine call.
+
+        The nested stack operation runs in its own thread, so like a request
+        received over RPC it must not share the context (and the database
+        session within it) of the parent stack.
+        """
+        return context.RequestContext.from_dict(self.context.to_dict())
+
     def raise_local_exception(self, ex):
         ex_type = ex.__class__.__name__
 
@@ -409,14 +436,21 @@ class StackResource(resource.Resource):
             'state': nested_stack.state}}
 
         args = {rpc_api.PARAM_TIMEOUT: timeout_mins}
+        engine = local_engine.get()
         try:
-            self.rpc_client().update_stack(
-                self.context,
-                nested_stack.identifier(),
-                parsed_template.t,
-                child_env.user_env_as_dict(),
-                parsed_template.files,
-                args)
+            if engine is not None:
+                engine.update_nested_stack(self._engine_context(),
+                                           nested_stack.identifier(),
+                                           parsed_template,
+                                           args)
+            else:
+                self.rpc_client().update_stack(
+                    self.context,
+                    nested_stack.identifier(),
+                    parsed_template.t,
+                    child_env.user_env_as_dict(),
+                    parsed_template.files,
+                    args)
         except Exception as ex:
             LOG.exception('update_stack')
             self.raise_local_exception(ex)
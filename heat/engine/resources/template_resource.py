@@ -11,10 +11,16 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import copy
+import hashlib
+
+from oslo_config import cfg
 from oslo_serialization import jsonutils
+from oslo_utils import encodeutils
 from requests import exceptions
 import six
 
+from heat.common import cache
 from heat.common import exception
 from heat.common.i18n import _
 from heat.common import template_format
@@ -26,14 +32,71 @@ from heat.engine.resources import stack_resource
 from heat.engine import template
 
 
+cfg.CONF.import_opt('provider_template_cache_size', 'heat.common.config')
+
+_provider_cache = None
+
+
+class ProviderTemplateCache(object):
+    """Bounded cache of parsed provider templates and generated classes.
+
+    Entries are keyed by a digest of the template content and of the
+    environment's parameter defaults (which are applied to the template when
+    its schemas are generated), so a changed template or environment never
+    sees a stale entry.
+    """
+
+    def __init__(self, size):
+        self.templates = cache.LRUCache(size)
+        self.classes = cache.LRUCache(size)
+
+    @staticmethod
+    def _key(data, param_defaults):
+        digest = lambda d: hashlib.sha256(encodeutils.safe_encode(d))
+        return (digest(data).hexdigest(),
+                digest(jsonutils.dumps(param_defaults or {},
+                                       sort_keys=True)).hexdigest())
+
+    def parse(self, data, param_defaults):
+        """Return (template, properties schema, attributes schema).
+
+        The template is a private copy which the caller may modify.
+        """
+        key = self._key(data, param_defaults)
+        entry = self.templates.get(key)
+        if entry is None:
+            parsed = template_format.parse(data)
+            props, attrs = TemplateResource.get_schemas(
+                template.Template(parsed), param_defaults)
+            entry = (parsed, props, attrs)
+            self.templates.set(key, entry)
+
+        parsed, props, attrs = entry
+        return copy.deepcopy(parsed), props, attrs
+
+    def get_class(self, name, data, param_defaults):
+        key = (name,) + self._key(data, param_defaults)
+        cls = self.classes.get(key)
+        if cls is None:
+            parsed, props, attrs = self.parse(data, param_defaults)
+            cls = type(name, (TemplateResource,),
+                       {'properties_schema': props,
+                        'attributes_schema': attrs})
+            self.classes.set(key, cls)
+        return cls
+
+
+def provider_cache():
+    global _provider_cache
+    if _provider_cache is None:
+        _provider_cache = ProviderTemplateCache(
+            cfg.CONF.provider_template_cache_size)
+    return _provider_cache
+
+
 def generate_class(name, template_name, env):
     data = TemplateResource.get_template_file(template_name, ('file',))
-    tmpl = template.Template(template_format.parse(data))
-    props, attrs = TemplateResource.get_schemas(tmpl, env.param_defaults)
-    cls = type(name, (TemplateResource,),
-               {'properties_schema': props,
-                'attributes_schema': attrs})
-    return cls
+    return provider_cache().get_class(name, data, env.param_defaults)
 
 
 class TemplateResource(stack_resource.StackResource):
@@ -99,16 +162,19 @@ class TemplateResource(stack_resource.StackResource):
 
     def _generate_schema(self, definition):
         self._parsed_nested = None
+        param_defaults = self.stack.env.param_defaults
         try:
-            tmpl = template.Template(self.child_template())
+            # re-generate the properties and attributes from the template.
+            (self._parsed_nested,
+             self.properties_schema,
+             self.attributes_schema) = provider_cache().parse(
+                self.template_data(), param_defaults)
         except (exception.TemplateNotFound, ValueError) as download_error:
             self.validation_exception = download_error
             tmpl = template.Template(
                 {"HeatTemplateFormatVersion": "2012-12-12"})
-
-        # re-generate the properties and attributes from the template.
-        self.properties_schema, self.attributes_schema = self.get_schemas(
-            tmpl, self.stack.env.param_defaults)
+            self.properties_schema, self.attributes_schema = self.get_schemas(
+                tmpl, param_defaults)
 
         self.properties = definition.properties(self.properties_schema,
                                                 self.context)
@@ -45,7 +45,7 @@ class BaseVolume(resource.Resource):
         return vol.id
 
     def check_create_complete(self, vol_id):
-        vol = self.client().volumes.get(vol_id)
+        vol = self.client_plugin().poll_volume(vol_id)
 
         if vol.status == 'available':
             return True
@@ -112,7 +112,7 @@ class BaseVolume(resource.Resource):
                     cinder.volumes.delete(self.resource_id)
                 while True:
                     yield
-                    vol = cinder.volumes.get(self.resource_id)
+                    vol = self.client_plugin().poll_volume(self.resource_id)
             except Exception as ex:
                 self.client_plugin().ignore_not_found(ex)
 
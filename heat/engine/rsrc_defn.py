@@ -12,9 +12,12 @@
 
 import collections
 import copy
+import hashlib
 import itertools
+import json
 import operator
 
+from oslo_utils import encodeutils
 import six
 
 from heat.common import exception
@@ -236,6 +239,28 @@ class ResourceDefinitionCore(object):
 
         return self._rendering
 
+    def digest(self, properties=None):
+        """
+        Return a stable digest of the content of the resource definition.
+
+        The definition is rendered as it is, so any intrinsic functions are
+        included in their template form rather than resolved; resolved
+        properties may be passed in to use in place of those in the
+        definition. Frozen definitions that compare equal have the same
+        digest. Unlike the hash value, the digest does not vary between
+        processes, so it may be stored and compared with definitions loaded
+        later.
+        """
+        rendering = dict(self.render_hot())
+        if properties is not None:
+            rendering['properties'] = properties
+        if not rendering.get('properties'):
+            rendering.pop('properties', None)
+
+        rendering = json.dumps(rendering, sort_keys=True,
+                               separators=(',', ':'), default=six.text_type)
+        return hashlib.sha256(encodeutils.safe_encode(rendering)).hexdigest()
+
     def __eq__(self, other):
         """
         Compare this resource definition for equality with another.
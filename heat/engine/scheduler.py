@@ -13,6 +13,7 @@
 
 import functools
 import itertools
+import numbers
 import sys
 import time
 import types
@@ -30,10 +31,71 @@ from heat.common.i18n import _LI
 LOG = logging.getLogger(__name__)
 
 
-# Whether TaskRunner._sleep actually does an eventlet sleep when called.
+# Whether TaskRunner._sleep actually does an eventlet sleep when called, and
+# whether the wake-up times declared by tasks are honoured.
 ENABLE_SLEEP = True
 wallclock = time.time
 
+# Clock used to track task wake-up times and scheduler lag. This is kept
+# separate from wallclock, which is reserved for timeouts.
+_now = time.time
+
+# How long past its wake-up time a task may be resumed before the lag is
+# logged.
+LAG_LOG_THRESHOLD = 1.0
+
+_lag_stats = {'sleeps': 0, 'total_lag': 0.0, 'max_lag': 0.0}
+
+
+def _record_lag(lag):
+    lag = max(lag, 0.0)
+    _lag_stats['sleeps'] += 1
+    _lag_stats['total_lag'] += lag
+    _lag_stats['max_lag'] = max(_lag_stats['max_lag'], lag)
+    if lag > LAG_LOG_THRESHOLD:
+        LOG.debug('Task resumed %.3f seconds after its wake-up time' % lag)
+
+
+def get_lag_stats():
+    """Return counters describing how late sleeping tasks were resumed."""
+    stats = dict(_lag_stats)
+    sleeps = stats['sleeps']
+    stats['mean_lag'] = stats['total_lag'] / sleeps if sleeps else 0.0
+    return stats
+
+
+def reset_lag_stats():
+    """Reset the scheduler lag counters."""
+    _lag_stats.update(sleeps=0, total_lag=0.0, max_lag=0.0)
+
+
+def backoff_delays(initial=0.1, maximum=1.0, factor=2):
+    """
+    Generate an increasing series of poll delays, in seconds.
+
+    A task that polls for the completion of an asynchronous operation may
+    yield these values in turn, so that operations which complete quickly are
+    noticed within a fraction of a second while longer ones are polled no more
+    often than every `maximum` seconds.
+    """
+    delay = initial
+    while True:
+        yield delay
+        delay = min(delay * factor, maximum)
+
+
+def _earliest_wake_delay(runners):
+    """
+    Return the time until the first of a group of running tasks is due.
+
+    None is returned unless every task has declared its next wake-up time,
+    since a task that has not must be stepped at the default interval.
+    """
+    delays = [r.wake_delay() for r in runners if not r.done()]
+    if not delays or None in delays:
+        return None
+    return min(delays)
+
 
 def task_description(task):
     """
@@ -165,6 +227,7 @@ class TaskRunner(object):
         self._runner = None
         self._done = False
         self._timeout = None
+        self._wake_time = None
         self.name = task_description(task)
 
     def __str__(self):
@@ -181,14 +244,17 @@ class TaskRunner(object):
         """Sleep for the specified number of seconds."""
         if ENABLE_SLEEP and wait_time is not None:
             LOG.debug('%s sleeping' % six.text_type(self))
+            start = _now()
             eventlet.sleep(wait_time)
+            _record_lag(_now() - start - wait_time)
 
     def __call__(self, wait_time=1, timeout=None):
         """
         Start and run the task to completion.
 
         The task will first sleep for zero seconds, then sleep for `wait_time`
-        seconds between steps. To avoid sleeping, pass `None` for `wait_time`.
+        seconds between steps, or until the wake-up time declared by the task
+        if it yielded one. To avoid sleeping, pass `None` for `wait_time`.
         """
         self.start(timeout=timeout)
         # ensure that zero second sleep is applied only if task
@@ -226,6 +292,10 @@ class TaskRunner(object):
         """
         Run another step of the task, and return True if the task is complete;
         False otherwise.
+
+        A task may yield a number of seconds to declare when it next needs to
+        run; until then, stepping it does nothing (other than checking for a
+        timeout).
         """
         if not self.done():
             assert self._runner is not None, "Task not started"
@@ -235,26 +305,57 @@ class TaskRunner(object):
                 self._done = True
 
                 self._timeout.trigger(self._runner)
-            else:
+            elif self.due():
                 LOG.debug('%s running' % six.text_type(self))
 
                 try:
-                    next(self._runner)
+                    delay = next(self._runner)
                 except StopIteration:
                     self._done = True
+                    self._wake_time = None
                     LOG.debug('%s complete' % six.text_type(self))
+                else:
+                    self._set_wake_time(delay)
 
         return self._done
 
+    def _set_wake_time(self, delay):
+        if (isinstance(delay, numbers.Real) and
+                not isinstance(delay, bool)):
+            self._wake_time = _now() + max(delay, 0)
+        else:
+            self._wake_time = None
+
+    def due(self):
+        """Return True if the task is ready to run its next step."""
+        return (not ENABLE_SLEEP or self._wake_time is None or
+                _now() >= self._wake_time)
+
+    def wake_delay(self):
+        """
+        Return the number of seconds until the task next needs to run, or None
+        if the task has not declared a wake-up time.
+        """
+        if self._wake_time is None:
+            return None
+        return max(self._wake_time - _now(), 0)
+
+    def _wait_interval(self, wait_time):
+        if wait_time is None or not ENABLE_SLEEP:
+            return wait_time
+        delay = self.wake_delay()
+        return wait_time if delay is None else delay
+
     def run_to_completion(self, wait_time=1):
         """
         Run the task to completion.
 
-        The task will sleep for `wait_time` seconds between steps. To avoid
-        sleeping, pass `None` for `wait_time`.
+        The task will sleep for `wait_time` seconds between steps, unless it
+        declares its own wake-up time. To avoid sleeping, pass `None` for
+        `wait_time`.
         """
         while not self.step():
-            self._sleep(wait_time)
+            self._sleep(self._wait_interval(wait_time))
 
     def cancel(self, grace_period=None):
         """Cancel the task and mark it as done."""
@@ -395,7 +496,7 @@ class DependencyTaskGroup(object):
                 for k, r in self._ready():
                     r.start()
 
-                yield
+                yield _earliest_wake_delay(r for k, r in self._running())
 
                 for k, r in self._running():
                     if r.step():
@@ -539,7 +640,7 @@ class PollingTaskGroup(object):
                 r.start()
 
             while runners:
-                yield
+                yield _earliest_wake_delay(runners)
                 runners = list(itertools.dropwhile(lambda r: r.step(),
                                                    runners))
         except:  # noqa
@@ -13,6 +13,7 @@
 
 import collections
 import datetime
+import hashlib
 import os
 import socket
 import warnings
@@ -22,11 +23,13 @@ from oslo_config import cfg
 from oslo_log import log as logging
 import oslo_messaging as messaging
 from oslo_serialization import jsonutils
+from oslo_utils import encodeutils
 from oslo_utils import uuidutils
 from osprofiler import profiler
 import six
 import webob
 
+from heat.common import cache
 from heat.common import context
 from heat.common import exception
 from heat.common.i18n import _
@@ -42,8 +45,11 @@ from heat.engine import attributes
 from heat.engine import clients
 from heat.engine import environment
 from heat.engine import event as evt
+from heat.engine import liveness
+from heat.engine import local_engine
 from heat.engine import parameter_groups
 from heat.engine import properties
+from heat.engine import resource
 from heat.engine import resources
 from heat.engine import service_software_config
 from heat.engine import service_stack_watch
@@ -57,6 +63,7 @@ from heat.objects import resource as resource_objects
 from heat.objects import service as service_objects
 from heat.objects import snapshot as snapshot_object
 from heat.objects import stack as stack_object
+from heat.objects import stack_lock as stack_lock_object
 from heat.objects import watch_data
 from heat.objects import watch_rule
 from heat.openstack.common import service
@@ -70,9 +77,31 @@ cfg.CONF.import_opt('max_stacks_per_tenant', 'heat.common.config')
 cfg.CONF.import_opt('enable_stack_abandon', 'heat.common.config')
 cfg.CONF.import_opt('enable_stack_adopt', 'heat.common.config')
 cfg.CONF.import_opt('convergence_engine', 'heat.common.config')
+cfg.CONF.import_opt('metadata_access_cache_size', 'heat.common.config')
 
 LOG = logging.getLogger(__name__)
 
+# Number of seconds for which a cached decision on an in-instance user's
+# access to resource metadata is trusted.
+METADATA_ACCESS_CACHE_TTL = 60
+
+_metadata_access_cache = None
+
+
+def _metadata_access():
+    global _metadata_access_cache
+    if _metadata_access_cache is None:
+        _metadata_access_cache = cache.LRUCache(
+            cfg.CONF.metadata_access_cache_size,
+            ttl=METADATA_ACCESS_CACHE_TTL)
+    return _metadata_access_cache
+
+
+def _metadata_version(metadata):
+    """Return a version string which changes whenever the metadata does."""
+    data = jsonutils.dumps(metadata, sort_keys=True)
+    return hashlib.sha256(encodeutils.safe_encode(data)).hexdigest()
+
 
 class ThreadGroupManager(object):
 
@@ -185,6 +214,10 @@ class ThreadGroupManager(object):
             if e is not event:
                 self.add_event(stack_id, e)
 
+    def thread_count(self):
+        """Return the number of stack threads currently running."""
+        return sum(len(group.threads) for group in self.groups.values())
+
     def stop_timers(self, stack_id):
         if stack_id in self.groups:
             self.groups[stack_id].stop_timers()
@@ -267,7 +300,7 @@ class EngineService(service.Service):
     by the RPC caller.
     """
 
-    RPC_API_VERSION = '1.9'
+    RPC_API_VERSION = '1.11'
 
     def __init__(self, host, topic, manager=None):
         super(EngineService, self).__init__()
@@ -310,16 +343,11 @@ class EngineService(service.Service):
         if self.thread_group_mgr is None:
             self.thread_group_mgr = ThreadGroupManager()
         self.stack_watch = service_stack_watch.StackWatch(
-            self.thread_group_mgr)
+            self.thread_group_mgr, self.host)
 
-        # Create a periodic_watcher_task per-stack
+        # Create a periodic_watcher_task per-stack with watch rules
         admin_context = context.get_admin_context()
-        stacks = stack_object.Stack.get_all(
-            admin_context,
-            tenant_safe=False,
-            show_hidden=True)
-        for s in stacks:
-            self.stack_watch.start_watch_task(s.id, admin_context)
+        self.stack_watch.start_watch_tasks(admin_context)
 
     def start(self):
         self.engine_id = stack_lock.StackLock.generate_engine_id()
@@ -355,6 +383,7 @@ class EngineService(service.Service):
         self.manage_thread_grp.add_timer(cfg.CONF.periodic_interval,
                                          self.service_manage_report)
         self.manage_thread_grp.add_thread(self.reset_stack_status)
+        local_engine.register(self)
 
         super(EngineService, self).start()
 
@@ -369,6 +398,7 @@ class EngineService(service.Service):
             LOG.error(_LE("Failed to stop engine service, %s"), e)
 
     def stop(self):
+        local_engine.unregister(self)
         self._stop_rpc_server()
 
         if cfg.CONF.convergence_engine:
@@ -595,6 +625,17 @@ class EngineService(service.Service):
         env = environment.Environment(params)
 
         tmpl = templatem.Template(template, files=files, env=env)
+        return self._validate_stack_from_template(
+            cnxt, stack_name, tmpl, common_params, owner_id, nested_depth,
+            user_creds_id, stack_user_project_id, convergence,
+            parent_resource_name)
+
+    def _validate_stack_from_template(self, cnxt, stack_name, tmpl,
+                                      common_params, owner_id=None,
+                                      nested_depth=0, user_creds_id=None,
+                                      stack_user_project_id=None,
+                                      convergence=False,
+                                      parent_resource_name=None):
         self._validate_new_stack(cnxt, stack_name, tmpl)
 
         stack = parser.Stack(cnxt, stack_name, tmpl,
@@ -669,6 +710,43 @@ class EngineService(service.Service):
         """
         LOG.info(_LI('Creating stack %s'), stack_name)
 
+        convergence = cfg.CONF.convergence_engine
+
+        stack = self._parse_template_and_validate_stack(
+            cnxt, stack_name, template, params, files, args, owner_id,
+            nested_depth, user_creds_id, stack_user_project_id, convergence,
+            parent_resource_name)
+
+        return self._start_stack_create(cnxt, stack, convergence)
+
+    def create_nested_stack(self, cnxt, stack_name, tmpl, args, owner_id,
+                            nested_depth, user_creds_id=None,
+                            stack_user_project_id=None,
+                            parent_resource_name=None):
+        """
+        Create a nested stack from an already parsed template.
+
+        This is called in-process by the parent stack's resource, in place of
+        create_stack() over RPC, so the child template and its environment
+        are neither serialized nor parsed again.
+
+        :param cnxt: Request context, not shared with the caller.
+        :param stack_name: Name of the nested stack.
+        :param tmpl: Template, including environment and files, of the stack.
+        :param args: Request parameters/args, as for create_stack().
+        """
+        LOG.info(_LI('Creating nested stack %s'), stack_name)
+
+        convergence = cfg.CONF.convergence_engine
+
+        stack = self._validate_stack_from_template(
+            cnxt, stack_name, tmpl, api.extract_args(args), owner_id,
+            nested_depth, user_creds_id, stack_user_project_id, convergence,
+            parent_resource_name)
+
+        return self._start_stack_create(cnxt, stack, convergence)
+
+    def _start_stack_create(self, cnxt, stack, convergence):
         def _create_stack_user(stack):
             if not stack.stack_user_project_id:
                 try:
@@ -693,13 +771,6 @@ class EngineService(service.Service):
             else:
                 LOG.info(_LI("Stack create failed, status %s"), stack.status)
 
-        convergence = cfg.CONF.convergence_engine
-
-        stack = self._parse_template_and_validate_stack(
-            cnxt, stack_name, template, params, files, args, owner_id,
-            nested_depth, user_creds_id, stack_user_project_id, convergence,
-            parent_resource_name)
-
         # once validations are done
         # if convergence is enabled, take convergence path
         if convergence:
@@ -729,6 +800,35 @@ class EngineService(service.Service):
         :param files: Files referenced from the template
         :param args: Request parameters/args passed from API
         """
+        current_stack = self._load_stack_for_update(cnxt, stack_identity)
+
+        # Now parse the template and any parameters for the updated
+        # stack definition.
+        env = environment.Environment(params)
+        if args.get(rpc_api.PARAM_EXISTING, None):
+            env.patch_previous_parameters(
+                current_stack.env,
+                args.get(rpc_api.PARAM_CLEAR_PARAMETERS, []))
+        tmpl = templatem.Template(template, files=files, env=env)
+        return self._start_stack_update(cnxt, current_stack, tmpl, args)
+
+    def update_nested_stack(self, cnxt, stack_identity, tmpl, args):
+        """
+        Update a nested stack to an already parsed template.
+
+        This is called in-process by the parent stack's resource, in place of
+        update_stack() over RPC, so the child template and its environment
+        are neither serialized nor parsed again.
+
+        :param cnxt: Request context, not shared with the caller.
+        :param stack_identity: Identity of the nested stack.
+        :param tmpl: Template, including environment and files, of the stack.
+        :param args: Request parameters/args, as for update_stack().
+        """
+        current_stack = self._load_stack_for_update(cnxt, stack_identity)
+        return self._start_stack_update(cnxt, current_stack, tmpl, args)
+
+    def _load_stack_for_update(self, cnxt, stack_identity):
         # Get the database representation of the existing stack
         db_stack = self._get_stack(cnxt, stack_identity)
         LOG.info(_LI('Updating stack %s'), db_stack.name)
@@ -743,14 +843,9 @@ class EngineService(service.Service):
             msg = _('Updating a stack when it is deleting')
             raise exception.NotSupported(feature=msg)
 
-        # Now parse the template and any parameters for the updated
-        # stack definition.
-        env = environment.Environment(params)
-        if args.get(rpc_api.PARAM_EXISTING, None):
-            env.patch_previous_parameters(
-                current_stack.env,
-                args.get(rpc_api.PARAM_CLEAR_PARAMETERS, []))
-        tmpl = templatem.Template(template, files=files, env=env)
+        return current_stack
+
+    def _start_stack_update(self, cnxt, current_stack, tmpl, args):
         if len(tmpl[tmpl.RESOURCES]) > cfg.CONF.max_resources_per_stack:
             raise exception.RequestLimitExceeded(
                 message=exception.StackResourceLimitExceeded.msg_fmt)
@@ -1126,16 +1221,37 @@ class EngineService(service.Service):
             return True
 
         # fall back to looking for EC2 credentials in the context
+        access_key = self._ec2_access_key(cnxt)
+        if access_key is None:
+            return False
+
+        return stack.access_allowed(access_key, resource_name)
+
+    @staticmethod
+    def _ec2_access_key(cnxt):
         try:
             ec2_creds = jsonutils.loads(cnxt.aws_creds).get('ec2Credentials')
         except (TypeError, AttributeError):
             ec2_creds = None
 
         if not ec2_creds:
-            return False
+            return None
+        return ec2_creds.get('access')
 
-        access_key = ec2_creds.get('access')
-        return stack.access_allowed(access_key, resource_name)
+    def _stack_user_access_allowed(self, cnxt, s, resource_name):
+        '''
+        Check the access of an in-instance user to a resource, loading the
+        stack only if no recent decision for the same stack revision is cached.
+        '''
+        key = (s.id, s.updated_at, cnxt.user_id, self._ec2_access_key(cnxt),
+               resource_name)
+        allowed = _metadata_access().get(key)
+        if allowed is None:
+            stack = parser.Stack.load(cnxt, stack=s)
+            allowed = bool(self._authorize_stack_user(cnxt, stack,
+                                                      resource_name))
+            _metadata_access().set(key, allowed)
+        return allowed
 
     def _verify_stack_resource(self, stack, resource_name):
         if resource_name not in stack:
@@ -1164,6 +1280,40 @@ class EngineService(service.Service):
         return api.format_stack_resource(stack[resource_name],
                                          with_attr=with_attr)
 
+    @context.request_context
+    def describe_stack_resource_metadata(self, cnxt, stack_identity,
+                                         resource_name,
+                                         metadata_version=None):
+        '''
+        Return the metadata of a resource, as polled by in-instance agents.
+
+        The metadata is read directly from the resource's row, so the stack
+        is only loaded to report a resource which has not yet been created
+        (or does not exist) with the appropriate error. The result
+        also contains a version of the metadata; when this matches the
+        metadata_version passed in, the metadata itself is omitted.
+        '''
+        s = self._get_stack(cnxt, stack_identity)
+
+        if cfg.CONF.heat_stack_user_role in cnxt.roles:
+            if not self._stack_user_access_allowed(cnxt, s, resource_name):
+                LOG.warn(_LW("Access denied to resource %s"), resource_name)
+                raise exception.Forbidden()
+
+        rs = resource_objects.Resource.get_metadata_by_name_and_stack(
+            cnxt, resource_name, s.id)
+        if rs is None or rs.action == resource.Resource.INIT:
+            stack = parser.Stack.load(cnxt, stack=s)
+            self._verify_stack_resource(stack, resource_name)
+            raise exception.ResourceNotAvailable(resource_name=resource_name)
+        metadata = rs.rsrc_metadata
+
+        version = _metadata_version(metadata)
+        result = {rpc_api.RES_METADATA_VERSION: version}
+        if version != metadata_version:
+            result[rpc_api.RES_METADATA] = metadata
+        return result
+
     @context.request_context
     def resource_signal(self, cnxt, stack_identity, resource_name, details,
                         sync_call=False):
@@ -1213,17 +1363,20 @@ class EngineService(service.Service):
         :param cnxt: RPC context.
         :param physical_resource_id: The physical resource ID to look up.
         """
-        rs = resource_objects.Resource.get_by_physical_resource_id(
-            cnxt,
-            physical_resource_id)
-        if not rs:
+        identity = (resource_objects.Resource.
+                    get_identity_by_physical_resource_id(
+                        cnxt,
+                        physical_resource_id))
+        if not identity:
             raise exception.PhysicalResourceNotFound(
                 resource_id=physical_resource_id)
 
-        stack = parser.Stack.load(cnxt, stack_id=rs.stack.id)
-        resource = stack[rs.name]
-
-        return dict(resource.identifier())
+        # The identifier only needs a few columns from the resource and its
+        # stack, so build it directly rather than loading the whole stack.
+        resource_name, stack_id, stack_name, tenant = identity
+        return dict(identifier.ResourceIdentifier(tenant, stack_name,
+                                                  stack_id, '',
+                                                  resource_name=resource_name))
 
     @context.request_context
     def describe_stack_resources(self, cnxt, stack_identity, resource_name):
@@ -1412,9 +1565,9 @@ class EngineService(service.Service):
             if watch_name:
                 yield watchrule.WatchRule.load(cnxt, watch_name)
             else:
-                for wr in watch_rule.WatchRule.get_all(cnxt):
-                    if watchrule.rule_can_use_sample(wr, stats_data):
-                        yield watchrule.WatchRule.load(cnxt, watch=wr)
+                index = watchrule.rule_index()
+                for wr in index.matching_rules(cnxt, stats_data):
+                    yield watchrule.WatchRule.load(cnxt, watch=wr)
 
         rule_run = False
         for rule in get_matching_watches():
@@ -1451,7 +1604,8 @@ class EngineService(service.Service):
         return result
 
     @context.request_context
-    def show_watch_metric(self, cnxt, metric_namespace=None, metric_name=None):
+    def show_watch_metric(self, cnxt, metric_namespace=None, metric_name=None,
+                          limit=None, marker=None):
         """
         The show_watch method returns the datapoints for a metric
 
@@ -1460,23 +1614,30 @@ class EngineService(service.Service):
             to see all
         :param metric_name: Name of the metric you want to see, or None to see
             all
+        :param limit: the number of datapoints to return, or None for all
+        :param marker: the id of the datapoint after which to start
         """
+        result = []
+        while True:
+            try:
+                wds = watch_data.WatchData.get_all(cnxt,
+                                                   namespace=metric_namespace,
+                                                   metric_name=metric_name,
+                                                   limit=limit,
+                                                   marker=marker)
+            except Exception as ex:
+                LOG.warn(_LW('show_metric (all) db error %s'), ex)
+                return
 
-        # DB API and schema does not yet allow us to easily query by
-        # namespace/metric, but we will want this at some point
-        # for now, the API can query all metric data and filter locally
-        if metric_namespace is not None or metric_name is not None:
-            LOG.error(_LE("Filtering by namespace/metric not yet supported"))
-            return
+            formatted = (api.format_watch_data(w) for w in wds)
+            result.extend(r for r in formatted if r is not None)
+            if limit is None or len(wds) < limit or len(result) >= limit:
+                # Callers take a page shorter than the limit as the last one
+                return result[:limit]
 
-        try:
-            wds = watch_data.WatchData.get_all(cnxt)
-        except Exception as ex:
-            LOG.warn(_LW('show_metric (all) db error %s'), ex)
-            return
-
-        result = [api.format_watch_data(w) for w in wds]
-        return result
+            # Datapoints which could not be formatted left the page short,
+            # so fill it from the following ones
+            marker = wds[-1].id
 
     @context.request_context
     def set_watch_state(self, cnxt, watch_name, state):
@@ -1630,26 +1791,40 @@ class EngineService(service.Service):
         stacks = stack_object.Stack.get_all(cnxt,
                                             filters=filters,
                                             tenant_safe=False) or []
-        for s in stacks:
-            lock = stack_lock.StackLock(cnxt, s.id, self.engine_id)
-            # If stacklock is released, means stack status may changed.
-            engine_id = lock.get_engine_id()
-            if not engine_id:
-                continue
-            # Try to steal the lock and set status to failed.
-            try:
-                lock.acquire(retry=False)
-            except exception.ActionInProgress:
-                continue
-            stk = parser.Stack.load(cnxt, stack=s,
-                                    use_stored_context=True)
-            LOG.info(_LI('Engine %(engine)s went down when stack %(stack_id)s'
-                         ' was in action %(action)s'),
-                     {'engine': engine_id, 'action': stk.action,
-                      'stack_id': stk.id})
-            # Set stack status to FAILED.
-            status_reason = ('Engine went down during stack %s' % stk.action)
-            self.thread_group_mgr.start_with_acquired_lock(
-                stk, lock, stk.state_set, stk.action,
-                stk.FAILED, six.text_type(status_reason)
-            )
+        stacks = dict((s.id, s) for s in stacks)
+        if not stacks:
+            return
+
+        # If stacklock is released, means stack status may changed.
+        lock_owners = stack_lock_object.StackLock.get_engine_ids(
+            list(stacks))
+        alive = liveness.registry().engines_alive(
+            cnxt, set(lock_owners.values()))
+        for stack_id, engine_id in lock_owners.items():
+            if engine_id and not alive.get(engine_id):
+                # Each thread needs its own database session
+                self.thread_group_mgr.start(stack_id,
+                                            self._reset_stack_status,
+                                            cnxt.copy_with_new_session(),
+                                            stacks[stack_id],
+                                            engine_id)
+
+    def _reset_stack_status(self, cnxt, s, engine_id):
+        lock = stack_lock.StackLock(cnxt, s.id, self.engine_id)
+        # Try to steal the lock and set status to failed.
+        try:
+            lock.acquire(retry=False)
+        except exception.ActionInProgress:
+            return
+        stk = parser.Stack.load(cnxt, stack=s,
+                                use_stored_context=True)
+        LOG.info(_LI('Engine %(engine)s went down when stack %(stack_id)s'
+                     ' was in action %(action)s'),
+                 {'engine': engine_id, 'action': stk.action,
+                  'stack_id': stk.id})
+        # Set stack status to FAILED.
+        status_reason = ('Engine went down during stack %s' % stk.action)
+        self.thread_group_mgr.start_with_acquired_lock(
+            stk, lock, stk.state_set, stk.action,
+            stk.FAILED, six.text_type(status_reason)
+        )
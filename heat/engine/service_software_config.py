@@ -29,6 +29,41 @@ from heat.rpc import api as rpc_api
 
 LOG = logging.getLogger(__name__)
 
+# Number of attempts at updating the deployments in a server's metadata
+# before giving up on detecting concurrent updates.
+METADATA_UPDATE_ATTEMPTS = 3
+
+
+def _replace_deployed_config(deployments, config=None,
+                             replaced_config_id=None):
+    """
+    Return a copy of a server's list of deployed configs with one changed.
+
+    The entry for replaced_config_id is removed and one for config is added,
+    keeping the list in the order of config names, as built by
+    metadata_software_deployments(). None is returned if the replaced entry
+    is not in the list, in which case the list should be rebuilt.
+    """
+    deployments = list(deployments)
+    if replaced_config_id is not None:
+        for i, deployed in enumerate(deployments):
+            if deployed[rpc_api.SOFTWARE_CONFIG_ID] == replaced_config_id:
+                del deployments[i]
+                break
+        else:
+            return None
+
+    if config is None:
+        return deployments
+
+    entry = api.format_software_config(config)
+    name = entry[rpc_api.SOFTWARE_CONFIG_NAME]
+    position = next((i for i, deployed in enumerate(deployments)
+                     if deployed[rpc_api.SOFTWARE_CONFIG_NAME] > name),
+                    len(deployments))
+    deployments.insert(position, entry)
+    return deployments
+
 
 class SoftwareConfigService(service.Service):
 
@@ -71,15 +106,46 @@ class SoftwareConfigService(service.Service):
         result = [api.format_software_config(sd.config) for sd in all_sd_s]
         return result
 
-    def _push_metadata_software_deployments(self, cnxt, server_id):
-        rs = (resource_object.Resource.
-              get_by_physical_resource_id(cnxt, server_id))
-        if not rs:
-            return
-        deployments = self.metadata_software_deployments(cnxt, server_id)
-        md = rs.rsrc_metadata or {}
-        md['deployments'] = deployments
-        rs.update_and_save({'rsrc_metadata': md})
+    def _push_metadata_software_deployments(self, cnxt, server_id,
+                                            config=None,
+                                            replaced_config_id=None):
+        '''
+        Update the list of deployed configs in the metadata of a server.
+
+        If a single config was deployed, or replaced or removed the config
+        with the given id, only its entry in the list is changed. Otherwise
+        the list is rebuilt from all of the server's deployments. The
+        metadata is only written if it was not changed since it was read, so
+        that concurrent updates to a server's deployments are not lost.
+        '''
+        for attempt in range(METADATA_UPDATE_ATTEMPTS):
+            rs = (resource_object.Resource.
+                  get_by_physical_resource_id(cnxt, server_id))
+            if not rs:
+                return
+            md = rs.rsrc_metadata or {}
+            deployments = md.get('deployments')
+            if deployments is not None and (config is not None or
+                                            replaced_config_id is not None):
+                deployments = _replace_deployed_config(deployments, config,
+                                                       replaced_config_id)
+            else:
+                deployments = None
+            if deployments is None:
+                deployments = self.metadata_software_deployments(cnxt,
+                                                                 server_id)
+            md['deployments'] = deployments
+            if resource_object.Resource.update_metadata(
+                    cnxt, rs.id, md, rs.rsrc_metadata_version):
+                break
+        else:
+            LOG.debug('Metadata of server %s changed concurrently, '
+                      'rebuilding its deployments' % server_id)
+            md['deployments'] = self.metadata_software_deployments(cnxt,
+                                                                   server_id)
+            rs.update_and_save({'rsrc_metadata': md,
+                                'rsrc_metadata_version':
+                                    (rs.rsrc_metadata_version or 0) + 1})
 
         metadata_put_url = None
         for rd in rs.data:
@@ -161,7 +227,8 @@ class SoftwareConfigService(service.Service):
             'action': action,
             'status': status,
             'status_reason': status_reason})
-        self._push_metadata_software_deployments(cnxt, server_id)
+        self._push_metadata_software_deployments(cnxt, server_id,
+                                                 config=sd.config)
         return api.format_software_deployment(sd)
 
     def signal_software_deployment(self, cnxt, deployment_id, details,
@@ -228,8 +295,12 @@ class SoftwareConfigService(service.Service):
                                    input_values, output_values, action,
                                    status, status_reason, updated_at):
         update_data = {}
+        replaced_config_id = None
         if config_id:
             update_data['config_id'] = config_id
+            replaced_config_id = (software_deployment_object.
+                                  SoftwareDeployment.get_by_id(
+                                      cnxt, deployment_id).config_id)
         if input_values:
             update_data['input_values'] = input_values
         if output_values:
@@ -252,10 +323,16 @@ class SoftwareConfigService(service.Service):
         # only push metadata if this update resulted in the config_id
         # changing, since metadata is just a list of configs
         if config_id:
-            self._push_metadata_software_deployments(cnxt, sd.server_id)
+            self._push_metadata_software_deployments(
+                cnxt, sd.server_id, config=sd.config,
+                replaced_config_id=replaced_config_id)
 
         return api.format_software_deployment(sd)
 
     def delete_software_deployment(self, cnxt, deployment_id):
+        sd = software_deployment_object.SoftwareDeployment.get_by_id(
+            cnxt, deployment_id)
         software_deployment_object.SoftwareDeployment.delete(
             cnxt, deployment_id)
+        self._push_metadata_software_deployments(
+            cnxt, sd.server_id, replaced_config_id=sd.config_id)
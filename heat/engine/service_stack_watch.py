@@ -11,25 +11,177 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import bisect
+import datetime
+import hashlib
+
+from oslo_config import cfg
 from oslo_log import log as logging
 from oslo_utils import timeutils
 import six
 
 from heat.common import context
 from heat.common.i18n import _LE
+from heat.common.i18n import _LI
 from heat.common.i18n import _LW
 from heat.engine import stack
 from heat.engine import watchrule
+from heat.objects import service as service_objects
 from heat.objects import stack as stack_object
 from heat.objects import watch_rule as watch_rule_object
 from heat.rpc import api as rpc_api
 
+cfg.CONF.import_opt('host', 'heat.common.config')
+cfg.CONF.import_opt('periodic_interval', 'heat.common.config')
+
 LOG = logging.getLogger(__name__)
 
 
+class HashRing(object):
+    """A consistent hash ring mapping keys onto a set of members.
+
+    Each member is placed on the ring at a number of pseudo-random points,
+    so that when members join or leave only the keys on their arcs move.
+    """
+
+    REPLICAS = 64
+
+    def __init__(self, members):
+        self.members = frozenset(members)
+        points = []
+        for member in self.members:
+            for replica in six.moves.xrange(self.REPLICAS):
+                points.append((self._hash('%s-%d' % (member, replica)),
+                               member))
+        points.sort()
+        self._hashes = [p[0] for p in points]
+        self._members = [p[1] for p in points]
+
+    @staticmethod
+    def _hash(key):
+        return int(hashlib.md5(key.encode('utf-8')).hexdigest()[:8], 16)
+
+    def get_member(self, key):
+        if not self._hashes:
+            return None
+        pos = bisect.bisect(self._hashes, self._hash(six.text_type(key)))
+        return self._members[pos % len(self._members)]
+
+
 class StackWatch(object):
-    def __init__(self, thread_group_mgr):
+    # Key in the thread group manager of the task which keeps the watcher
+    # tasks in line with the stacks owned by the engine
+    SYNC_TASK_KEY = 'stack_watch_sync'
+
+    def __init__(self, thread_group_mgr, host=None):
         self.thread_group_mgr = thread_group_mgr
+        self.host = host or cfg.CONF.host
+        self._ring = None
+        self._ring_updated_at = None
+        # Top-level stacks with a periodic watcher task on this engine
+        self._watched = set()
+
+    def _live_engine_hosts(self, cnxt):
+        # Engines report every periodic_interval, consider them dead after
+        # missing three reports as service_manage_cleanup does
+        time_line = timeutils.utcnow() - datetime.timedelta(
+            seconds=3 * cfg.CONF.periodic_interval)
+        hosts = set([self.host])
+        for service in service_objects.Service.get_all(cnxt):
+            if service['binary'] != 'heat-engine':
+                continue
+            reported_at = service['updated_at'] or service['created_at']
+            if (reported_at is not None and
+                    timeutils.normalize_time(reported_at) >= time_line):
+                hosts.add(service['host'])
+        return hosts
+
+    def _get_ring(self, cnxt):
+        now = timeutils.utcnow()
+        if (self._ring is None or self._ring_updated_at < now -
+                datetime.timedelta(seconds=cfg.CONF.periodic_interval)):
+            hosts = self._live_engine_hosts(cnxt)
+            if self._ring is None or hosts != self._ring.members:
+                LOG.info(_LI('Sharing watch rule evaluation between '
+                             'engines on hosts %s'), ', '.join(sorted(hosts)))
+                self._ring = HashRing(hosts)
+            self._ring_updated_at = now
+        return self._ring
+
+    def owns_stack(self, cnxt, stack_id):
+        """Return whether this engine evaluates the watches of a stack.
+
+        Each top-level stack, with all of its nested stacks, is assigned to
+        exactly one of the live engines.
+        """
+        return self._get_ring(cnxt).get_member(stack_id) == self.host
+
+    def _root_stack_ids(self, cnxt, stack_ids):
+        roots = set()
+        seen = set()
+        pending = set(stack_ids)
+        while pending:
+            owners = stack_object.Stack.get_owner_ids(cnxt, list(pending))
+            seen.update(pending)
+            pending = set()
+            for sid, owner_id in six.iteritems(owners):
+                if owner_id is None:
+                    roots.add(sid)
+                elif owner_id not in seen:
+                    pending.add(owner_id)
+        return roots
+
+    def _add_watcher_task(self, sid):
+        self._watched.add(sid)
+        self.thread_group_mgr.add_timer(sid,
+                                        self.periodic_watcher_task,
+                                        sid=sid)
+
+    def _sync_watch_tasks(self, cnxt, stack_ids):
+        owned = set(sid for sid in self._root_stack_ids(cnxt, stack_ids)
+                    if self.owns_stack(cnxt, sid))
+
+        for sid in self._watched - owned:
+            LOG.debug("Stopping watcher task for stack %s" % sid)
+            self.thread_group_mgr.stop_timers(sid)
+            self._watched.discard(sid)
+        for sid in owned - self._watched:
+            LOG.debug("Starting watcher task for stack %s" % sid)
+            self._add_watcher_task(sid)
+
+    def sync_watch_tasks(self, cnxt=None):
+        """Start and stop periodic watcher tasks as stack ownership moves.
+
+        Stacks are assigned to engines as engines come and go, and stacks
+        created by other engines (or by this engine's workers) are assigned
+        to this one, so the set of top-level stacks with watch rules that
+        this engine owns is compared with the watcher tasks it runs on
+        every periodic interval.
+        """
+        if cnxt is None:
+            cnxt = context.get_admin_context()
+        stack_ids = watch_rule_object.WatchRule.get_active_stack_ids(cnxt)
+        self._sync_watch_tasks(cnxt, stack_ids)
+
+    def start_watch_tasks(self, cnxt):
+        """Create the periodic watcher tasks for all owned stacks at startup.
+
+        Only stacks with watch rules evaluated by the engine are considered,
+        and a task is created for each of their top-level stacks which this
+        engine owns. A periodic task then keeps the watcher tasks in line
+        with the stacks owned by this engine.
+        """
+        stack_ids = watch_rule_object.WatchRule.get_active_stack_ids(cnxt)
+        if stack_ids:
+            # reset the last_evaluated so we don't fire off alarms when
+            # the engine has not been running.
+            watch_rule_object.WatchRule.update_all_by_stack_ids(
+                cnxt, stack_ids, {'last_evaluated': timeutils.utcnow()})
+
+            self._sync_watch_tasks(cnxt, stack_ids)
+
+        self.thread_group_mgr.add_timer(self.SYNC_TASK_KEY,
+                                        self.sync_watch_tasks)
 
     def start_watch_task(self, stack_id, cnxt):
 
@@ -55,11 +207,12 @@ class StackWatch(object):
 
             return start_watch_thread
 
-        if stack_has_a_watchrule(stack_id):
-            self.thread_group_mgr.add_timer(
-                stack_id,
-                self.periodic_watcher_task,
-                sid=stack_id)
+        # The engine owning the stack, if it is not this one, starts the
+        # watcher task on its next sync
+        if (stack_has_a_watchrule(stack_id) and
+                stack_id not in self._watched and
+                self.owns_stack(cnxt, stack_id)):
+            self._add_watcher_task(stack_id)
 
     def check_stack_watches(self, sid):
         # Retrieve the stored credentials & create context
@@ -111,4 +264,9 @@ class StackWatch(object):
         evaluation for all rules defined for the stack
         sid = stack ID
         """
+        admin_context = context.get_admin_context()
+        if not self.owns_stack(admin_context, sid):
+            LOG.debug("Watch rules for stack %s are evaluated by another "
+                      "engine" % sid)
+            return
         self.check_stack_watches(sid)
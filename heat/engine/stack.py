@@ -14,10 +14,13 @@
 import collections
 import copy
 import datetime
+import functools
 import itertools
 import re
+import sys
 import warnings
 
+import eventlet
 from oslo_config import cfg
 from oslo_log import log as logging
 from oslo_utils import encodeutils
@@ -53,6 +56,7 @@ from heat.objects import user_creds as ucreds_object
 from heat.rpc import api as rpc_api
 
 cfg.CONF.import_opt('error_wait_time', 'heat.common.config')
+cfg.CONF.import_opt('resource_validation_concurrency', 'heat.common.config')
 
 LOG = logging.getLogger(__name__)
 
@@ -608,6 +612,39 @@ class Stack(collections.Mapping):
         handler = self._access_allowed_handlers.get(credential_id)
         return handler and handler(resource_name)
 
+    def _validate_resources(self):
+        '''
+        Validate each resource, yielding (resource, result, exc_info) in
+        dependency order.
+
+        Validating a resource may involve several calls to backend services
+        (e.g. through custom constraints), so the validations are run
+        concurrently in up to resource_validation_concurrency green threads.
+        Each of them validates with its own copy of the context, since a
+        database session must not be used by several threads at once.
+        '''
+        def validate(res):
+            try:
+                return res, res.validate(), None
+            except Exception:
+                return res, None, sys.exc_info()
+
+        def validate_in_thread(res):
+            res.context = self.context.copy_with_new_session()
+            try:
+                return validate(res)
+            finally:
+                res.context = self.context
+
+        resources = list(self.dependencies)
+        size = cfg.CONF.resource_validation_concurrency
+        if size > 1 and len(resources) > 1:
+            pool = eventlet.GreenPool(min(size, len(resources)))
+            # Wait for every validation to finish, so that none outlives the
+            # error which is reported
+            return list(pool.imap(validate_in_thread, resources))
+        return six.moves.map(validate, resources)
+
     @profiler.trace('Stack.validate', hide_args=False)
     def validate(self):
         '''
@@ -638,9 +675,10 @@ class Stack(collections.Mapping):
             raise exception.StackValidationFailed(
                 message=_("Duplicate names %s") % dup_names)
 
-        for res in self.dependencies:
+        for res, result, exc_info in self._validate_resources():
             try:
-                result = res.validate()
+                if exc_info is not None:
+                    six.reraise(*exc_info)
             except exception.HeatException as ex:
                 LOG.info(ex)
                 raise ex
@@ -875,16 +913,52 @@ class Stack(collections.Mapping):
             LOG.debug('Loaded existing backup stack')
             return self.load(self.context, stack=s)
         elif create_if_missing:
-            kwargs = self.get_kwargs_for_cloning()
-            kwargs['owner_id'] = self.id
-            prev = type(self)(self.context, self.name, copy.deepcopy(self.t),
-                              **kwargs)
-            prev.store(backup=True)
-            LOG.debug('Created new backup stack')
-            return prev
+            return self._create_backup_stack(self.t,
+                                             self.get_kwargs_for_cloning())
         else:
             return None
 
+    def _create_backup_stack(self, template, kwargs):
+        '''
+        Store a new backup stack with a copy of the given template, and the
+        given keyword arguments for cloning this stack.
+        '''
+        prev = self._clone_with_template(template, dict(kwargs,
+                                                        owner_id=self.id))
+        prev.store(backup=True)
+        LOG.debug('Created new backup stack')
+        return prev
+
+    def _clone_with_template(self, template, kwargs):
+        '''
+        Return a new Stack with this stack's name, a copy of the given
+        template, and the given keyword arguments for cloning this stack.
+        '''
+        return type(self)(self.context, self.name, copy.deepcopy(template),
+                          **kwargs)
+
+    def _remove_backup_stack(self, backup_stack):
+        '''
+        Delete the backup stack of a completed update, if one was needed.
+        '''
+        if backup_stack is not None:
+            LOG.debug('Deleting backup stack')
+            backup_stack.delete(backup=True)
+
+    def _template_snapshot(self):
+        '''
+        Return a cheap copy of the template that is unaffected by resources
+        subsequently being added to or removed from the stack.
+
+        Only the resources section is copied; the resource snippets are
+        shared, since they are only ever replaced and never modified in place.
+        '''
+        raw = dict(self.t.t)
+        resources = raw.get(self.t.RESOURCES)
+        if resources is not None:
+            raw[self.t.RESOURCES] = dict(resources)
+        return tmpl.Template(raw, files=self.t.files, env=self.t.env)
+
     @profiler.trace('Stack.adopt', hide_args=False)
     def adopt(self):
         '''
@@ -1094,19 +1168,22 @@ class Stack(collections.Mapping):
         self.state_set(action, self.IN_PROGRESS,
                        'Stack %s started' % action)
 
-        if action == self.UPDATE:
-            # Oldstack is useless when the action is not UPDATE , so we don't
-            # need to build it, this can avoid some unexpected errors.
-            kwargs = self.get_kwargs_for_cloning()
-            oldstack = Stack(self.context, self.name, copy.deepcopy(self.t),
-                             **kwargs)
+        # Copying the whole template and storing a backup stack is only
+        # needed if a resource is replaced or the update is rolled back, so
+        # keep a cheap snapshot of the current state from which to do so
+        # only when needed.
+        old_template = self._template_snapshot()
+        old_kwargs = self.get_kwargs_for_cloning()
+        create_backup_stack = functools.partial(self._create_backup_stack,
+                                                old_template, old_kwargs)
 
-        backup_stack = self._backup_stack()
+        backup_stack = self._backup_stack(create_if_missing=False)
         try:
             update_task = update.StackUpdate(
                 self, newstack, backup_stack,
                 rollback=action == self.ROLLBACK,
-                error_wait_time=cfg.CONF.error_wait_time)
+                error_wait_time=cfg.CONF.error_wait_time,
+                create_backup=create_backup_stack)
             updater = scheduler.TaskRunner(update_task)
 
             self.parameters = newstack.parameters
@@ -1153,7 +1230,9 @@ class Stack(collections.Mapping):
             stack_status = self.FAILED
             if action == self.UPDATE:
                 update_task.updater.cancel_all()
-                yield self.update_task(oldstack, action=self.ROLLBACK)
+                yield self.update_task(
+                    self._clone_with_template(old_template, old_kwargs),
+                    action=self.ROLLBACK)
                 return
 
         except exception.ResourceFailure as e:
@@ -1164,11 +1243,12 @@ class Stack(collections.Mapping):
                 # If rollback is enabled, we do another update, with the
                 # existing template, so we roll back to the original state
                 if not self.disable_rollback:
-                    yield self.update_task(oldstack, action=self.ROLLBACK)
+                    yield self.update_task(
+                        self._clone_with_template(old_template, old_kwargs),
+                        action=self.ROLLBACK)
                     return
         else:
-            LOG.debug('Deleting backup stack')
-            backup_stack.delete(backup=True)
+            self._remove_backup_stack(update_task.previous_stack)
 
             # flip the template to the newstack values
             self.t = newstack.t
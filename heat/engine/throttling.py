@@ -0,0 +1,184 @@
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Per-backend limits on the resource actions run by an engine process.
+
+Left alone, the scheduler starts every resource that is ready at once, so
+that e.g. a large group of servers results in a burst of create calls which
+trips the quotas and rate limits of the backend. A throttle, shared by all
+resources using the same client plugin on behalf of the same tenant, limits
+the number of actions in progress and shapes the rate of the handle and
+completion check calls made for them with a token bucket.
+
+Throttled tasks do not block; they yield the time at which they may next
+proceed to the scheduler, so that the other tasks of a stack keep running.
+"""
+
+import time
+
+from oslo_config import cfg
+from oslo_log import log as logging
+
+cfg.CONF.import_opt('max_actions_in_progress', 'heat.common.config',
+                    group='clients')
+cfg.CONF.import_opt('max_calls_per_second', 'heat.common.config',
+                    group='clients')
+
+LOG = logging.getLogger(__name__)
+
+# Seconds between checks for a free slot by an action waiting to start
+SLOT_POLL_INTERVAL = 0.2
+
+_now = time.time
+
+_throttles = None
+
+
+class Throttle(object):
+    """Limits the resource actions run against one backend for one tenant.
+
+    All of the accounting happens without yielding to other green threads,
+    so no locking is needed.
+    """
+
+    def __init__(self, max_in_progress, calls_per_second):
+        self.max_in_progress = max_in_progress
+        self.calls_per_second = calls_per_second
+        self.burst = max(calls_per_second, 1.0)
+        self._tokens = self.burst
+        self._filled_at = _now()
+        self.in_progress = 0
+        self.queue_depth = 0
+        self._stats = {'actions': 0, 'calls': 0, 'waits': 0,
+                       'total_wait': 0.0, 'max_wait': 0.0,
+                       'max_queue_depth': 0}
+
+    def _call_delay(self):
+        """Take a token for a call, or return the seconds until one is due."""
+        if self.calls_per_second > 0:
+            now = _now()
+            elapsed = max(now - self._filled_at, 0)
+            self._tokens = min(self._tokens + elapsed * self.calls_per_second,
+                               self.burst)
+            self._filled_at = now
+            if self._tokens < 1:
+                return (1 - self._tokens) / self.calls_per_second
+            self._tokens -= 1
+
+        self._stats['calls'] += 1
+        return None
+
+    def _start_delay(self):
+        if 0 < self.max_in_progress <= self.in_progress:
+            return SLOT_POLL_INTERVAL
+
+        delay = self._call_delay()
+        if delay is None:
+            self.in_progress += 1
+            self._stats['actions'] += 1
+        return delay
+
+    def _wait(self, attempt):
+        delay = attempt()
+        if delay is None:
+            return
+
+        started = _now()
+        self.queue_depth += 1
+        self._stats['max_queue_depth'] = max(self._stats['max_queue_depth'],
+                                             self.queue_depth)
+        try:
+            while delay is not None:
+                yield delay
+                delay = attempt()
+        finally:
+            self.queue_depth -= 1
+
+        waited = _now() - started
+        self._stats['waits'] += 1
+        self._stats['total_wait'] += waited
+        self._stats['max_wait'] = max(self._stats['max_wait'], waited)
+        LOG.debug('Resource action throttled for %.3f seconds' % waited)
+
+    def start_action(self):
+        """
+        Return a task which waits until an action may start.
+
+        The task yields the number of seconds until it next needs to run, and
+        on completion holds one of the slots for actions in progress, which
+        must be returned with end_action().
+        """
+        return self._wait(self._start_delay)
+
+    def end_action(self):
+        """Return the slot held by an action once it is complete."""
+        self.in_progress -= 1
+
+    def call(self):
+        """
+        Return a task which waits until another call may be made for an
+        action in progress.
+        """
+        return self._wait(self._call_delay)
+
+    def stats(self):
+        """Return the current queue depth and counters of calls and waits."""
+        stats = dict(self._stats)
+        stats.update(in_progress=self.in_progress,
+                     queue_depth=self.queue_depth)
+        waits = stats['waits']
+        stats['mean_wait'] = stats['total_wait'] / waits if waits else 0.0
+        return stats
+
+
+def _client_option(client_name, option):
+    # Options set in the [clients_<name>] group override [clients]
+    try:
+        value = cfg.CONF['clients_' + client_name][option]
+    except (cfg.NoSuchOptError, cfg.NoSuchGroupError):
+        value = None
+    if value is None:
+        value = cfg.CONF.clients[option]
+    return value
+
+
+def get_throttle(client_name, context):
+    """
+    Return the throttle shared by all resource actions using the named client
+    plugin on behalf of the context's tenant.
+
+    Resources which do not use a client plugin are never throttled.
+    """
+    global _throttles
+    if client_name is None:
+        return Throttle(0, 0)
+    if _throttles is None:
+        _throttles = {}
+
+    key = (client_name, context.tenant_id, context.region_name)
+    throttle = _throttles.get(key)
+    if throttle is None:
+        throttle = Throttle(
+            _client_option(client_name, 'max_actions_in_progress'),
+            _client_option(client_name, 'max_calls_per_second'))
+        _throttles[key] = throttle
+    return throttle
+
+
+def get_stats():
+    """
+    Return the statistics of every throttle, keyed by client plugin name,
+    tenant and region.
+    """
+    return dict((key, throttle.stats())
+                for key, throttle in (_throttles or {}).items())
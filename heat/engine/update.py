@@ -29,11 +29,18 @@ class StackUpdate(object):
     """
 
     def __init__(self, existing_stack, new_stack, previous_stack,
-                 rollback=False, error_wait_time=None):
-        """Initialise with the existing stack and the new stack."""
+                 rollback=False, error_wait_time=None, create_backup=None):
+        """
+        Initialise with the existing stack and the new stack.
+
+        If there is no backup stack yet, previous_stack may be None, in which
+        case create_backup is called to create one when a resource is first
+        backed up.
+        """
         self.existing_stack = existing_stack
         self.new_stack = new_stack
         self.previous_stack = previous_stack
+        self.create_backup = create_backup
 
         self.rollback = rollback
         self.error_wait_time = error_wait_time
@@ -51,23 +58,33 @@ class StackUpdate(object):
     def __call__(self):
         """Return a co-routine that updates the stack."""
 
-        cleanup_prev = scheduler.DependencyTaskGroup(
-            self.previous_stack.dependencies,
-            self._remove_backup_resource,
-            reverse=True)
-
         self.updater = scheduler.DependencyTaskGroup(
             self.dependencies(),
             self._resource_update,
             error_wait_time=self.error_wait_time)
 
-        if not self.rollback:
+        if not self.rollback and self.previous_stack is not None:
+            cleanup_prev = scheduler.DependencyTaskGroup(
+                self.previous_stack.dependencies,
+                self._remove_backup_resource,
+                reverse=True)
             yield cleanup_prev()
 
         try:
             yield self.updater()
         finally:
-            self.previous_stack.reset_dependencies()
+            if self.previous_stack is not None:
+                self.previous_stack.reset_dependencies()
+
+    def _in_previous_stack(self, res_name):
+        return (self.previous_stack is not None and
+                res_name in self.previous_stack)
+
+    def _backup_stack(self):
+        if self.previous_stack is None:
+            LOG.debug("Creating backup stack for %s" % self.existing_stack)
+            self.previous_stack = self.create_backup()
+        return self.previous_stack
 
     def _resource_update(self, res):
         if res.name in self.new_stack and self.new_stack[res.name] is res:
@@ -95,7 +112,7 @@ class StackUpdate(object):
         res_name = new_res.name
 
         # Clean up previous resource
-        if res_name in self.previous_stack:
+        if self._in_previous_stack(res_name):
             prev_res = self.previous_stack[res_name]
 
             if prev_res.state not in ((prev_res.INIT, prev_res.COMPLETE),
@@ -115,7 +132,7 @@ class StackUpdate(object):
         if res_name in self.existing_stack:
             LOG.debug("Backing up existing Resource %s" % res_name)
             existing_res = self.existing_stack[res_name]
-            self.previous_stack.add_resource(existing_res)
+            self._backup_stack().add_resource(existing_res)
             existing_res.state_set(existing_res.UPDATE, existing_res.COMPLETE)
 
         self.existing_stack.add_resource(new_res)
@@ -136,9 +153,12 @@ class StackUpdate(object):
                 pass
             else:
                 # Save resource definition to backup stack if it is not
-                # present in backup stack template already
-                if res_name not in self.previous_stack.t[
-                        self.previous_stack.t.RESOURCES]:
+                # present in backup stack template already. A backup stack
+                # created later starts from the original template, which
+                # already contains it.
+                if (self.previous_stack is not None and
+                        res_name not in self.previous_stack.t[
+                            self.previous_stack.t.RESOURCES]):
                     definition = existing_res.t.reparse(self.previous_stack,
                                                         existing_res.stack.t)
                     self.previous_stack.t.add_resource(definition)
@@ -154,7 +174,10 @@ class StackUpdate(object):
 
     def _update_in_place(self, existing_res, new_res):
         existing_snippet = self.existing_snippets[existing_res.name]
-        prev_res = self.previous_stack.get(new_res.name)
+        if self.previous_stack is not None:
+            prev_res = self.previous_stack.get(new_res.name)
+        else:
+            prev_res = None
 
         # Note the new resource snippet is resolved in the context
         # of the existing stack (which is the stack being updated)
@@ -170,7 +193,7 @@ class StackUpdate(object):
     def _process_existing_resource_update(self, existing_res):
         res_name = existing_res.name
 
-        if res_name in self.previous_stack:
+        if self._in_previous_stack(res_name):
             yield self._remove_backup_resource(self.previous_stack[res_name])
 
         if res_name in self.new_stack:
@@ -109,14 +109,14 @@ class VolumeAttachTask(object):
         self.attachment_id = va.id
         yield
 
-        cinder = self.clients.client('cinder')
+        cinder_plugin = self.clients.client_plugin('cinder')
 
-        vol = cinder.volumes.get(self.volume_id)
+        vol = cinder_plugin.poll_volume(self.volume_id)
         while vol.status == 'available' or vol.status == 'attaching':
             LOG.debug('%(name)s - volume status: %(status)s'
                       % {'name': str(self), 'status': vol.status})
             yield
-            vol = cinder.volumes.get(self.volume_id)
+            vol = cinder_plugin.poll_volume(self.volume_id)
 
         if vol.status != 'in-use':
             LOG.info(_LI("Attachment failed - volume %(vol)s "
@@ -192,7 +192,7 @@ class VolumeDetachTask(object):
             while vol.status in ('in-use', 'detaching'):
                 LOG.debug('%s - volume still in use' % str(self))
                 yield
-                vol = cinder.volumes.get(nova_vol.id)
+                vol = cinder_plugin.poll_volume(nova_vol.id)
 
             LOG.info(_LI('%(name)s - status: %(status)s'),
                      {'name': str(self), 'status': vol.status})
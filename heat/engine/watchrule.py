@@ -12,10 +12,12 @@
 #    under the License.
 
 
+import collections
 import datetime
 
 from oslo_log import log as logging
 from oslo_utils import timeutils
+import six
 
 from heat.common import exception
 from heat.common.i18n import _
@@ -30,6 +32,15 @@ from heat.rpc import api as rpc_api
 
 LOG = logging.getLogger(__name__)
 
+# Seconds by which each sync of the watch rule index re-reads rules changed
+# before the previous one, to allow for clock skew between the engines
+# which stored them.
+INDEX_SYNC_OVERLAP = 60
+
+# Seconds after which the watch rule index is rebuilt from every rule, to
+# catch any change the incremental syncs missed.
+INDEX_FULL_SYNC_INTERVAL = 600
+
 
 class WatchRule(object):
     WATCH_STATES = (
@@ -70,7 +81,7 @@ class WatchRule(object):
             period = int(rule['period'])
         self.timeperiod = datetime.timedelta(seconds=period)
         self.id = wid
-        self.watch_data = watch_data or []
+        self.watch_data = watch_data
         self.last_evaluated = last_evaluated
 
     @classmethod
@@ -116,6 +127,8 @@ class WatchRule(object):
         else:
             watch_rule_objects.WatchRule.update_by_id(self.context, self.id,
                                                       wr_values)
+        if _rule_index is not None:
+            _rule_index.add(self.id, self.rule, self.state)
 
     def destroy(self):
         '''
@@ -123,6 +136,8 @@ class WatchRule(object):
         '''
         if self.id:
             watch_rule_objects.WatchRule.delete(self.context, self.id)
+            if _rule_index is not None:
+                _rule_index.remove(self.id)
 
     def do_data_cmp(self, data, threshold):
         op = self.rule['ComparisonOperator']
@@ -137,96 +152,57 @@ class WatchRule(object):
         else:
             return False
 
-    def do_Maximum(self):
-        data = 0
-        have_data = False
-        for d in self.watch_data:
-            if d.created_at < self.now - self.timeperiod:
-                continue
-            if not have_data:
-                data = float(d.data[self.rule['MetricName']]['Value'])
-                have_data = True
-            if float(d.data[self.rule['MetricName']]['Value']) > data:
-                data = float(d.data[self.rule['MetricName']]['Value'])
-
-        if not have_data:
-            return self.NODATA
+    def _period_values(self):
+        '''
+        Return the values of the metric sampled within the rule's period.
 
+        If no samples were given, those within the period are read from the
+        database.
+        '''
+        cutoff = self.now - self.timeperiod
+        watch_data = self.watch_data
+        if watch_data is None:
+            if not self.id:
+                return []
+            watch_data = watch_data_objects.WatchData.get_all_by_watch_rule_id(
+                self.context, self.id, since=cutoff)
+        metric = self.rule['MetricName']
+        return [float(d.data[metric]['Value']) for d in watch_data
+                if d.created_at >= cutoff]
+
+    def _threshold_state(self, data):
         if self.do_data_cmp(data,
                             float(self.rule['Threshold'])):
             return self.ALARM
         else:
             return self.NORMAL
 
-    def do_Minimum(self):
-        data = 0
-        have_data = False
-        for d in self.watch_data:
-            if d.created_at < self.now - self.timeperiod:
-                continue
-            if not have_data:
-                data = float(d.data[self.rule['MetricName']]['Value'])
-                have_data = True
-            elif float(d.data[self.rule['MetricName']]['Value']) < data:
-                data = float(d.data[self.rule['MetricName']]['Value'])
-
-        if not have_data:
+    def do_Maximum(self):
+        values = self._period_values()
+        if not values:
             return self.NODATA
+        return self._threshold_state(max(values))
 
-        if self.do_data_cmp(data,
-                            float(self.rule['Threshold'])):
-            return self.ALARM
-        else:
-            return self.NORMAL
+    def do_Minimum(self):
+        values = self._period_values()
+        if not values:
+            return self.NODATA
+        return self._threshold_state(min(values))
 
     def do_SampleCount(self):
         '''
         count all samples within the specified period
         '''
-        data = 0
-        for d in self.watch_data:
-            if d.created_at < self.now - self.timeperiod:
-                continue
-            data = data + 1
-
-        if self.do_data_cmp(data,
-                            float(self.rule['Threshold'])):
-            return self.ALARM
-        else:
-            return self.NORMAL
+        return self._threshold_state(len(self._period_values()))
 
     def do_Average(self):
-        data = 0
-        samples = 0
-        for d in self.watch_data:
-            if d.created_at < self.now - self.timeperiod:
-                continue
-            samples = samples + 1
-            data = data + float(d.data[self.rule['MetricName']]['Value'])
-
-        if samples == 0:
+        values = self._period_values()
+        if not values:
             return self.NODATA
-
-        data = data / samples
-        if self.do_data_cmp(data,
-                            float(self.rule['Threshold'])):
-            return self.ALARM
-        else:
-            return self.NORMAL
+        return self._threshold_state(sum(values) / len(values))
 
     def do_Sum(self):
-        data = 0
-        for d in self.watch_data:
-            if d.created_at < self.now - self.timeperiod:
-                LOG.debug('ignoring %s' % str(d.data))
-                continue
-            data = data + float(d.data[self.rule['MetricName']]['Value'])
-
-        if self.do_data_cmp(data,
-                            float(self.rule['Threshold'])):
-            return self.ALARM
-        else:
-            return self.NORMAL
+        return self._threshold_state(sum(self._period_values()))
 
     def get_alarm_state(self):
         fn = getattr(self, 'do_%s' % self.rule['Statistic'])
@@ -252,8 +228,17 @@ class WatchRule(object):
 
         self.last_evaluated = self.now
         self.store()
+        self.expire_watch_data()
         return actions
 
+    def expire_watch_data(self):
+        '''
+        Delete the stored samples which are too old to affect the rule.
+        '''
+        if self.id:
+            watch_data_objects.WatchData.delete_expired(
+                self.context, self.id, self.now - self.timeperiod)
+
     def rule_actions(self, new_state):
         LOG.info(_LI('WATCH: stack:%(stack)s, watch_name:%(watch_name)s, '
                      'new_state:%(new_state)s'), {'stack': self.stack_id,
@@ -323,6 +308,8 @@ class WatchRule(object):
 
         watch_data = {
             'data': data,
+            'namespace': data.get('Namespace'),
+            'metric_name': self.rule['MetricName'],
             'watch_rule_id': self.id
         }
         wd = watch_data_objects.WatchData.create(self.context, watch_data)
@@ -363,6 +350,33 @@ class WatchRule(object):
         return actions
 
 
+def _rule_metric_dimensions(rule, state):
+    '''
+    Return the metric name and dimensions a rule matches samples against,
+    or None if the rule does not accept samples in its current state.
+    '''
+    if state == WatchRule.SUSPENDED:
+        return None
+    if state == WatchRule.CEILOMETER_CONTROLLED:
+        metric = rule['meter_name']
+        rule_dims = {}
+        for k, v in iter(rule.get('matching_metadata', {}).items()):
+            name = k.split('.')[-1]
+            rule_dims[name] = v
+    else:
+        metric = rule['MetricName']
+        rule_dims = dict((d['Name'], d['Value'])
+                         for d in rule.get('Dimensions', []))
+    return metric, rule_dims
+
+
+def _sample_dimensions(sample):
+    data_dims = sample.get('Dimensions', {})
+    if isinstance(data_dims, list):
+        data_dims = data_dims[0]
+    return data_dims
+
+
 def rule_can_use_sample(wr, stats_data):
     def match_dimesions(rule, data):
         for k, v in iter(rule.items()):
@@ -372,18 +386,10 @@ def rule_can_use_sample(wr, stats_data):
                 return False
         return True
 
-    if wr.state == WatchRule.SUSPENDED:
+    metric_dims = _rule_metric_dimensions(wr.rule, wr.state)
+    if metric_dims is None:
         return False
-    if wr.state == WatchRule.CEILOMETER_CONTROLLED:
-        metric = wr.rule['meter_name']
-        rule_dims = {}
-        for k, v in iter(wr.rule.get('matching_metadata', {}).items()):
-            name = k.split('.')[-1]
-            rule_dims[name] = v
-    else:
-        metric = wr.rule['MetricName']
-        rule_dims = dict((d['Name'], d['Value'])
-                         for d in wr.rule.get('Dimensions', []))
+    metric, rule_dims = metric_dims
 
     if metric not in stats_data:
         return False
@@ -392,9 +398,129 @@ def rule_can_use_sample(wr, stats_data):
         if k == 'Namespace':
             continue
         if k == metric:
-            data_dims = v.get('Dimensions', {})
-            if isinstance(data_dims, list):
-                data_dims = data_dims[0]
+            data_dims = _sample_dimensions(v)
             if match_dimesions(rule_dims, data_dims):
                 return True
     return False
+
+
+class WatchRuleIndex(object):
+    '''
+    An index from metric name and dimensions to the watch rules which can
+    use a sample.
+
+    Each rule is indexed under its metric name and each of its dimension
+    key/value pairs; a sample matches a rule when it hits all of the rule's
+    dimensions. The index is kept current with rules created, updated and
+    deleted by any engine by re-reading only the rules whose timestamps have
+    changed since shortly before the last synchronisation, and by rebuilding
+    it from every rule once in a while.
+    '''
+
+    def __init__(self):
+        self._metrics = {}
+        self._rules = {}
+        self._synced_at = None
+        self._rebuilt_at = None
+
+    def __len__(self):
+        return len(self._rules)
+
+    @staticmethod
+    def _dimension_key(name, value):
+        # Dimension values are compared as strings so that every value is
+        # hashable; candidates are verified against the rule afterwards.
+        return name, six.text_type(value)
+
+    def add(self, rule_id, rule, state):
+        self.remove(rule_id)
+        metric_dims = _rule_metric_dimensions(rule, state)
+        if metric_dims is None:
+            return
+        metric, rule_dims = metric_dims
+
+        keys = set(self._dimension_key(k, v) for k, v in rule_dims.items())
+        any_dims, by_dim = self._metrics.setdefault(metric, (set(), {}))
+        if not keys:
+            any_dims.add(rule_id)
+        for key in keys:
+            by_dim.setdefault(key, set()).add(rule_id)
+        self._rules[rule_id] = (metric, keys)
+
+    def remove(self, rule_id):
+        entry = self._rules.pop(rule_id, None)
+        if entry is None:
+            return
+        metric, keys = entry
+        any_dims, by_dim = self._metrics[metric]
+        any_dims.discard(rule_id)
+        for key in keys:
+            by_dim[key].discard(rule_id)
+            if not by_dim[key]:
+                del by_dim[key]
+        if not any_dims and not by_dim:
+            del self._metrics[metric]
+
+    def candidates(self, stats_data):
+        '''Return the ids of the rules which may use the sample.'''
+        matches = set()
+        for metric, sample in iter(stats_data.items()):
+            if metric == 'Namespace' or metric not in self._metrics:
+                continue
+            any_dims, by_dim = self._metrics[metric]
+            matches.update(any_dims)
+
+            hits = collections.Counter()
+            for k, v in iter(_sample_dimensions(sample).items()):
+                hits.update(by_dim.get(self._dimension_key(k, v), ()))
+            matches.update(rule_id for rule_id, count in hits.items()
+                           if count == len(self._rules[rule_id][1]))
+        return matches
+
+    def sync(self, context):
+        '''Apply the rules changed in the database since the last sync.'''
+        rebuild = (self._rebuilt_at is None or
+                   timeutils.is_older_than(self._rebuilt_at,
+                                           INDEX_FULL_SYNC_INTERVAL))
+        updated_since = None
+        if not rebuild and self._synced_at is not None:
+            updated_since = self._synced_at - datetime.timedelta(
+                seconds=INDEX_SYNC_OVERLAP)
+
+        started_at = timeutils.utcnow()
+        summary = watch_rule_objects.WatchRule.get_all_summary(
+            context, updated_since=updated_since)
+        if rebuild:
+            self._metrics = {}
+            self._rules = {}
+            self._synced_at = None
+            self._rebuilt_at = started_at
+
+        for rule_id, rule, state, created_at, updated_at in summary:
+            self.add(rule_id, rule, state)
+            changed_at = max(created_at, updated_at or created_at)
+            if self._synced_at is None or changed_at > self._synced_at:
+                self._synced_at = changed_at
+        if rebuild:
+            LOG.debug('Built watch rule index with %d rules' % len(self))
+
+    def matching_rules(self, context, stats_data):
+        '''Return the WatchRule objects which can use the sample.'''
+        self.sync(context)
+        rule_ids = self.candidates(stats_data)
+        wrs = watch_rule_objects.WatchRule.get_all_by_ids(
+            context, list(rule_ids))
+        for missing in rule_ids - set(wr.id for wr in wrs):
+            # Deleted since the last sync
+            self.remove(missing)
+        return [wr for wr in wrs if rule_can_use_sample(wr, stats_data)]
+
+
+_rule_index = None
+
+
+def rule_index():
+    global _rule_index
+    if _rule_index is None:
+        _rule_index = WatchRuleIndex()
+    return _rule_index
@@ -0,0 +1,92 @@
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+
+"""
+Blob object
+
+Blobs hold JSON-serializable content compressed and addressed by the SHA-256
+digest of its canonical serialization, so that identical content (such as
+the files map shared by a stack and all of its nested stacks) is stored
+only once.
+"""
+
+import hashlib
+import zlib
+
+from oslo_config import cfg
+from oslo_serialization import jsonutils
+from oslo_versionedobjects import base
+from oslo_versionedobjects import fields
+
+from heat.common import cache
+from heat.db import api as db_api
+from heat.objects import fields as heat_fields
+
+cfg.CONF.import_opt('blob_cache_size', 'heat.common.config')
+
+_blob_cache = None
+
+
+def _cache():
+    global _blob_cache
+    if _blob_cache is None:
+        _blob_cache = cache.LRUCache(cfg.CONF.blob_cache_size)
+    return _blob_cache
+
+
+def _serialize(content):
+    return jsonutils.dumps(content, sort_keys=True,
+                           separators=(',', ':')).encode('utf-8')
+
+
+class Blob(
+    base.VersionedObject,
+    base.VersionedObjectDictCompat,
+    base.ComparableVersionedObject,
+):
+    fields = {
+        'id': fields.StringField(),
+        'content': heat_fields.JsonField(),
+        'size': fields.IntegerField(),
+    }
+
+    @staticmethod
+    def _from_db_object(context, blob, db_blob):
+        blob.id = db_blob.id
+        blob.size = db_blob.size
+        blob.content = jsonutils.loads(
+            zlib.decompress(db_blob.data).decode('utf-8'))
+        blob._context = context
+        blob.obj_reset_changes()
+        return blob
+
+    @classmethod
+    def get_by_id(cls, context, blob_id):
+        # Blobs never change once stored, so cached content is never stale
+        blob = _cache().get(blob_id)
+        if blob is None:
+            blob = cls._from_db_object(context, cls(),
+                                       db_api.blob_get(context, blob_id))
+            _cache().set(blob_id, blob)
+        return blob
+
+    @classmethod
+    def create(cls, context, content):
+        """Store content, unless it is already stored, and return its id."""
+        data = _serialize(content)
+        blob_id = hashlib.sha256(data).hexdigest()
+        db_api.blob_create(context, {'id': blob_id,
+                                     'data': zlib.compress(data),
+                                     'size': len(data)})
+        return blob_id
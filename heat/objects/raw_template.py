@@ -25,6 +25,7 @@ from oslo_versionedobjects import fields
 from heat.common import crypt
 from heat.common import environment_format as env_fmt
 from heat.db import api as db_api
+from heat.objects import blob
 from heat.objects import fields as heat_fields
 
 
@@ -46,6 +47,12 @@ class RawTemplate(
         for field in tpl.fields:
             tpl[field] = db_tpl[field]
 
+        # The files map is shared by nested stacks and successive updates,
+        # so it is stored once as a blob
+        if db_tpl['files_id'] is not None:
+            tpl.files = dict(blob.Blob.get_by_id(context,
+                                                 db_tpl['files_id']).content)
+
         # If any of the parameters were encrypted, then decrypt them
         parameters = tpl.environment[env_fmt.PARAMETERS]
         encrypted_param_names = tpl.environment[env_fmt.ENCRYPTED_PARAM_NAMES]
@@ -77,10 +84,28 @@ class RawTemplate(
                 tmpl.env.params[param_name] = crypt.encrypt(encoded_val)
                 tmpl.env.encrypted_param_names.append(param_name)
 
+    @staticmethod
+    def _store_files(context, values):
+        # Only the files map is stored as a blob. It is copied unchanged to
+        # every nested stack and kept across updates, whereas a template body
+        # is specific to its stack, so sharing it would save nothing and
+        # cost one more query per template load. Nested stacks created over
+        # RPC are still sent the files map in full, since the engine API
+        # takes the files themselves rather than their digest.
+        if values.get('files'):
+            values = dict(values)
+            values['files_id'] = blob.Blob.create(context, values['files'])
+            values['files'] = None
+        elif 'files' in values:
+            values = dict(values, files_id=None)
+        return values
+
     @classmethod
     def create(cls, context, values):
-        return db_api.raw_template_create(context, values)
+        return db_api.raw_template_create(context,
+                                          cls._store_files(context, values))
 
     @classmethod
     def update_by_id(cls, context, template_id, values):
-        return db_api.raw_template_update(context, template_id, values)
+        return db_api.raw_template_update(context, template_id,
+                                          cls._store_files(context, values))
@@ -45,7 +45,9 @@ class Resource(
         'status_reason': fields.StringField(nullable=True),
         'action': fields.StringField(nullable=True),
         'rsrc_metadata': heat_fields.JsonField(nullable=True),
+        'rsrc_metadata_version': fields.IntegerField(nullable=True),
         'properties_data': heat_fields.JsonField(nullable=True),
+        'definition_digest': fields.StringField(nullable=True),
         'data': fields.ListOfObjectsField(
             resource_data.ResourceData,
             nullable=True
@@ -133,6 +135,18 @@ class Resource(
         resource = cls._from_db_object(cls(context), context, resource_db)
         return resource
 
+    @classmethod
+    def get_metadata_by_name_and_stack(cls, context, resource_name, stack_id):
+        return db_api.resource_metadata_get_by_name_and_stack(
+            context,
+            resource_name,
+            stack_id)
+
+    @classmethod
+    def update_metadata(cls, context, resource_id, metadata, version):
+        return db_api.resource_metadata_update(context, resource_id,
+                                               metadata, version)
+
     @classmethod
     def get_by_physical_resource_id(cls, context, physical_resource_id):
         resource_db = db_api.resource_get_by_physical_resource_id(
@@ -141,6 +155,13 @@ class Resource(
         resource = cls._from_db_object(cls(context), context, resource_db)
         return resource
 
+    @classmethod
+    def get_identity_by_physical_resource_id(cls, context,
+                                             physical_resource_id):
+        return db_api.resource_identity_get_by_physical_resource_id(
+            context,
+            physical_resource_id)
+
     def update_and_save(self, values):
         resource_db = db_api.resource_get(self._context, self.id)
         resource_db.update_and_save(values)
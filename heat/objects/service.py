@@ -82,6 +82,12 @@ class Service(base.VersionedObject,
         return cls._from_db_objects(context,
                                     db_api.service_get_all(context))
 
+    @classmethod
+    def get_all_by_engine_ids(cls, context, engine_ids):
+        return cls._from_db_objects(
+            context,
+            db_api.service_get_all_by_engine_ids(context, engine_ids))
+
     @classmethod
     def get_all_by_args(cls, context, host, binary, hostname):
         return cls._from_db_objects(
@@ -130,6 +130,10 @@ class Stack(
             db_stacks)
         return stacks
 
+    @classmethod
+    def get_owner_ids(cls, context, stack_ids):
+        return db_api.stack_get_owner_ids(context, stack_ids)
+
     @classmethod
     def count_all(cls, context, **kwargs):
         return db_api.stack_count_all(context, **kwargs)
@@ -49,3 +49,7 @@ class StackLock(base.VersionedObject,
     @classmethod
     def get_engine_id(cls, stack_id):
         return db_api.stack_lock_get_engine_id(stack_id)
+
+    @classmethod
+    def get_engine_ids(cls, stack_ids):
+        return db_api.stack_lock_get_engine_ids(stack_ids)
@@ -18,11 +18,30 @@ UserCreds object
 """
 
 
+from oslo_config import cfg
 from oslo_versionedobjects import base
 from oslo_versionedobjects import fields
 
+from heat.common import cache
 from heat.db import api as db_api
 
+cfg.CONF.import_opt('stored_context_cache_size', 'heat.common.config')
+
+# Number of seconds for which decrypted credentials are reused. Deleting
+# them only clears the cache of the engine doing so, so the other engines
+# must not hold on to them for long.
+DECRYPTED_CREDS_TTL = 60
+
+_decrypted_creds_cache = None
+
+
+def _decrypted_creds():
+    global _decrypted_creds_cache
+    if _decrypted_creds_cache is None:
+        _decrypted_creds_cache = cache.LRUCache(
+            cfg.CONF.stored_context_cache_size, ttl=DECRYPTED_CREDS_TTL)
+    return _decrypted_creds_cache
+
 
 @base.VersionedObjectRegistry.register
 class UserCreds(base.VersionedObject,
@@ -64,10 +83,19 @@ class UserCreds(base.VersionedObject,
 
     @classmethod
     def delete(cls, context, user_creds_id):
+        _decrypted_creds().pop(str(user_creds_id))
         return db_api.user_creds_delete(context, user_creds_id)
 
     @classmethod
     def get_by_id(cls, context_id):
-        user_creds_db = db_api.user_creds_get(context_id)
+        # Stored credentials never change once created, so the decrypted
+        # copy can be reused until they are deleted or it expires. Callers
+        # pass the id as either an integer or a string, so key on the latter.
+        key = str(context_id)
+        user_creds_db = _decrypted_creds().get(key)
+        if user_creds_db is None:
+            user_creds_db = db_api.user_creds_get(context_id)
+            if user_creds_db is not None:
+                _decrypted_creds().set(key, dict(user_creds_db))
         user_creds = cls._from_db_object(cls(), user_creds_db)
         return user_creds
@@ -28,6 +28,8 @@ class WatchData(base.VersionedObject, base.VersionedObjectDictCompat):
     fields = {
         'id': fields.IntegerField(),
         'data': heat_fields.JsonField(nullable=True),
+        'namespace': fields.StringField(nullable=True),
+        'metric_name': fields.StringField(nullable=True),
         'watch_rule_id': fields.StringField(),
         'watch_rule': fields.ObjectField('WatchRule'),
         'created_at': fields.DateTimeField(read_only=True),
@@ -55,12 +57,20 @@ class WatchData(base.VersionedObject, base.VersionedObjectDictCompat):
         return cls._from_db_object(context, cls(), db_data)
 
     @classmethod
-    def get_all(cls, context):
+    def get_all(cls, context, namespace=None, metric_name=None,
+                limit=None, marker=None):
         return [cls._from_db_object(context, cls(), db_data)
-                for db_data in db_api.watch_data_get_all(context)]
+                for db_data in db_api.watch_data_get_all(
+                    context, namespace=namespace, metric_name=metric_name,
+                    limit=limit, marker=marker)]
 
     @classmethod
-    def get_all_by_watch_rule_id(cls, context, watch_rule_id):
+    def get_all_by_watch_rule_id(cls, context, watch_rule_id, since=None):
         return (cls._from_db_object(context, cls(), db_data)
                 for db_data in db_api.watch_data_get_all_by_watch_rule_id(
-                    context, watch_rule_id))
+                    context, watch_rule_id, since=since))
+
+    @classmethod
+    def delete_expired(cls, context, watch_rule_id, cutoff):
+        return db_api.watch_data_delete_expired(context, watch_rule_id,
+                                                cutoff)
@@ -76,6 +76,26 @@ class WatchRule(base.VersionedObject, base.VersionedObjectDictCompat):
                 for db_rule in db_api.watch_rule_get_all_by_stack(context,
                                                                   stack_id)]
 
+    @classmethod
+    def get_all_by_ids(cls, context, watch_rule_ids):
+        return [cls._from_db_object(context, cls(), db_rule)
+                for db_rule in db_api.watch_rule_get_all_by_ids(
+                    context, watch_rule_ids)]
+
+    @classmethod
+    def get_all_summary(cls, context, updated_since=None):
+        return db_api.watch_rule_get_all_summary(context,
+                                                 updated_since=updated_since)
+
+    @classmethod
+    def get_active_stack_ids(cls, context):
+        return db_api.watch_rule_get_active_stack_ids(context)
+
+    @classmethod
+    def update_all_by_stack_ids(cls, context, stack_ids, values):
+        return db_api.watch_rule_update_all_by_stack_ids(context, stack_ids,
+                                                         values)
+
     @classmethod
     def update_by_id(cls, context, watch_id, values):
         db_api.watch_rule_update(context, watch_id, values)
@@ -64,14 +64,20 @@ RES_KEYS = (
     RES_ACTION, RES_STATUS, RES_STATUS_DATA,
     RES_TYPE, RES_ID, RES_STACK_ID, RES_STACK_NAME,
     RES_REQUIRED_BY, RES_NESTED_STACK_ID, RES_NESTED_RESOURCES,
-    RES_PARENT_RESOURCE,
+    RES_PARENT_RESOURCE, RES_DEFINITION_DIGEST,
 ) = (
     'description', 'creation_time', 'updated_time',
     'resource_name', 'physical_resource_id', 'metadata',
     'resource_action', 'resource_status', 'resource_status_reason',
     'resource_type', 'resource_identity', STACK_ID, STACK_NAME,
     'required_by', 'nested_stack_id', 'nested_resources',
-    'parent_resource',
+    'parent_resource', 'definition_digest',
+)
+
+RES_METADATA_KEYS = (
+    RES_METADATA_VERSION,
+) = (
+    'metadata_version',
 )
 
 RES_SCHEMA_KEYS = (
@@ -167,10 +173,10 @@ WATCH_STATES = (
 )
 
 WATCH_DATA_KEYS = (
-    WATCH_DATA_ALARM, WATCH_DATA_METRIC, WATCH_DATA_TIME,
+    WATCH_DATA_ID, WATCH_DATA_ALARM, WATCH_DATA_METRIC, WATCH_DATA_TIME,
     WATCH_DATA_NAMESPACE, WATCH_DATA
 ) = (
-    'watch_name', 'metric_name', 'timestamp',
+    'id', 'watch_name', 'metric_name', 'timestamp',
     'namespace', 'data'
 )
 
@@ -30,6 +30,8 @@ class EngineClient(object):
         1.1 - Add support_status argument to list_resource_types()
         1.4 - Add support for service list
         1.9 - Add template_type option to generate_template()
+        1.10 - Add filtering and pagination to show_watch_metric()
+        1.11 - Add describe_stack_resource_metadata()
     '''
 
     BASE_RPC_API_VERSION = '1.0'
@@ -387,6 +389,25 @@ class EngineClient(object):
                                        with_attr=with_attr),
                          version='1.2')
 
+    def describe_stack_resource_metadata(self, ctxt, stack_identity,
+                                         resource_name,
+                                         metadata_version=None):
+        """
+        Get the metadata of a particular resource.
+        :param ctxt: RPC context.
+        :param stack_identity: Name of the stack.
+        :param resource_name: the Resource.
+        :param metadata_version: the version of the metadata already held by
+                                 the caller; if unchanged, the metadata is
+                                 omitted.
+        """
+        return self.call(ctxt,
+                         self.make_msg('describe_stack_resource_metadata',
+                                       stack_identity=stack_identity,
+                                       resource_name=resource_name,
+                                       metadata_version=metadata_version),
+                         version='1.11')
+
     def find_physical_resource(self, ctxt, physical_resource_id):
         """
         Return an identifier for the resource with the specified physical
@@ -487,7 +508,8 @@ class EngineClient(object):
         return self.call(ctxt, self.make_msg('show_watch',
                                              watch_name=watch_name))
 
-    def show_watch_metric(self, ctxt, metric_namespace=None, metric_name=None):
+    def show_watch_metric(self, ctxt, metric_namespace=None, metric_name=None,
+                          limit=None, marker=None):
         """
         The show_watch_metric method returns the datapoints associated
         with a specified metric, or all metrics if no metric_name is passed
@@ -497,10 +519,15 @@ class EngineClient(object):
                            or None to see all
         :param metric_name: Name of the metric you want to see,
                            or None to see all
+        :param limit: the number of datapoints to return
+        :param marker: the id of the last datapoint of the previous page
         """
         return self.call(ctxt, self.make_msg('show_watch_metric',
                                              metric_namespace=metric_namespace,
-                                             metric_name=metric_name))
+                                             metric_name=metric_name,
+                                             limit=limit,
+                                             marker=marker),
+                         version='1.10')
 
     def set_watch_state(self, ctxt, watch_name, state):
         '''
@@ -1202,10 +1202,15 @@ class InstancesTest(common.HeatTestCase):
         self._test_security_groups(instance, security_groups,
                                    sg='two', all_uuids=True)
 
+        # The listing of security groups is shared by the stack operation,
+        # so it is not repeated for groups found in it
         security_groups = ['security_group_1',
                            '384ccd91-447c-4d83-832c-06974a7d3d05']
-        self._test_security_groups(instance, security_groups, sg='two')
+        self._test_security_groups(instance, security_groups, sg='two',
+                                   listed=False)
 
+        # Groups missing from the shared listing are looked for in a fresh
+        # one, in case they were created since
         security_groups = ['wrong_group_name']
         self._test_security_groups(
             instance,
@@ -1230,10 +1235,15 @@ class InstancesTest(common.HeatTestCase):
         self._test_security_groups(
             instance,
             security_groups,
+            listed=False,
             get_secgroup_raises=exception.PhysicalResourceNameAmbiguity)
 
+        security_groups = ['security_group_3']
+        self._test_security_groups(instance, security_groups, sg='new')
+
     def _test_security_groups(self, instance, security_groups, sg='one',
-                              all_uuids=False, get_secgroup_raises=None):
+                              all_uuids=False, listed=True,
+                              get_secgroup_raises=None):
         fake_groups_list, props = self._get_fake_properties(sg)
 
         nclient = neutronclient.Client()
@@ -1242,11 +1252,13 @@ class InstancesTest(common.HeatTestCase):
 
         if not all_uuids:
             # list_security_groups only gets called when none of the requested
-            # groups look like UUIDs.
+            # groups look like UUIDs, and then only if they are not found in
+            # the listing already made for the stack operation.
             self.m.StubOutWithMock(
                 neutronclient.Client, 'list_security_groups')
-            neutronclient.Client.list_security_groups().AndReturn(
-                fake_groups_list)
+            if listed:
+                neutronclient.Client.list_security_groups().AndReturn(
+                    fake_groups_list)
         self.m.StubOutWithMock(neutron.NeutronClientPlugin,
                                'network_id_from_subnet_id')
         neutron.NeutronClientPlugin.network_id_from_subnet_id(
@@ -1323,6 +1335,16 @@ class InstancesTest(common.HeatTestCase):
         elif sg == 'two':
             props['security_groups'] = ['0389f747-7785-4757-b7bb-2ab07e4b09c3',
                                         '384ccd91-447c-4d83-832c-06974a7d3d05']
+        elif sg == 'new':
+            # A group created after the first listing was made
+            fake_groups_list['security_groups'].append({
+                'tenant_id': 'test_tenant_id',
+                'id': 'a4b2b6d5-3a02-4a5d-9a1b-2d6e0d3d7c8f',
+                'name': 'security_group_3',
+                'security_group_rules': [],
+                'description': 'no protocol'
+            })
+            props['security_groups'] = ['a4b2b6d5-3a02-4a5d-9a1b-2d6e0d3d7c8f']
 
         return fake_groups_list, props
 
@@ -82,6 +82,31 @@ class HeatTestCase(testscenarios.WithScenarios,
         self.useFixture(fixtures.MonkeyPatch(
             'heat.common.exception._FATAL_EXCEPTION_FORMAT_ERRORS',
             True))
+        # Start each test with empty process-wide credential caches
+        self.useFixture(fixtures.MonkeyPatch(
+            'heat.common.context._trust_token_cache', None))
+        self.useFixture(fixtures.MonkeyPatch(
+            'heat.objects.user_creds._decrypted_creds_cache', None))
+        self.useFixture(fixtures.MonkeyPatch(
+            'heat.engine.resources.template_resource._provider_cache', None))
+        self.useFixture(fixtures.MonkeyPatch(
+            'heat.engine.watchrule._rule_index', None))
+        self.useFixture(fixtures.MonkeyPatch(
+            'heat.engine.liveness._registry', None))
+        self.useFixture(fixtures.MonkeyPatch(
+            'heat.engine.clients.os.nova._userdata_skeleton_cache', None))
+        self.useFixture(fixtures.MonkeyPatch(
+            'heat.engine.clients.status_poller._pollers', None))
+        self.useFixture(fixtures.MonkeyPatch(
+            'heat.engine.service._metadata_access_cache', None))
+        self.useFixture(fixtures.MonkeyPatch(
+            'heat.engine.throttling._throttles', None))
+        self.useFixture(fixtures.MonkeyPatch(
+            'heat.objects.blob._blob_cache', None))
+        self.useFixture(fixtures.MonkeyPatch(
+            'heat.engine.local_engine._engine', None))
+        self.useFixture(fixtures.MonkeyPatch(
+            'heat.api.aws.ec2token._credentials_cache', None))
 
         def enable_sleep():
             scheduler.ENABLE_SLEEP = True
@@ -95,6 +120,8 @@ class HeatTestCase(testscenarios.WithScenarios,
 
         cfg.CONF.set_default('environment_dir', env_dir)
         cfg.CONF.set_override('error_wait_time', None)
+        # Servers are fetched individually unless a test enables bulk polling
+        cfg.CONF.set_override('bulk_status_poll_interval', 0)
         self.addCleanup(cfg.CONF.reset)
 
         messaging.setup("fake://", optional=True)
@@ -609,6 +609,24 @@ class HeatMigrationsCheckers(test_migrations.WalkVersionsMixin,
     def _check_062(self, engine, data):
         self.assertColumnExists(engine, 'stack', 'parent_resource_name')
 
+    def _check_063(self, engine, data):
+        self.assertColumnExists(engine, 'watch_data', 'namespace')
+        self.assertColumnExists(engine, 'watch_data', 'metric_name')
+        self.assertIndexMembers(engine, 'watch_data',
+                                'ix_watch_data_namespace_metric_name',
+                                ['namespace', 'metric_name'])
+
+    def _check_064(self, engine, data):
+        self.assertColumnExists(engine, 'resource', 'rsrc_metadata_version')
+
+    def _check_065(self, engine, data):
+        self.assertColumnExists(engine, 'resource', 'definition_digest')
+
+    def _check_066(self, engine, data):
+        for column in ('id', 'data', 'size', 'created_at', 'updated_at'):
+            self.assertColumnExists(engine, 'blob', column)
+        self.assertColumnExists(engine, 'raw_template', 'files_id')
+
 
 class TestHeatMigrationsMySQL(HeatMigrationsCheckers,
                               test_base.MySQLOpportunisticTestCase):
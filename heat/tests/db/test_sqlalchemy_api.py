@@ -25,6 +25,7 @@ from heat.common import context
 from heat.common import exception
 from heat.common import template_format
 from heat.db.sqlalchemy import api as db_api
+from heat.db.sqlalchemy import models
 from heat.engine.clients.os import glance
 from heat.engine.clients.os import nova
 from heat.engine import environment
@@ -33,6 +34,9 @@ from heat.engine.resources.aws.ec2 import instance as instances
 from heat.engine import scheduler
 from heat.engine import stack as parser
 from heat.engine import template as tmpl
+from heat.objects import blob as blob_object
+from heat.objects import user_creds as user_creds_object
+from heat.rpc import api as rpc_api
 from heat.tests import common
 from heat.tests.nova import fakes as fakes_nova
 from heat.tests import utils
@@ -1471,6 +1475,91 @@ class DBAPIRawTemplateTest(common.HeatTestCase):
         self.assertEqual(new_t, updated_tp.template)
         self.assertEqual(new_files, updated_tp.files)
 
+    def test_template_files_stored_as_blob(self):
+        t = template_format.parse(wp_template)
+        files = {'provider.yaml': 'heat_template_version: 2013-05-23'}
+        first = tmpl.Template(t, files=files)
+        first.store(self.ctx)
+        second = tmpl.Template(t, files=dict(files))
+        second.store(self.ctx)
+
+        first_db = db_api.raw_template_get(self.ctx, first.id)
+        second_db = db_api.raw_template_get(self.ctx, second.id)
+        self.assertIsNone(first_db.files)
+        self.assertIsNotNone(first_db.files_id)
+        self.assertEqual(first_db.files_id, second_db.files_id)
+        self.assertEqual(1, self.ctx.session.query(models.Blob).count())
+
+        loaded = tmpl.Template.load(self.ctx, second.id)
+        self.assertEqual(files, loaded.files)
+
+    def test_template_no_files(self):
+        t = template_format.parse(wp_template)
+        template = tmpl.Template(t)
+        template.store(self.ctx)
+
+        template_db = db_api.raw_template_get(self.ctx, template.id)
+        self.assertIsNone(template_db.files_id)
+        self.assertEqual({}, tmpl.Template.load(self.ctx, template.id).files)
+
+
+class DBAPIBlobTest(common.HeatTestCase):
+    def setUp(self):
+        super(DBAPIBlobTest, self).setUp()
+        self.ctx = utils.dummy_context()
+
+    def test_blob_create_get(self):
+        blob = db_api.blob_create(self.ctx, {'id': 'a' * 64,
+                                             'data': b'data',
+                                             'size': 4})
+        self.assertEqual('a' * 64, blob.id)
+        blob = db_api.blob_get(self.ctx, 'a' * 64)
+        self.assertEqual(b'data', blob.data)
+        self.assertEqual(4, blob.size)
+
+    def test_blob_create_existing(self):
+        first = db_api.blob_create(self.ctx, {'id': 'a' * 64,
+                                              'data': b'data',
+                                              'size': 4})
+        second = db_api.blob_create(self.ctx, {'id': 'a' * 64,
+                                               'data': b'data',
+                                               'size': 4})
+        self.assertEqual(first.id, second.id)
+        self.assertEqual(1, self.ctx.session.query(models.Blob).count())
+
+    def test_purge_unreferenced_blobs(self):
+        old = datetime.datetime.now() - datetime.timedelta(days=2)
+        for blob_id in ('a' * 64, 'b' * 64):
+            db_api.blob_create(self.ctx, {'id': blob_id, 'data': b'data',
+                                          'size': 4, 'created_at': old})
+        # Reused by a template about to be stored
+        db_api.blob_create(self.ctx, {'id': 'b' * 64, 'data': b'data',
+                                      'size': 4})
+
+        db_api.purge_deleted(age=1, granularity='days')
+        ctx = utils.dummy_context()
+        self.assertRaises(exception.NotFound, db_api.blob_get,
+                          ctx, 'a' * 64)
+        self.assertIsNotNone(db_api.blob_get(ctx, 'b' * 64))
+
+    def test_blob_get_not_found(self):
+        self.assertRaises(exception.NotFound, db_api.blob_get,
+                          self.ctx, 'b' * 64)
+
+    def test_blob_object_cached(self):
+        content = {'a.yaml': 'foo', 'b.yaml': 'bar'}
+        blob_id = blob_object.Blob.create(self.ctx, content)
+        self.assertEqual(64, len(blob_id))
+        self.assertEqual(blob_id, blob_object.Blob.create(self.ctx,
+                                                          dict(content)))
+
+        self.patchobject(db_api, 'blob_get', wraps=db_api.blob_get)
+        self.assertEqual(content,
+                         blob_object.Blob.get_by_id(self.ctx, blob_id).content)
+        self.assertEqual(content,
+                         blob_object.Blob.get_by_id(self.ctx, blob_id).content)
+        self.assertEqual(1, db_api.blob_get.call_count)
+
 
 class DBAPIUserCredsTest(common.HeatTestCase):
     def setUp(self):
@@ -1520,6 +1609,30 @@ class DBAPIUserCredsTest(common.HeatTestCase):
                    '%s that does not exist' % user_creds.id)
         self.assertIn(exp_msg, six.text_type(err))
 
+    def test_user_creds_object_cache_expires(self):
+        user_creds = create_user_creds(self.ctx)
+        self.assertIsNotNone(
+            user_creds_object.UserCreds.get_by_id(user_creds.id))
+
+        # Deleted through another engine, which leaves this cache alone
+        db_api.user_creds_delete(self.ctx, user_creds.id)
+        self.assertIsNotNone(
+            user_creds_object.UserCreds.get_by_id(user_creds.id))
+
+        self.patchobject(user_creds_object._decrypted_creds(), '_expired',
+                         return_value=True)
+        self.assertIsNone(
+            user_creds_object.UserCreds.get_by_id(user_creds.id))
+
+    def test_user_creds_object_cache_id_types(self):
+        user_creds = create_user_creds(self.ctx)
+        self.assertIsNotNone(
+            user_creds_object.UserCreds.get_by_id(int(user_creds.id)))
+
+        user_creds_object.UserCreds.delete(self.ctx, str(user_creds.id))
+        self.assertIsNone(
+            user_creds_object.UserCreds.get_by_id(int(user_creds.id)))
+
 
 class DBAPIStackTagTest(common.HeatTestCase):
     def setUp(self):
@@ -1701,6 +1814,19 @@ class DBAPIStackTest(common.HeatTestCase):
                                                            parent_stack2.id)
         self.assertEqual(2, len(stack2_children))
 
+    def test_stack_get_owner_ids(self):
+        parent = create_stack(self.ctx, self.template, self.user_creds)
+        child = create_stack(self.ctx, self.template, self.user_creds,
+                             owner_id=parent.id)
+        deleted = create_stack(self.ctx, self.template, self.user_creds,
+                               owner_id=parent.id)
+        db_api.stack_delete(self.ctx, deleted.id)
+
+        owners = db_api.stack_get_owner_ids(
+            self.ctx, [parent.id, child.id, deleted.id])
+        self.assertEqual({parent.id: None, child.id: parent.id}, owners)
+        self.assertEqual({}, db_api.stack_get_owner_ids(self.ctx, []))
+
     def test_stack_get_all_with_regular_tenant(self):
         values = [
             {'tenant': UUID1},
@@ -1845,6 +1971,46 @@ class DBAPIResourceTest(common.HeatTestCase):
                                                                 'abc',
                                                                 self.stack.id))
 
+    def test_resource_metadata_get_by_name_and_stack(self):
+        res = create_resource(self.ctx, self.stack)
+
+        ret = db_api.resource_metadata_get_by_name_and_stack(
+            self.ctx, 'test_resource_name', self.stack.id)
+        self.assertEqual((res.id, 'create', {'foo': '123'}), tuple(ret))
+
+        self.assertIsNone(db_api.resource_metadata_get_by_name_and_stack(
+            self.ctx, 'abc', self.stack.id))
+
+    def test_resource_metadata_update(self):
+        res = create_resource(self.ctx, self.stack)
+
+        self.assertTrue(db_api.resource_metadata_update(
+            self.ctx, res.id, {'foo': '456'}, res.rsrc_metadata_version))
+        ret_res = db_api.resource_get(self.ctx, res.id)
+        self.assertEqual({'foo': '456'}, ret_res.rsrc_metadata)
+        self.assertEqual(1, ret_res.rsrc_metadata_version)
+
+        # A stale version does not overwrite the newer metadata
+        self.assertFalse(db_api.resource_metadata_update(
+            self.ctx, res.id, {'foo': '789'}, 0))
+        ret_res = db_api.resource_get(self.ctx, res.id)
+        self.assertEqual({'foo': '456'}, ret_res.rsrc_metadata)
+
+    def test_resource_metadata_update_concurrent(self):
+        res = create_resource(self.ctx, self.stack)
+        version = db_api.resource_get(self.ctx, res.id).rsrc_metadata_version
+
+        other_ctx = utils.dummy_context()
+        self.assertTrue(db_api.resource_metadata_update(
+            other_ctx, res.id, {'foo': '456'}, version))
+
+        self.assertFalse(db_api.resource_metadata_update(
+            self.ctx, res.id, {'foo': '789'}, version))
+        # The losing writer reads the winner's metadata and version
+        ret_res = db_api.resource_get(self.ctx, res.id)
+        self.assertEqual({'foo': '456'}, ret_res.rsrc_metadata)
+        self.assertEqual((version or 0) + 1, ret_res.rsrc_metadata_version)
+
     def test_resource_get_by_physical_resource_id(self):
         create_resource(self.ctx, self.stack)
 
@@ -1855,6 +2021,38 @@ class DBAPIResourceTest(common.HeatTestCase):
         self.assertIsNone(db_api.resource_get_by_physical_resource_id(self.ctx,
                                                                       UUID2))
 
+    def test_resource_get_by_physical_resource_id_other_tenant(self):
+        other_stack = create_stack(self.ctx, self.template, self.user_creds,
+                                   tenant='other_tenant')
+        create_resource(self.ctx, other_stack, name='other')
+        create_resource(self.ctx, self.stack, name='mine')
+
+        ret_res = db_api.resource_get_by_physical_resource_id(self.ctx, UUID1)
+        self.assertEqual('mine', ret_res.name)
+        self.assertEqual(self.stack.id, ret_res.stack.id)
+
+    def test_resource_identity_get_by_physical_resource_id(self):
+        create_resource(self.ctx, self.stack)
+
+        ret = db_api.resource_identity_get_by_physical_resource_id(self.ctx,
+                                                                   UUID1)
+        self.assertEqual(('test_resource_name', self.stack.id,
+                          'db_test_stack_name', self.ctx.tenant_id),
+                         tuple(ret))
+
+        self.assertIsNone(
+            db_api.resource_identity_get_by_physical_resource_id(self.ctx,
+                                                                 UUID2))
+
+    def test_resource_identity_get_by_physical_resource_id_other_tenant(self):
+        other_stack = create_stack(self.ctx, self.template, self.user_creds,
+                                   tenant='other_tenant')
+        create_resource(self.ctx, other_stack)
+
+        self.assertIsNone(
+            db_api.resource_identity_get_by_physical_resource_id(self.ctx,
+                                                                 UUID1))
+
     def test_resource_get_all(self):
         values = [
             {'name': 'res1'},
@@ -1919,6 +2117,18 @@ class DBAPIStackLockTest(common.HeatTestCase):
         observed = db_api.stack_lock_get_engine_id(self.stack.id)
         self.assertIsNone(observed)
 
+    def test_stack_lock_get_engine_ids(self):
+        other_stack = create_stack(self.ctx, self.template, self.user_creds)
+        unlocked_stack = create_stack(self.ctx, self.template,
+                                      self.user_creds)
+        db_api.stack_lock_create(self.stack.id, UUID1)
+        db_api.stack_lock_create(other_stack.id, UUID2)
+        observed = db_api.stack_lock_get_engine_ids(
+            [self.stack.id, other_stack.id, unlocked_stack.id])
+        self.assertEqual({self.stack.id: UUID1, other_stack.id: UUID2},
+                         observed)
+        self.assertEqual({}, db_api.stack_lock_get_engine_ids([]))
+
     def test_stack_lock_steal_success(self):
         db_api.stack_lock_create(self.stack.id, UUID1)
         observed = db_api.stack_lock_steal(self.stack.id, UUID1, UUID2)
@@ -2174,6 +2384,68 @@ class DBAPIWatchRuleTest(common.HeatTestCase):
         wrs = db_api.watch_rule_get_all_by_stack(self.ctx, self.stack1.id)
         self.assertEqual(2, len(wrs))
 
+    def test_watch_rule_get_all_by_ids(self):
+        wrs = [create_watch_rule(self.ctx, self.stack, name='rule%d' % i)
+               for i in range(3)]
+
+        ret_wrs = db_api.watch_rule_get_all_by_ids(
+            self.ctx, [wrs[0].id, wrs[2].id, 12345])
+        self.assertEqual(set(['rule0', 'rule2']),
+                         set(wr.name for wr in ret_wrs))
+        self.assertEqual([], db_api.watch_rule_get_all_by_ids(self.ctx, []))
+
+    def test_watch_rule_get_all_summary(self):
+        now = timeutils.utcnow()
+        old = now - datetime.timedelta(seconds=600)
+        create_watch_rule(self.ctx, self.stack, name='rule1',
+                          created_at=old)
+        create_watch_rule(self.ctx, self.stack, name='rule2',
+                          created_at=old, updated_at=now)
+        wr3 = create_watch_rule(self.ctx, self.stack, name='rule3',
+                                created_at=now)
+
+        summary = db_api.watch_rule_get_all_summary(self.ctx)
+        self.assertEqual(3, len(summary))
+
+        summary = db_api.watch_rule_get_all_summary(
+            self.ctx, updated_since=now - datetime.timedelta(seconds=60))
+        self.assertEqual(2, len(summary))
+        rule_id, rule, state, created_at, updated_at = sorted(summary)[-1]
+        self.assertEqual(wr3.id, rule_id)
+        self.assertEqual({"foo": "123"}, rule)
+        self.assertEqual('normal', state)
+
+    def test_watch_rule_get_active_stack_ids(self):
+        stack2 = create_stack(self.ctx, self.template, self.user_creds)
+        stack3 = create_stack(self.ctx, self.template, self.user_creds)
+        deleted = create_stack(self.ctx, self.template, self.user_creds)
+        create_watch_rule(self.ctx, self.stack, name='rule1')
+        create_watch_rule(self.ctx, self.stack, name='rule2')
+        create_watch_rule(self.ctx, stack2, name='rule3',
+                          state=rpc_api.WATCH_STATE_CEILOMETER_CONTROLLED)
+        create_watch_rule(self.ctx, stack3, name='rule4')
+        create_watch_rule(self.ctx, deleted, name='rule5')
+        db_api.stack_delete(self.ctx, deleted.id)
+
+        self.assertEqual(
+            sorted([self.stack.id, stack3.id]),
+            sorted(db_api.watch_rule_get_active_stack_ids(self.ctx)))
+
+    def test_watch_rule_update_all_by_stack_ids(self):
+        stack2 = create_stack(self.ctx, self.template, self.user_creds)
+        wr1 = create_watch_rule(self.ctx, self.stack, name='rule1')
+        wr2 = create_watch_rule(self.ctx, stack2, name='rule2')
+
+        updated = db_api.watch_rule_update_all_by_stack_ids(
+            self.ctx, [self.stack.id], {'state': 'ALARM'})
+        self.assertEqual(1, updated)
+        self.assertEqual('ALARM',
+                         db_api.watch_rule_get(self.ctx, wr1.id).state)
+        self.assertEqual('normal',
+                         db_api.watch_rule_get(self.ctx, wr2.id).state)
+        self.assertEqual(0, db_api.watch_rule_update_all_by_stack_ids(
+            self.ctx, [], {'state': 'ALARM'}))
+
     def test_watch_rule_update(self):
         watch_rule = create_watch_rule(self.ctx, self.stack)
         values = {
@@ -2232,6 +2504,70 @@ class DBAPIWatchDataTest(common.HeatTestCase):
         data = [wd.data for wd in watch_data]
         [self.assertIn(val['data'], data) for val in values]
 
+    def test_watch_data_get_all_filtered(self):
+        values = [
+            {'data': {'Namespace': 'ns1', 'm1': {'Value': 1}}},
+            {'data': {'Namespace': 'ns1', 'm2': {'Value': 2}}},
+            {'data': {'Namespace': 'ns2', 'm1': {'Value': 3}}},
+            {'data': {'Namespace': 'ns2', 'm1': {'Value': 4}, 'm2': {}},
+             'metric_name': 'm1'},
+        ]
+        wds = [create_watch_data(self.ctx, self.watch_rule, **val)
+               for val in values]
+        self.assertEqual(('ns1', 'm1'),
+                         (wds[0].namespace, wds[0].metric_name))
+
+        def values_of(watch_data):
+            return [wd.data[wd.metric_name]['Value'] for wd in watch_data]
+
+        self.assertEqual([1, 2], values_of(db_api.watch_data_get_all(
+            self.ctx, namespace='ns1')))
+        self.assertEqual([1, 3, 4], values_of(db_api.watch_data_get_all(
+            self.ctx, metric_name='m1')))
+        self.assertEqual([3, 4], values_of(db_api.watch_data_get_all(
+            self.ctx, namespace='ns2', metric_name='m1')))
+
+        page = db_api.watch_data_get_all(self.ctx, limit=3)
+        self.assertEqual([1, 2, 3], values_of(page))
+        page = db_api.watch_data_get_all(self.ctx, limit=3,
+                                         marker=page[-1].id)
+        self.assertEqual([4], values_of(page))
+
+    def test_watch_data_get_all_by_watch_rule_id_since(self):
+        now = timeutils.utcnow()
+        for age in (600, 200, 100):
+            create_watch_data(self.ctx, self.watch_rule,
+                              data={'foo': age},
+                              created_at=now - datetime.timedelta(
+                                  seconds=age))
+
+        watch_data = db_api.watch_data_get_all_by_watch_rule_id(
+            self.ctx, self.watch_rule.id,
+            since=now - datetime.timedelta(seconds=300))
+        self.assertEqual([{'foo': 200}, {'foo': 100}],
+                         [wd.data for wd in watch_data])
+
+    def test_watch_data_delete_expired(self):
+        now = timeutils.utcnow()
+        other_rule = create_watch_rule(self.ctx, self.stack, name='other')
+        for rule in (self.watch_rule, other_rule):
+            for age in (600, 100):
+                create_watch_data(self.ctx, rule,
+                                  data={'foo': age},
+                                  created_at=now - datetime.timedelta(
+                                      seconds=age))
+
+        deleted = db_api.watch_data_delete_expired(
+            self.ctx, self.watch_rule.id,
+            now - datetime.timedelta(seconds=300))
+        self.assertEqual(1, deleted)
+        watch_data = db_api.watch_data_get_all_by_watch_rule_id(
+            self.ctx, self.watch_rule.id)
+        self.assertEqual([{'foo': 100}], [wd.data for wd in watch_data])
+        watch_data = db_api.watch_data_get_all_by_watch_rule_id(
+            self.ctx, other_rule.id)
+        self.assertEqual(2, len(watch_data))
+
 
 class DBAPIServiceTest(common.HeatTestCase):
     def setUp(self):
@@ -2278,6 +2614,19 @@ class DBAPIServiceTest(common.HeatTestCase):
         self.assertEqual('heat-engine', services_by_args[0].binary)
         self.assertEqual('engine-0', services_by_args[0].host)
 
+    def test_service_get_all_by_engine_ids(self):
+        services = [create_service(self.ctx, id=str(uuid.uuid4()),
+                                   engine_id=str(uuid.uuid4()))
+                    for i in range(3)]
+        db_api.service_delete(self.ctx, services[1].id)
+
+        observed = db_api.service_get_all_by_engine_ids(
+            self.ctx, [services[0].engine_id, services[1].engine_id])
+        self.assertEqual(set([services[0].id, services[1].id]),
+                         set(s.id for s in observed))
+        self.assertEqual([], db_api.service_get_all_by_engine_ids(self.ctx,
+                                                                  []))
+
     def test_service_update(self):
         service = create_service(self.ctx)
         values = {'hostname': 'host-updated',
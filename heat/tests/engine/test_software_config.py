@@ -22,6 +22,7 @@ import six
 
 from heat.common import exception
 from heat.common import template_format
+from heat.engine import api
 from heat.engine.clients.os import swift
 from heat.engine import service
 from heat.engine import service_software_config
@@ -449,7 +450,8 @@ class SoftwareConfigServiceTest(common.HeatTestCase):
         self.assertIsNotNone(updated)
         self.assertEqual('DEPLOY', updated['action'])
         self.assertEqual('WAITING', updated['status'])
-        mock_push.assert_called_once_with(self.ctx, server_id)
+        mock_push.assert_called_once_with(self.ctx, server_id,
+                                          config=mock.ANY)
 
     def test_update_software_deployment_fields(self):
 
@@ -501,14 +503,19 @@ class SoftwareConfigServiceTest(common.HeatTestCase):
 
     @mock.patch.object(service_software_config.SoftwareConfigService,
                        'metadata_software_deployments')
+    @mock.patch.object(service_software_config.resource_object.Resource,
+                       'update_metadata')
     @mock.patch.object(service_software_config.resource_object.Resource,
                        'get_by_physical_resource_id')
     @mock.patch.object(service_software_config.requests, 'put')
-    def test_push_metadata_software_deployments(self, put, res_get, md_sd):
+    def test_push_metadata_software_deployments(self, put, res_get,
+                                                update_md, md_sd):
         rs = mock.Mock()
         rs.rsrc_metadata = {'original': 'metadata'}
+        rs.rsrc_metadata_version = 4
         rs.data = []
         res_get.return_value = rs
+        update_md.return_value = True
 
         deployments = {'deploy': 'this'}
         md_sd.return_value = deployments
@@ -520,24 +527,28 @@ class SoftwareConfigServiceTest(common.HeatTestCase):
 
         self.engine.software_config._push_metadata_software_deployments(
             self.ctx, '1234')
-        rs.update_and_save.assert_called_once_with(
-            {'rsrc_metadata': result_metadata})
+        update_md.assert_called_once_with(self.ctx, rs.id, result_metadata, 4)
+        self.assertFalse(rs.update_and_save.called)
         put.side_effect = Exception('Unexpected requests.put')
 
     @mock.patch.object(service_software_config.SoftwareConfigService,
                        'metadata_software_deployments')
+    @mock.patch.object(service_software_config.resource_object.Resource,
+                       'update_metadata')
     @mock.patch.object(service_software_config.resource_object.Resource,
                        'get_by_physical_resource_id')
     @mock.patch.object(service_software_config.requests, 'put')
     def test_push_metadata_software_deployments_temp_url(
-            self, put, res_get, md_sd):
+            self, put, res_get, update_md, md_sd):
         rs = mock.Mock()
         rs.rsrc_metadata = {'original': 'metadata'}
+        rs.rsrc_metadata_version = 4
         rd = mock.Mock()
         rd.key = 'metadata_put_url'
         rd.value = 'http://192.168.2.2/foo/bar'
         rs.data = [rd]
         res_get.return_value = rs
+        update_md.return_value = True
 
         deployments = {'deploy': 'this'}
         md_sd.return_value = deployments
@@ -549,12 +560,159 @@ class SoftwareConfigServiceTest(common.HeatTestCase):
 
         self.engine.software_config._push_metadata_software_deployments(
             self.ctx, '1234')
-        rs.update_and_save.assert_called_once_with(
-            {'rsrc_metadata': result_metadata})
+        update_md.assert_called_once_with(self.ctx, rs.id, result_metadata, 4)
 
         put.assert_called_once_with(
             'http://192.168.2.2/foo/bar', json.dumps(result_metadata))
 
+    def _deployed_config(self, config_id, name):
+        sc = mock.Mock(id=config_id, group='script',
+                       config={'config': '', 'inputs': [], 'outputs': [],
+                               'options': {}},
+                       created_at=timeutils.utcnow())
+        sc.name = name
+        return sc
+
+    @mock.patch.object(service_software_config.SoftwareConfigService,
+                       'metadata_software_deployments')
+    @mock.patch.object(service_software_config.resource_object.Resource,
+                       'update_metadata')
+    @mock.patch.object(service_software_config.resource_object.Resource,
+                       'get_by_physical_resource_id')
+    def test_push_metadata_software_deployments_incremental(
+            self, res_get, update_md, md_sd):
+        first = api.format_software_config(self._deployed_config('c1', '01'))
+        third = api.format_software_config(self._deployed_config('c3', '03'))
+        rs = mock.Mock()
+        rs.rsrc_metadata = {'deployments': [first, third]}
+        rs.rsrc_metadata_version = 1
+        rs.data = []
+        res_get.return_value = rs
+        update_md.return_value = True
+
+        config = self._deployed_config('c2', '02')
+        self.engine.software_config._push_metadata_software_deployments(
+            self.ctx, '1234', config=config)
+
+        second = api.format_software_config(config)
+        update_md.assert_called_once_with(
+            self.ctx, rs.id, {'deployments': [first, second, third]}, 1)
+        self.assertFalse(md_sd.called)
+
+    @mock.patch.object(service_software_config.SoftwareConfigService,
+                       'metadata_software_deployments')
+    @mock.patch.object(service_software_config.resource_object.Resource,
+                       'update_metadata')
+    @mock.patch.object(service_software_config.resource_object.Resource,
+                       'get_by_physical_resource_id')
+    def test_push_metadata_software_deployments_replace(
+            self, res_get, update_md, md_sd):
+        first = api.format_software_config(self._deployed_config('c1', '01'))
+        third = api.format_software_config(self._deployed_config('c3', '03'))
+        rs = mock.Mock()
+        rs.rsrc_metadata = {'deployments': [first, third]}
+        rs.rsrc_metadata_version = 1
+        rs.data = []
+        res_get.return_value = rs
+        update_md.return_value = True
+
+        config = self._deployed_config('c4', '04')
+        self.engine.software_config._push_metadata_software_deployments(
+            self.ctx, '1234', config=config, replaced_config_id='c1')
+
+        fourth = api.format_software_config(config)
+        update_md.assert_called_once_with(
+            self.ctx, rs.id, {'deployments': [third, fourth]}, 1)
+        self.assertFalse(md_sd.called)
+
+    @mock.patch.object(service_software_config.SoftwareConfigService,
+                       'metadata_software_deployments')
+    @mock.patch.object(service_software_config.resource_object.Resource,
+                       'update_metadata')
+    @mock.patch.object(service_software_config.resource_object.Resource,
+                       'get_by_physical_resource_id')
+    def test_push_metadata_software_deployments_remove(
+            self, res_get, update_md, md_sd):
+        first = api.format_software_config(self._deployed_config('c1', '01'))
+        third = api.format_software_config(self._deployed_config('c3', '03'))
+        rs = mock.Mock()
+        rs.rsrc_metadata = {'deployments': [first, third]}
+        rs.rsrc_metadata_version = 1
+        rs.data = []
+        res_get.return_value = rs
+        update_md.return_value = True
+
+        self.engine.software_config._push_metadata_software_deployments(
+            self.ctx, '1234', replaced_config_id='c1')
+
+        update_md.assert_called_once_with(
+            self.ctx, rs.id, {'deployments': [third]}, 1)
+        self.assertFalse(md_sd.called)
+
+    @mock.patch.object(service_software_config.SoftwareConfigService,
+                       'metadata_software_deployments')
+    @mock.patch.object(service_software_config.resource_object.Resource,
+                       'update_metadata')
+    @mock.patch.object(service_software_config.resource_object.Resource,
+                       'get_by_physical_resource_id')
+    def test_push_metadata_software_deployments_replaced_missing(
+            self, res_get, update_md, md_sd):
+        first = api.format_software_config(self._deployed_config('c1', '01'))
+        rs = mock.Mock()
+        rs.rsrc_metadata = {'deployments': [first]}
+        rs.rsrc_metadata_version = 1
+        rs.data = []
+        res_get.return_value = rs
+        update_md.return_value = True
+        md_sd.return_value = ['rebuilt']
+
+        config = self._deployed_config('c4', '04')
+        self.engine.software_config._push_metadata_software_deployments(
+            self.ctx, '1234', config=config, replaced_config_id='c2')
+
+        md_sd.assert_called_once_with(self.ctx, '1234')
+        update_md.assert_called_once_with(
+            self.ctx, rs.id, {'deployments': ['rebuilt']}, 1)
+
+    def test_delete_software_deployment_pushes_metadata(self):
+        server_id = str(uuid.uuid4())
+        mock_push = self.patchobject(self.engine.software_config,
+                                     '_push_metadata_software_deployments')
+        deployment = self._create_software_deployment(server_id=server_id)
+
+        self.engine.delete_software_deployment(self.ctx, deployment['id'])
+        mock_push.assert_called_with(
+            self.ctx, server_id, replaced_config_id=deployment['config_id'])
+        self.assertEqual([], self.engine.metadata_software_deployments(
+            self.ctx, server_id))
+
+    @mock.patch.object(service_software_config.SoftwareConfigService,
+                       'metadata_software_deployments')
+    @mock.patch.object(service_software_config.resource_object.Resource,
+                       'update_metadata')
+    @mock.patch.object(service_software_config.resource_object.Resource,
+                       'get_by_physical_resource_id')
+    def test_push_metadata_software_deployments_conflict(
+            self, res_get, update_md, md_sd):
+        rs = mock.Mock()
+        rs.rsrc_metadata = {'deployments': []}
+        rs.rsrc_metadata_version = 1
+        rs.data = []
+        res_get.return_value = rs
+        update_md.return_value = False
+        md_sd.return_value = ['rebuilt']
+
+        config = self._deployed_config('c1', '01')
+        self.engine.software_config._push_metadata_software_deployments(
+            self.ctx, '1234', config=config)
+
+        self.assertEqual(
+            service_software_config.METADATA_UPDATE_ATTEMPTS,
+            update_md.call_count)
+        rs.update_and_save.assert_called_once_with(
+            {'rsrc_metadata': {'deployments': ['rebuilt']},
+             'rsrc_metadata_version': 2})
+
     @mock.patch.object(service_software_config.SoftwareConfigService,
                        'signal_software_deployment')
     @mock.patch.object(swift.SwiftClientPlugin, '_create')
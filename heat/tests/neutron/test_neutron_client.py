@@ -151,6 +151,91 @@ class NeutronClientPluginTests(NeutronClientPluginTestCase):
                           sgs_non_uuid)
 
 
+class NeutronResolutionBatchTest(NeutronClientPluginTestCase):
+    NET1 = 'b62c3079-6946-44f5-a67b-6b9091884d4f'
+    NET2 = '9887157c-d092-40f5-b547-6361915fce7d'
+    NET3 = '384ccd91-447c-4d83-832c-06974a7d3d05'
+
+    def setUp(self):
+        super(NeutronResolutionBatchTest, self).setUp()
+        self.mock_find = self.patchobject(neutron.neutronV20,
+                                          'find_resourceid_by_name_or_id')
+
+        def list_networks(id=None, name=None, fields=None):
+            if id is not None:
+                return {'networks': [{'id': i} for i in id
+                                     if i == self.NET1]}
+            nets = [{'id': self.NET2, 'name': 'private'},
+                    {'id': self.NET3, 'name': 'dup'},
+                    {'id': self.NET1, 'name': 'dup'}]
+            return {'networks': [n for n in nets if n['name'] in name]}
+        self.neutron_client.list_networks.side_effect = list_networks
+
+    def test_queued_networks_resolved_together(self):
+        self.neutron_plugin.queue_resource_ids(
+            'network', [self.NET1, 'private', 'private', None])
+
+        for name_or_id, net_id in ((self.NET1, self.NET1),
+                                   ('private', self.NET2)):
+            props = {'network': name_or_id}
+            self.assertEqual(net_id, self.neutron_plugin.resolve_network(
+                props, 'network', 'network_id'))
+
+        self.neutron_client.list_networks.assert_has_calls([
+            mock.call(id=[self.NET1], fields=['id']),
+            mock.call(name=['private'], fields=['id', 'name'])])
+        self.assertEqual(2, self.neutron_client.list_networks.call_count)
+        self.assertFalse(self.mock_find.called)
+
+    def test_resolved_networks_not_queued_again(self):
+        self.neutron_plugin.queue_resource_ids('network', ['private'])
+        self.neutron_plugin.find_neutron_resource({'net': 'private'}, 'net',
+                                                  'network')
+        self.neutron_plugin.queue_resource_ids('network', ['private'])
+        self.assertEqual(self.NET2, self.neutron_plugin.find_neutron_resource(
+            {'net': 'private'}, 'net', 'network'))
+        self.assertEqual(1, self.neutron_client.list_networks.call_count)
+
+    def test_ambiguous_and_missing_looked_up_individually(self):
+        self.mock_find.return_value = 'individual'
+        self.neutron_plugin.queue_resource_ids('network', ['dup', 'missing'])
+
+        for name in ('dup', 'missing'):
+            self.assertEqual('individual',
+                             self.neutron_plugin.find_neutron_resource(
+                                 {'net': name}, 'net', 'network'))
+            self.mock_find.assert_called_with(self.neutron_client,
+                                              'network', name)
+        self.assertEqual(1, self.neutron_client.list_networks.call_count)
+
+    def test_queued_security_groups_share_listing(self):
+        groups = {'security_groups': [{'tenant_id': 'test_tenant_id',
+                                       'id': self.NET1,
+                                       'name': 'sg1'}]}
+        self.neutron_client.list_security_groups.return_value = groups
+
+        for i in range(3):
+            self.neutron_plugin.queue_resource_ids('security_group',
+                                                   ['sg1', self.NET2])
+            self.assertEqual([self.NET1, self.NET2],
+                             self.neutron_plugin.get_secgroup_uuids(
+                                 ['sg1', self.NET2]))
+        self.neutron_client.list_security_groups.assert_called_once_with()
+
+    def test_security_group_created_after_listing(self):
+        self.neutron_client.list_security_groups.side_effect = [
+            {'security_groups': []},
+            {'security_groups': [{'tenant_id': 'test_tenant_id',
+                                  'id': self.NET1,
+                                  'name': 'sg1'}]}]
+        self.neutron_plugin.queue_resource_ids('security_group', ['sg1'])
+
+        self.assertEqual([self.NET1],
+                         self.neutron_plugin.get_secgroup_uuids(['sg1']))
+        self.assertEqual(2,
+                         self.neutron_client.list_security_groups.call_count)
+
+
 class NeutronConstraintsValidate(common.HeatTestCase):
     scenarios = [
         ('validate_network',
@@ -226,13 +226,13 @@ class WatchControllerTest(common.HeatTestCase):
                         u'data': {u'Units': u'Counter', u'Value': 1}}]
 
         self.m.StubOutWithMock(rpc_client.EngineClient, 'call')
-        # Current engine implementation means we filter in the API
-        # and pass None/None for namespace/watch_name which returns
-        # all metric data which we post-process in the API
+        # The engine filters by namespace/metric name and returns one page
         rpc_client.EngineClient.call(
             dummy_req.context,
             ('show_watch_metric',
-             {'metric_namespace': None, 'metric_name': None})
+             {'metric_namespace': None, 'metric_name': None,
+              'limit': 500, 'marker': None}),
+            version='1.10'
         ).AndReturn(engine_resp)
 
         self.m.ReplayAll()
@@ -284,34 +284,21 @@ class WatchControllerTest(common.HeatTestCase):
         dummy_req = self._dummy_GET_request(params)
 
         # Stub out the RPC call to the engine with a pre-canned response
-        # We dummy three different metrics and namespaces to test
-        # filtering by parameter
+        # containing only the datapoints matching the filter
         engine_resp = [{u'timestamp': u'2012-08-30T15:09:02Z',
                         u'watch_name': u'HttpFailureAlarm',
                         u'namespace': u'system/linux',
                         u'metric_name': u'ServiceFailure',
-                        u'data': {u'Units': u'Counter', u'Value': 1}},
-
-                       {u'timestamp': u'2012-08-30T15:10:03Z',
-                        u'watch_name': u'HttpFailureAlarm2',
-                        u'namespace': u'system/linux2',
-                        u'metric_name': u'ServiceFailure2',
-                        u'data': {u'Units': u'Counter', u'Value': 1}},
-
-                       {u'timestamp': u'2012-08-30T15:16:03Z',
-                        u'watch_name': u'HttpFailureAlar3m',
-                        u'namespace': u'system/linux3',
-                        u'metric_name': u'ServiceFailure3',
                         u'data': {u'Units': u'Counter', u'Value': 1}}]
 
         self.m.StubOutWithMock(rpc_client.EngineClient, 'call')
-        # Current engine implementation means we filter in the API
-        # and pass None/None for namespace/watch_name which returns
-        # all metric data which we post-process in the API
+        # The engine filters by namespace/metric name and returns one page
         rpc_client.EngineClient.call(
             dummy_req.context,
             ('show_watch_metric',
-             {'metric_namespace': None, 'metric_name': None})
+             {'metric_namespace': None, 'metric_name': 'ServiceFailure',
+              'limit': 500, 'marker': None}),
+            version='1.10'
         ).AndReturn(engine_resp)
 
         self.m.ReplayAll()
@@ -342,8 +329,7 @@ class WatchControllerTest(common.HeatTestCase):
         dummy_req = self._dummy_GET_request(params)
 
         # Stub out the RPC call to the engine with a pre-canned response
-        # We dummy three different metrics and namespaces to test
-        # filtering by parameter
+        # containing only the datapoints matching the filter
         engine_resp = [{u'timestamp': u'2012-08-30T15:09:02Z',
                         u'watch_name': u'HttpFailureAlarm',
                         u'namespace': u'atestnamespace/foo',
@@ -354,22 +340,16 @@ class WatchControllerTest(common.HeatTestCase):
                         u'watch_name': u'HttpFailureAlarm2',
                         u'namespace': u'atestnamespace/foo',
                         u'metric_name': u'ServiceFailure2',
-                        u'data': {u'Units': u'Counter', u'Value': 1}},
-
-                       {u'timestamp': u'2012-08-30T15:16:03Z',
-                        u'watch_name': u'HttpFailureAlar3m',
-                        u'namespace': u'system/linux3',
-                        u'metric_name': u'ServiceFailure3',
                         u'data': {u'Units': u'Counter', u'Value': 1}}]
 
         self.m.StubOutWithMock(rpc_client.EngineClient, 'call')
-        # Current engine implementation means we filter in the API
-        # and pass None/None for namespace/watch_name which returns
-        # all metric data which we post-process in the API
+        # The engine filters by namespace/metric name and returns one page
         rpc_client.EngineClient.call(
             dummy_req.context,
             ('show_watch_metric',
-             {'metric_namespace': None, 'metric_name': None})
+             {'metric_namespace': 'atestnamespace/foo', 'metric_name': None,
+              'limit': 500, 'marker': None}),
+            version='1.10'
         ).AndReturn(engine_resp)
 
         self.m.ReplayAll()
@@ -401,6 +381,49 @@ class WatchControllerTest(common.HeatTestCase):
                         'MetricName': u'ServiceFailure2'}]}}}
         self.assertEqual(expected, self.controller.list_metrics(dummy_req))
 
+    def test_list_metrics_paginated(self):
+        params = {'Action': 'ListMetrics', 'NextToken': '42'}
+        dummy_req = self._dummy_GET_request(params)
+        self.patchobject(self.controller, 'METRICS_PAGE_SIZE', new=2)
+
+        engine_resp = [{u'id': 43,
+                        u'timestamp': u'2012-08-30T15:09:02Z',
+                        u'watch_name': u'HttpFailureAlarm',
+                        u'namespace': u'system/linux',
+                        u'metric_name': u'ServiceFailure',
+                        u'data': {u'Value': 1}},
+
+                       {u'id': 47,
+                        u'timestamp': u'2012-08-30T15:10:03Z',
+                        u'watch_name': u'HttpFailureAlarm2',
+                        u'namespace': u'system/linux',
+                        u'metric_name': u'ServiceFailure',
+                        u'data': {u'Value': 1}}]
+
+        self.m.StubOutWithMock(rpc_client.EngineClient, 'call')
+        rpc_client.EngineClient.call(
+            dummy_req.context,
+            ('show_watch_metric',
+             {'metric_namespace': None, 'metric_name': None,
+              'limit': 2, 'marker': 42}),
+            version='1.10'
+        ).AndReturn(engine_resp)
+
+        self.m.ReplayAll()
+
+        result = self.controller.list_metrics(dummy_req)
+        response = result['ListMetricsResponse']['ListMetricsResult']
+        self.assertEqual(2, len(response['Metrics']))
+        self.assertEqual('47', response['NextToken'])
+
+    def test_list_metrics_bad_next_token(self):
+        params = {'Action': 'ListMetrics', 'NextToken': 'foo'}
+        dummy_req = self._dummy_GET_request(params)
+
+        result = self.controller.list_metrics(dummy_req)
+        self.assertIsInstance(result,
+                              exception.HeatInvalidParameterValueError)
+
     def test_put_metric_alarm(self):
         # Not yet implemented, should raise HeatAPINotImplementedError
         params = {'Action': 'PutMetricAlarm'}
@@ -14,10 +14,12 @@
 
 import json
 
+from keystoneclient.contrib.ec2 import utils as ec2_utils
 from oslo_config import cfg
 from oslo_utils import importutils
 import requests
 import six
+from six.moves.urllib import parse as urlparse
 
 from heat.api.aws import ec2token
 from heat.api.aws import exception
@@ -558,3 +560,122 @@ class Ec2TokenTest(common.HeatTestCase):
         ec2_filter = ec2token.EC2Token_filter_factory(global_conf={})
 
         self.assertEqual(None, ec2_filter(None).application)
+
+
+class DummyHTTPResponse(object):
+    def __init__(self, data):
+        self.data = data
+
+    def json(self):
+        return self.data
+
+
+class Ec2TokenCacheTest(common.HeatTestCase):
+    """Tests the Ec2Token middleware with cached credentials."""
+
+    def setUp(self):
+        super(Ec2TokenCacheTest, self).setUp()
+        self.ec2 = ec2token.EC2Token(app='woot', conf={
+            'auth_uri': 'http://123:5000/v2.0',
+            'cache_credentials': True})
+        self.mock_post = self.patchobject(requests, 'post')
+        self.mock_get = self.patchobject(requests, 'get')
+        self.mock_get.return_value = DummyHTTPResponse(
+            {'credential': {'access': 'foo', 'secret': 'verysecret'}})
+        self.ok_resp = {'access': {
+            'token': {'id': 'tok123',
+                      'expires': '2099-01-01T00:00:00Z',
+                      'tenant': {'name': 'tenant', 'id': 'abcd1234'}},
+            'user': {'id': 'user1'},
+            'metadata': {'roles': ['aa']}}}
+        self.mock_post.return_value = DummyHTTPResponse(self.ok_resp)
+
+    def _signed_request(self, secret='verysecret'):
+        params = {'AWSAccessKeyId': 'foo',
+                  'SignatureMethod': 'HmacSHA256',
+                  'SignatureVersion': '2',
+                  'Timestamp': '2015-05-01T00:00:00Z'}
+        signer = ec2_utils.Ec2Signer(secret)
+        params['Signature'] = signer.generate({'host': 'heat:8000',
+                                               'verb': 'GET',
+                                               'path': '/v1',
+                                               'params': params})
+        return wsgi.Request({'REQUEST_METHOD': 'GET',
+                             'SERVER_NAME': 'heat',
+                             'SERVER_PORT': '8000',
+                             'PATH_INFO': '/v1',
+                             'QUERY_STRING': urlparse.urlencode(params)})
+
+    def test_cached_after_first_request(self):
+        self.assertEqual('woot', self.ec2(self._signed_request()))
+        self.assertEqual(1, self.mock_post.call_count)
+        self.mock_get.assert_called_once_with(
+            'http://123:5000/v2.0/users/user1/credentials/OS-EC2/foo',
+            headers={'X-Auth-Token': 'tok123'}, verify=True, cert=None)
+
+        req = self._signed_request()
+        self.assertEqual('woot', self.ec2(req))
+        self.assertEqual(1, self.mock_post.call_count)
+        self.assertEqual(1, self.mock_get.call_count)
+        self.assertEqual('tok123', req.headers['X-Auth-Token'])
+        self.assertEqual('tenant', req.headers['X-Tenant-Name'])
+        self.assertEqual('abcd1234', req.headers['X-Tenant-Id'])
+        self.assertEqual('aa', req.headers['X-Roles'])
+        self.assertEqual('http://123:5000/v2.0', req.headers['X-Auth-URL'])
+
+    def test_not_cached_when_disabled(self):
+        self.ec2 = ec2token.EC2Token(app='woot', conf={
+            'auth_uri': 'http://123:5000/v2.0'})
+        self.assertEqual('woot', self.ec2(self._signed_request()))
+        self.assertEqual('woot', self.ec2(self._signed_request()))
+        self.assertEqual(2, self.mock_post.call_count)
+        self.assertFalse(self.mock_get.called)
+
+    def test_bad_signature_checked_by_keystone(self):
+        self.assertEqual('woot', self.ec2(self._signed_request()))
+
+        self.mock_post.return_value = DummyHTTPResponse(
+            {'error': {'message': 'EC2 access key not found.'}})
+        self.assertRaises(exception.HeatInvalidClientTokenIdError,
+                          self.ec2, self._signed_request('wrongsecret'))
+        self.assertEqual(2, self.mock_post.call_count)
+
+        # The cached credential is discarded until keystone accepts it again
+        self.mock_post.return_value = DummyHTTPResponse(self.ok_resp)
+        self.assertEqual('woot', self.ec2(self._signed_request()))
+        self.assertEqual(3, self.mock_post.call_count)
+        self.assertEqual(2, self.mock_get.call_count)
+
+    def test_token_expiring(self):
+        self.ok_resp['access']['token']['expires'] = '2015-01-01T00:00:00Z'
+        self.assertEqual('woot', self.ec2(self._signed_request()))
+        self.assertEqual('woot', self.ec2(self._signed_request()))
+        self.assertEqual(2, self.mock_post.call_count)
+
+    def test_secret_unavailable(self):
+        self.mock_get.side_effect = requests.exceptions.ConnectionError
+        self.assertEqual('woot', self.ec2(self._signed_request()))
+        self.assertEqual('woot', self.ec2(self._signed_request()))
+        self.assertEqual(2, self.mock_post.call_count)
+
+    def test_signature_matches_without_port(self):
+        params = {'AWSAccessKeyId': 'foo',
+                  'SignatureMethod': 'HmacSHA256',
+                  'SignatureVersion': '2',
+                  'Timestamp': '2015-05-01T00:00:00Z'}
+        credentials = {'host': 'heat:8000', 'verb': 'GET', 'path': '/v1',
+                       'params': params, 'headers': {}}
+        signer = ec2_utils.Ec2Signer('verysecret')
+        credentials['signature'] = signer.generate(
+            dict(credentials, host='heat'))
+
+        self.assertTrue(ec2token.EC2Token._signature_matches('verysecret',
+                                                             credentials))
+        self.assertFalse(ec2token.EC2Token._signature_matches('other',
+                                                              credentials))
+
+    def test_credential_uri(self):
+        self.assertEqual(
+            'http://123:5000/v3/users/u/credentials/OS-EC2/foo',
+            self.ec2._conf_get_keystone_credential_uri(
+                'http://123:5000/v3/ec2tokens', 'u', 'foo'))
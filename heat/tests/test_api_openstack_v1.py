@@ -2597,33 +2597,20 @@ class ResourceControllerTest(ControllerTest, common.HeatTestCase):
         res_name = 'WikiDatabase'
         stack_identity = identifier.HeatIdentifier(self.tenant,
                                                    'wordpress', '6')
-        res_identity = identifier.ResourceIdentifier(resource_name=res_name,
-                                                     **stack_identity)
 
         req = self._get(stack_identity._tenant_path())
 
         engine_resp = {
-            u'description': u'',
-            u'resource_identity': dict(res_identity),
-            u'stack_name': stack_identity.stack_name,
-            u'resource_name': res_name,
-            u'resource_status_reason': None,
-            u'updated_time': u'2012-07-23T13:06:00Z',
-            u'stack_identity': dict(stack_identity),
-            u'resource_action': u'CREATE',
-            u'resource_status': u'COMPLETE',
-            u'physical_resource_id':
-            u'a3455d8c-9f88-404d-a85b-5315293e67de',
-            u'resource_type': u'AWS::EC2::Instance',
+            u'metadata_version': u'abc123',
             u'metadata': {u'ensureRunning': u'true'}
         }
         self.m.StubOutWithMock(rpc_client.EngineClient, 'call')
         rpc_client.EngineClient.call(
             req.context,
-            ('describe_stack_resource',
+            ('describe_stack_resource_metadata',
              {'stack_identity': stack_identity, 'resource_name': res_name,
-              'with_attr': None}),
-            version='1.2'
+              'metadata_version': None}),
+            version='1.11'
         ).AndReturn(engine_resp)
         self.m.ReplayAll()
 
@@ -2632,11 +2619,50 @@ class ResourceControllerTest(ControllerTest, common.HeatTestCase):
                                           stack_id=stack_identity.stack_id,
                                           resource_name=res_name)
 
-        expected = {'metadata': {u'ensureRunning': u'true'}}
+        expected = {'metadata': {u'ensureRunning': u'true'},
+                    'metadata_version': u'abc123'}
 
         self.assertEqual(expected, result)
         self.m.VerifyAll()
 
+    def test_metadata_show_etag(self, mock_enforce):
+        response = webob.Response()
+        resources.ResourceSerializer().metadata(
+            response, {'metadata': {u'ensureRunning': u'true'},
+                       'metadata_version': u'abc123'})
+
+        self.assertEqual('"abc123"', response.headers['ETag'])
+        self.assertEqual({'metadata': {u'ensureRunning': u'true'}},
+                         json.loads(response.body))
+
+    def test_metadata_show_not_modified(self, mock_enforce):
+        self._mock_enforce_setup(mock_enforce, 'metadata', True)
+        res_name = 'WikiDatabase'
+        stack_identity = identifier.HeatIdentifier(self.tenant,
+                                                   'wordpress', '6')
+
+        req = self._get(stack_identity._tenant_path())
+        req.headers['If-None-Match'] = 'W/"abc123"'
+
+        self.m.StubOutWithMock(rpc_client.EngineClient, 'call')
+        rpc_client.EngineClient.call(
+            req.context,
+            ('describe_stack_resource_metadata',
+             {'stack_identity': stack_identity, 'resource_name': res_name,
+              'metadata_version': 'abc123'}),
+            version='1.11'
+        ).AndReturn({u'metadata_version': u'abc123'})
+        self.m.ReplayAll()
+
+        ex = self.assertRaises(webob.exc.HTTPNotModified,
+                               self.controller.metadata,
+                               req, tenant_id=self.tenant,
+                               stack_name=stack_identity.stack_name,
+                               stack_id=stack_identity.stack_id,
+                               resource_name=res_name)
+        self.assertEqual('"abc123"', ex.headers['ETag'])
+        self.m.VerifyAll()
+
     def test_metadata_show_nonexist(self, mock_enforce):
         self._mock_enforce_setup(mock_enforce, 'metadata', True)
         res_name = 'WikiDatabase'
@@ -2651,10 +2677,10 @@ class ResourceControllerTest(ControllerTest, common.HeatTestCase):
         self.m.StubOutWithMock(rpc_client.EngineClient, 'call')
         rpc_client.EngineClient.call(
             req.context,
-            ('describe_stack_resource',
+            ('describe_stack_resource_metadata',
              {'stack_identity': stack_identity, 'resource_name': res_name,
-              'with_attr': None}),
-            version='1.2'
+              'metadata_version': None}),
+            version='1.11'
         ).AndRaise(to_remote_error(error))
         self.m.ReplayAll()
 
@@ -2683,10 +2709,10 @@ class ResourceControllerTest(ControllerTest, common.HeatTestCase):
         self.m.StubOutWithMock(rpc_client.EngineClient, 'call')
         rpc_client.EngineClient.call(
             req.context,
-            ('describe_stack_resource',
+            ('describe_stack_resource_metadata',
              {'stack_identity': stack_identity, 'resource_name': res_name,
-              'with_attr': None}),
-            version='1.2'
+              'metadata_version': None}),
+            version='1.11'
         ).AndRaise(to_remote_error(error))
         self.m.ReplayAll()
 
@@ -15,6 +15,7 @@
 import uuid
 
 import mock
+from oslo_config import cfg
 
 from heat.common import exception
 from heat.engine.clients.os import cinder
@@ -55,6 +56,47 @@ class CinderClientPluginTests(common.HeatTestCase):
         self.cinder_client.volume_snapshots.get.assert_called_once_with(
             snapshot_id)
 
+    def _volume(self, volume_id, status):
+        volume = mock.MagicMock()
+        volume.id = volume_id
+        volume.status = status
+        return volume
+
+    def test_poll_volume_disabled(self):
+        my_volume = self._volume('1', 'creating')
+        self.cinder_client.volumes.get.return_value = my_volume
+
+        self.assertEqual(my_volume, self.cinder_plugin.poll_volume('1'))
+        self.cinder_client.volumes.get.assert_called_once_with('1')
+        self.assertFalse(self.cinder_client.volumes.list.called)
+
+    def test_poll_volume_from_listing(self):
+        cfg.CONF.set_override('bulk_status_poll_interval', 1)
+        volumes = [self._volume('1', 'available'),
+                   self._volume('2', 'in-use')]
+        self.cinder_client.volumes.get.return_value = volumes[0]
+        self.cinder_client.volumes.list.return_value = volumes
+
+        self.assertEqual(volumes[0], self.cinder_plugin.poll_volume('1'))
+        self.assertEqual(volumes[1], self.cinder_plugin.poll_volume('2'))
+        self.assertEqual(volumes[0], self.cinder_plugin.poll_volume('1'))
+        self.cinder_client.volumes.list.assert_called_once_with(
+            detailed=True)
+        self.cinder_client.volumes.get.assert_called_once_with('1')
+
+    def test_poll_volume_not_listed(self):
+        cfg.CONF.set_override('bulk_status_poll_interval', 1)
+        self.cinder_client.volumes.list.return_value = []
+        self.cinder_client.volumes.get.side_effect = [
+            self._volume('2', 'creating'), cinder.exceptions.NotFound(404)]
+
+        self.cinder_plugin.poll_volume('2')
+        self.assertRaises(cinder.exceptions.NotFound,
+                          self.cinder_plugin.poll_volume, '1')
+        self.cinder_client.volumes.list.assert_called_once_with(
+            detailed=True)
+        self.cinder_client.volumes.get.assert_called_with('1')
+
 
 class VolumeConstraintTest(common.HeatTestCase):
 
@@ -30,8 +30,12 @@ from troveclient import client as troveclient
 
 from heat.common import context
 from heat.common import exception
+from heat.common import http_sessions
 from heat.engine import clients
 from heat.engine.clients import client_plugin
+from heat.engine.clients.os import cinder
+from heat.engine.clients.os import neutron
+from heat.engine.clients.os import nova
 from heat.tests import common
 from heat.tests import fakes
 from heat.tests.nova import fakes as fakes_nova
@@ -231,6 +235,20 @@ class ClientPluginTest(common.HeatTestCase):
         self.assertEqual('http://192.0.2.1/bar',
                          plugin.url_for(service_type='bar'))
 
+    @mock.patch.object(http_sessions, 'get_session')
+    def test_client_session(self, mock_get_session):
+        con = mock.Mock(auth_plugin='fake_auth')
+        c = clients.Clients(con)
+        con.clients = c
+        cfg.CONF.set_override('ca_file', '/tmp/foo', group='clients')
+        plugin = FooClientsPlugin(con)
+
+        self.assertEqual(mock_get_session.return_value,
+                         plugin._client_session('foo'))
+        mock_get_session.assert_called_once_with(
+            auth='fake_auth', cacert='/tmp/foo', insecure=False,
+            cert=None, key=None)
+
     def test_abstract_create(self):
         con = mock.Mock()
         c = clients.Clients(con)
@@ -239,6 +257,44 @@ class ClientPluginTest(common.HeatTestCase):
         self.assertRaises(TypeError, client_plugin.ClientPlugin, c)
 
 
+class ServiceClientSessionTest(common.HeatTestCase):
+
+    def setUp(self):
+        super(ServiceClientSessionTest, self).setUp()
+        self.stub_auth()
+        self.ctx = utils.dummy_context()
+        self.session = mock.Mock()
+        self.patchobject(client_plugin.ClientPlugin, '_client_session',
+                         return_value=self.session)
+
+    def test_nova_client_session(self):
+        mock_client = self.patchobject(nova.nc, 'Client')
+        clients.Clients(self.ctx).client('nova')
+
+        args = mock_client.call_args[1]
+        self.assertIs(self.session, args['session'])
+        self.assertEqual('http://example.com:1234/v1',
+                         args['endpoint_override'])
+
+    def test_cinder_client_session(self):
+        mock_client = self.patchobject(cinder.cc, 'Client')
+        clients.Clients(self.ctx).client('cinder')
+
+        args = mock_client.call_args[1]
+        self.assertIs(self.session, args['session'])
+        self.assertEqual('http://example.com:1234/v1',
+                         args['endpoint_override'])
+
+    def test_neutron_client_session(self):
+        mock_client = self.patchobject(neutron.nc, 'Client')
+        clients.Clients(self.ctx).client('neutron')
+
+        args = mock_client.call_args[1]
+        self.assertIs(self.session, args['session'])
+        self.assertEqual('http://example.com:1234/v1',
+                         args['endpoint_override'])
+
+
 class TestClientPluginsInitialise(common.HeatTestCase):
 
     @testcase.skip('skipped until keystone can read context auth_ref')
@@ -0,0 +1,70 @@
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import mock
+
+from heat.common import cache
+from heat.tests import common
+
+
+class LRUCacheTest(common.HeatTestCase):
+
+    def test_get_set(self):
+        c = cache.LRUCache(2)
+        c.set('a', 1)
+        self.assertEqual(1, c.get('a'))
+        self.assertIsNone(c.get('b'))
+        self.assertEqual('x', c.get('b', 'x'))
+        self.assertIn('a', c)
+        self.assertNotIn('b', c)
+
+    def test_evicts_least_recently_used(self):
+        c = cache.LRUCache(2)
+        c.set('a', 1)
+        c.set('b', 2)
+        c.get('a')
+        c.set('c', 3)
+        self.assertEqual(2, len(c))
+        self.assertEqual(1, c.get('a'))
+        self.assertIsNone(c.get('b'))
+        self.assertEqual(3, c.get('c'))
+
+    def test_disabled(self):
+        c = cache.LRUCache(0)
+        c.set('a', 1)
+        self.assertEqual(0, len(c))
+        self.assertIsNone(c.get('a'))
+
+    def test_pop(self):
+        c = cache.LRUCache(2)
+        c.set('a', 1)
+        self.assertEqual(1, c.pop('a'))
+        self.assertIsNone(c.pop('a'))
+        self.assertEqual(0, len(c))
+
+    @mock.patch('time.time')
+    def test_ttl(self, mock_time):
+        c = cache.LRUCache(2, ttl=10)
+        mock_time.return_value = 100
+        c.set('a', 1)
+        mock_time.return_value = 110
+        self.assertEqual(1, c.get('a'))
+        mock_time.return_value = 111
+        self.assertIsNone(c.get('a'))
+        self.assertEqual(0, len(c))
+
+    def test_clear(self):
+        c = cache.LRUCache(2)
+        c.set('a', 1)
+        c.clear()
+        self.assertEqual(0, len(c))
@@ -13,6 +13,7 @@
 
 import os
 
+from keystoneclient.auth.identity import v3
 import mock
 from oslo_config import cfg
 from oslo_middleware import request_id
@@ -111,6 +112,41 @@ class TestRequestContext(common.HeatTestCase):
             ctx = context.RequestContext(roles=['notadmin'])
             self.assertFalse(ctx.is_admin)
 
+    def test_trust_context_uses_cached_token(self):
+        auth_ref = mock.Mock()
+        auth_ref.will_expire_soon.return_value = False
+        context.store_trust_token('atrust', auth_ref)
+
+        ctx = context.RequestContext(auth_url='http://xyz/v2.0',
+                                     trust_id='atrust')
+        self.assertIsInstance(ctx.auth_plugin, v3.Password)
+        self.assertEqual('atrust', ctx.auth_plugin.trust_id)
+        self.assertIs(auth_ref, ctx.auth_plugin.auth_ref)
+        auth_ref.will_expire_soon.assert_called_once_with(
+            stale_duration=cfg.CONF.trust_token_refresh_margin)
+
+    def test_trust_context_discards_expiring_token(self):
+        auth_ref = mock.Mock()
+        auth_ref.will_expire_soon.return_value = True
+        context.store_trust_token('atrust', auth_ref)
+
+        self.assertIsNone(context.get_trust_token('atrust'))
+        self.assertIsNone(context._trust_tokens().get('atrust'))
+
+    def test_forget_trust_token(self):
+        auth_ref = mock.Mock()
+        auth_ref.will_expire_soon.return_value = False
+        context.store_trust_token('atrust', auth_ref)
+        context.forget_trust_token('atrust')
+
+        self.assertIsNone(context.get_trust_token('atrust'))
+
+    def test_trust_token_cache_disabled(self):
+        cfg.CONF.set_override('stored_context_cache_size', 0)
+        context.store_trust_token('atrust', mock.Mock())
+
+        self.assertIsNone(context.get_trust_token('atrust'))
+
 
 class RequestContextMiddlewareTest(common.HeatTestCase):
 
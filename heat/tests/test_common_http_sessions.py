@@ -0,0 +1,57 @@
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from keystoneclient import session
+from oslo_config import cfg
+
+from heat.common import http_sessions
+from heat.tests import common
+
+
+class HTTPSessionsTest(common.HeatTestCase):
+
+    def setUp(self):
+        super(HTTPSessionsTest, self).setUp()
+        http_sessions.reset()
+        self.addCleanup(http_sessions.reset)
+
+    def test_sessions_share_connection_pool(self):
+        s1 = http_sessions.get_session()
+        s2 = http_sessions.get_session(auth='fake_auth')
+
+        self.assertIsInstance(s1, session.Session)
+        self.assertIsNot(s1, s2)
+        self.assertIs(s1.session, s2.session)
+        self.assertIsNone(s1.auth)
+        self.assertEqual('fake_auth', s2.auth)
+        self.assertEqual({'pools': 1, 'pools_created': 1,
+                          'sessions_served': 2},
+                         http_sessions.get_stats())
+
+    def test_ssl_options_get_separate_pools(self):
+        s1 = http_sessions.get_session(cacert='/path/ca.pem')
+        s2 = http_sessions.get_session(insecure=True)
+        s3 = http_sessions.get_session(cert='/path/cert', key='/path/key')
+
+        self.assertEqual('/path/ca.pem', s1.verify)
+        self.assertFalse(s2.verify)
+        self.assertEqual(('/path/cert', '/path/key'), s3.cert)
+        self.assertEqual(3, len(set([id(s.session) for s in (s1, s2, s3)])))
+        self.assertEqual(3, http_sessions.get_stats()['pools'])
+
+    def test_pool_size_options(self):
+        cfg.CONF.set_override('connection_pool_size', 42, group='clients')
+        s = http_sessions.get_session()
+
+        adapter = s.session.get_adapter('https://nova.example.com')
+        self.assertEqual(42, adapter._pool_maxsize)
@@ -15,6 +15,7 @@
 #    under the License.
 
 import datetime
+import json
 
 import webob
 
@@ -53,6 +54,38 @@ class JSONResponseSerializerTest(common.HeatTestCase):
         self.assertEqual('application/json', response.content_type)
         self.assertEqual('{"key": "value"}', response.body)
 
+    def test_to_json_chunks(self):
+        fixture = {"date": datetime.datetime(1, 3, 8, 2),
+                   "items": [{"name": "item%d" % i} for i in range(100)]}
+        chunks = list(serializers.JSONResponseSerializer().to_json_chunks(
+            fixture, chunk_size=100))
+        self.assertTrue(len(chunks) > 1)
+        for chunk in chunks[:-1]:
+            self.assertTrue(len(chunk) >= 100)
+        self.assertEqual(serializers.JSONResponseSerializer().to_json(fixture),
+                         b''.join(chunks).decode('utf-8'))
+
+    def test_default_streams_large_collection(self):
+        fixture = {"events": [{"id": i} for i in range(
+            serializers.STREAM_MIN_ITEMS + 1)]}
+        serializer = serializers.JSONResponseSerializer()
+        self.patchobject(serializer, 'to_json')
+        response = webob.Response()
+        serializer.default(response, fixture)
+
+        self.assertFalse(serializer.to_json.called)
+        self.assertEqual('application/json', response.content_type)
+        self.assertEqual(fixture, json.loads(response.body.decode('utf-8')))
+
+    def test_default_small_collection(self):
+        fixture = {"events": [{"id": i} for i in range(
+            serializers.STREAM_MIN_ITEMS)]}
+        self.assertFalse(
+            serializers.JSONResponseSerializer.is_large_collection(fixture))
+        self.assertTrue(
+            serializers.JSONResponseSerializer.is_large_collection(
+                fixture["events"] + [{"id": -1}]))
+
 
 class XMLResponseSerializerTest(common.HeatTestCase):
 
@@ -86,6 +86,7 @@ class FormatTest(common.HeatTestCase):
             rpc_api.RES_DESCRIPTION,
             rpc_api.RES_METADATA,
             rpc_api.RES_SCHEMA_ATTRIBUTES,
+            rpc_api.RES_DEFINITION_DIGEST,
         )))
 
         formatted = api.format_stack_resource(res, True)
@@ -0,0 +1,124 @@
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import datetime
+
+import mock
+from oslo_utils import timeutils
+
+from heat.engine import liveness
+from heat.objects import service as service_objects
+from heat.tests import common
+from heat.tests import utils
+
+
+def fake_service(engine_id, age=0, deleted=False):
+    reported_at = timeutils.utcnow() - datetime.timedelta(seconds=age)
+    return {'engine_id': engine_id,
+            'created_at': reported_at,
+            'updated_at': reported_at,
+            'deleted_at': reported_at if deleted else None}
+
+
+class EngineLivenessRegistryTest(common.HeatTestCase):
+    def setUp(self):
+        super(EngineLivenessRegistryTest, self).setUp()
+        self.ctx = utils.dummy_context()
+        self.registry = liveness.EngineLivenessRegistry()
+        self.mock_get_services = self.patchobject(
+            service_objects.Service, 'get_all_by_engine_ids')
+        self.mock_listening = self.patchobject(self.registry, '_listening',
+                                               return_value=True)
+
+    def test_engines_alive_single_query(self):
+        self.mock_get_services.return_value = [
+            fake_service('fresh'),
+            fake_service('late', age=300),
+            fake_service('stale', age=3600),
+            fake_service('deleted', age=300, deleted=True),
+            fake_service('deleted_stale', age=3600, deleted=True)]
+
+        alive = self.registry.engines_alive(
+            self.ctx, ['fresh', 'late', 'stale', 'deleted', 'deleted_stale',
+                       'unknown'])
+
+        self.assertEqual({'fresh': True, 'late': True, 'stale': False,
+                          'deleted': True, 'deleted_stale': False,
+                          'unknown': True}, alive)
+        self.assertEqual(1, self.mock_get_services.call_count)
+        self.assertEqual(set(['fresh', 'late', 'stale', 'deleted',
+                              'deleted_stale', 'unknown']),
+                         set(self.mock_get_services.call_args[0][1]))
+        # An engine which missed a few reports may only be busy, even if its
+        # service record has been cleaned up by another engine meanwhile
+        self.mock_listening.assert_has_calls(
+            [mock.call(self.ctx, 'fresh'), mock.call(self.ctx, 'late'),
+             mock.call(self.ctx, 'deleted'), mock.call(self.ctx, 'unknown')],
+            any_order=True)
+        self.assertEqual(4, self.mock_listening.call_count)
+
+    def test_fresh_heartbeat_not_listening(self):
+        self.mock_get_services.return_value = [fake_service('fresh')]
+        self.mock_listening.return_value = False
+
+        self.assertFalse(self.registry.engine_alive(self.ctx, 'fresh'))
+
+    def test_restarted_engine_reuses_service_record(self):
+        self.mock_get_services.return_value = [
+            fake_service('engine', deleted=True),
+            fake_service('engine')]
+
+        self.assertTrue(self.registry.engine_alive(self.ctx, 'engine'))
+        self.mock_listening.assert_called_once_with(self.ctx, 'engine')
+
+    def test_dead_engines_cached(self):
+        self.mock_get_services.return_value = [
+            fake_service('stale', age=3600)]
+        self.mock_listening.return_value = False
+
+        self.assertEqual({'stale': False, 'gone': False},
+                         self.registry.engines_alive(self.ctx,
+                                                     ['stale', 'gone']))
+        self.mock_get_services.reset_mock()
+        self.mock_listening.reset_mock()
+
+        self.assertEqual({'stale': False, 'gone': False},
+                         self.registry.engines_alive(self.ctx,
+                                                     ['stale', 'gone']))
+        self.assertFalse(self.mock_get_services.called)
+        self.assertFalse(self.mock_listening.called)
+
+    def test_unresponsive_engines_cached_briefly(self):
+        self.mock_get_services.return_value = [fake_service('engine')]
+        self.mock_listening.return_value = False
+
+        self.assertFalse(self.registry.engine_alive(self.ctx, 'engine'))
+        self.assertFalse(self.registry.engine_alive(self.ctx, 'engine'))
+        self.assertEqual(1, self.mock_listening.call_count)
+
+        # A single missed reply is not taken as permanent death
+        self.patchobject(self.registry._unresponsive, '_expired',
+                         return_value=True)
+        self.mock_listening.return_value = True
+        self.assertTrue(self.registry.engine_alive(self.ctx, 'engine'))
+        self.assertEqual(2, self.mock_listening.call_count)
+
+    def test_live_engines_not_cached(self):
+        self.mock_get_services.return_value = []
+
+        self.assertTrue(self.registry.engine_alive(self.ctx, 'engine'))
+        self.assertTrue(self.registry.engine_alive(self.ctx, 'engine'))
+        self.assertEqual(2, self.mock_listening.call_count)
+
+    def test_registry_singleton(self):
+        self.assertIs(liveness.registry(), liveness.registry())
@@ -31,6 +31,7 @@ from heat.common import service_utils
 from heat.common import template_format
 from heat.engine import dependencies
 from heat.engine import environment
+from heat.engine import liveness
 from heat.engine import properties
 from heat.engine import resource as res
 from heat.engine.resources.aws.ec2 import instance as instances
@@ -617,6 +618,40 @@ class StackServiceCreateUpdateDeleteTest(common.HeatTestCase):
         self.assertIn("You have reached the maximum stacks per tenant",
                       six.text_type(ex.exc_info[1]))
 
+    def test_create_nested_stack(self):
+        stack_name = 'service_create_nested_test_stack'
+        stack = tools.get_stack(stack_name, self.ctx)
+
+        # The template is used as given, so none is parsed
+        self.m.StubOutWithMock(templatem, 'Template')
+        self.m.StubOutWithMock(environment, 'Environment')
+        self.m.StubOutWithMock(parser, 'Stack')
+
+        parser.Stack(self.ctx, stack.name,
+                     stack.t, owner_id='parent_id',
+                     nested_depth=1, user_creds_id=None,
+                     stack_user_project_id=None,
+                     convergence=False,
+                     parent_resource='parent_resource',
+                     disable_rollback=True,
+                     timeout_mins=30).AndReturn(stack)
+
+        self.m.StubOutWithMock(stack, 'validate')
+        stack.validate().AndReturn(None)
+
+        self.m.StubOutWithMock(threadgroup, 'ThreadGroup')
+        threadgroup.ThreadGroup().AndReturn(tools.DummyThreadGroup())
+
+        self.m.ReplayAll()
+
+        args = {'disable_rollback': True, 'timeout_mins': 30,
+                'adopt_stack_data': None}
+        result = self.man.create_nested_stack(
+            self.ctx, stack_name, stack.t, args, owner_id='parent_id',
+            nested_depth=1, parent_resource_name='parent_resource')
+        self.assertEqual(stack.identifier(), result)
+        self.m.VerifyAll()
+
     def test_stack_create_verify_err(self):
         stack_name = 'service_create_verify_err_test_stack'
         params = {'foo': 'bar'}
@@ -1167,6 +1202,52 @@ class StackServiceCreateUpdateDeleteTest(common.HeatTestCase):
         self.assertEqual([evt_mock], self.man.thread_group_mgr.events[sid])
         self.m.VerifyAll()
 
+    def test_update_nested_stack(self):
+        stack_name = 'service_update_nested_test_stack'
+        old_stack = tools.get_stack(stack_name, self.ctx)
+        sid = old_stack.store()
+        s = stack_object.Stack.get_by_id(self.ctx, sid)
+
+        stack = tools.get_stack(stack_name, self.ctx)
+
+        # The template is used as given, so none is parsed
+        self._stub_update_mocks(s, old_stack)
+
+        parser.Stack(self.ctx, stack.name,
+                     stack.t,
+                     convergence=False,
+                     current_traversal=None,
+                     prev_raw_template_id=None,
+                     current_deps=None,
+                     disable_rollback=True,
+                     nested_depth=0,
+                     owner_id=None,
+                     parent_resource=None,
+                     stack_user_project_id=None,
+                     strict_validate=True,
+                     tenant_id='test_tenant_id',
+                     timeout_mins=45,
+                     user_creds_id=u'1',
+                     username='test_username').AndReturn(stack)
+
+        self.m.StubOutWithMock(stack, 'validate')
+        stack.validate().AndReturn(None)
+
+        evt_mock = self.m.CreateMockAnything()
+        self.m.StubOutWithMock(grevent, 'Event')
+        grevent.Event().AndReturn(evt_mock)
+        self.m.StubOutWithMock(threadgroup, 'ThreadGroup')
+        threadgroup.ThreadGroup().AndReturn(tools.DummyThreadGroup())
+
+        self.m.ReplayAll()
+
+        result = self.man.update_nested_stack(self.ctx,
+                                              old_stack.identifier(),
+                                              stack.t, {'timeout_mins': 45})
+        self.assertEqual(old_stack.identifier(), result)
+        self.assertEqual([evt_mock], self.man.thread_group_mgr.events[sid])
+        self.m.VerifyAll()
+
     def test_stack_update_existing_parameters(self):
         '''Use a template with default parameter and no input parameter
         then update with a template without default and no input
@@ -1839,31 +1920,23 @@ class StackServiceTest(common.HeatTestCase):
 
     def test_make_sure_rpc_version(self):
         self.assertEqual(
-            '1.9',
+            '1.11',
             service.EngineService.RPC_API_VERSION,
             ('RPC version is changed, please update this test to new version '
              'and make sure additional test cases are added for RPC APIs '
              'added in new version'))
 
-    @mock.patch.object(service_stack_watch.StackWatch, 'start_watch_task')
+    @mock.patch.object(service_stack_watch.StackWatch, 'start_watch_tasks')
     @mock.patch.object(stack_object.Stack, 'get_all')
     @mock.patch.object(service.service.Service, 'start')
     def test_start_watches_all_stacks(self, mock_super_start, mock_get_all,
-                                      start_watch_task):
-        s1 = mock.Mock(id=1)
-        s2 = mock.Mock(id=2)
-        mock_get_all.return_value = [s1, s2]
-        start_watch_task.return_value = None
-
+                                      start_watch_tasks):
         self.eng.thread_group_mgr = None
         self.eng.create_periodic_tasks()
 
-        mock_get_all.assert_called_once_with(mock.ANY, tenant_safe=False,
-                                             show_hidden=True)
-        calls = start_watch_task.call_args_list
-        self.assertEqual(2, start_watch_task.call_count)
-        self.assertIn(mock.call(1, mock.ANY), calls)
-        self.assertIn(mock.call(2, mock.ANY), calls)
+        self.assertFalse(mock_get_all.called)
+        start_watch_tasks.assert_called_once_with(mock.ANY)
+        self.assertEqual(self.eng.host, self.eng.stack_watch.host)
 
     @tools.stack_context('service_identify_test_stack', False)
     def test_stack_identify(self):
@@ -2751,6 +2824,86 @@ class StackServiceTest(common.HeatTestCase):
 
         self.m.VerifyAll()
 
+    @tools.stack_context('service_resource_metadata_test_stack')
+    def test_stack_resource_metadata(self):
+        # The metadata is served without loading the stack
+        self.m.StubOutWithMock(parser.Stack, 'load')
+        self.m.ReplayAll()
+
+        metadata = self.stack['WebServer'].metadata_get()
+        r = self.eng.describe_stack_resource_metadata(
+            self.ctx, self.stack.identifier(), 'WebServer')
+
+        self.assertEqual({'metadata': metadata,
+                          'metadata_version':
+                              service._metadata_version(metadata)}, r)
+        self.m.VerifyAll()
+
+    @tools.stack_context('service_resource_metadata_unchanged_test_stack')
+    def test_stack_resource_metadata_unchanged(self):
+        metadata = self.stack['WebServer'].metadata_get()
+        version = service._metadata_version(metadata)
+
+        r = self.eng.describe_stack_resource_metadata(
+            self.ctx, self.stack.identifier(), 'WebServer',
+            metadata_version=version)
+
+        self.assertEqual({'metadata_version': version}, r)
+
+    @tools.stack_context('service_resource_metadata_noncreated_test_stack',
+                         create_res=False)
+    def test_stack_resource_metadata_noncreated_resource(self):
+        self.m.StubOutWithMock(parser.Stack, 'load')
+        parser.Stack.load(self.ctx,
+                          stack=mox.IgnoreArg()).AndReturn(self.stack)
+        self.m.ReplayAll()
+
+        ex = self.assertRaises(dispatcher.ExpectedException,
+                               self.eng.describe_stack_resource_metadata,
+                               self.ctx, self.stack.identifier(), 'WebServer')
+        self.assertEqual(exception.ResourceNotAvailable, ex.exc_info[0])
+        self.m.VerifyAll()
+
+    @tools.stack_context('service_resource_metadata_nonexist_test_stack')
+    def test_stack_resource_metadata_nonexist_resource(self):
+        ex = self.assertRaises(dispatcher.ExpectedException,
+                               self.eng.describe_stack_resource_metadata,
+                               self.ctx, self.stack.identifier(), 'foo')
+        self.assertEqual(exception.ResourceNotFound, ex.exc_info[0])
+
+    @tools.stack_context('service_resource_metadata_user_deny_test_stack')
+    def test_stack_resource_metadata_stack_user_deny(self):
+        self.ctx.roles = [cfg.CONF.heat_stack_user_role]
+        self.m.StubOutWithMock(service.EngineService, '_authorize_stack_user')
+        service.EngineService._authorize_stack_user(self.ctx, mox.IgnoreArg(),
+                                                    'foo').AndReturn(False)
+        self.m.ReplayAll()
+
+        ex = self.assertRaises(dispatcher.ExpectedException,
+                               self.eng.describe_stack_resource_metadata,
+                               self.ctx, self.stack.identifier(), 'foo')
+        self.assertEqual(exception.Forbidden, ex.exc_info[0])
+
+        self.m.VerifyAll()
+
+    @tools.stack_context('service_resource_metadata_user_cache_test_stack')
+    def test_stack_resource_metadata_stack_user_cached(self):
+        self.ctx.roles = [cfg.CONF.heat_stack_user_role]
+        self.m.StubOutWithMock(parser.Stack, 'load')
+        parser.Stack.load(self.ctx,
+                          stack=mox.IgnoreArg()).AndReturn(self.stack)
+        self.m.StubOutWithMock(service.EngineService, '_authorize_stack_user')
+        service.EngineService._authorize_stack_user(
+            self.ctx, self.stack, 'WebServer').AndReturn(True)
+        self.m.ReplayAll()
+
+        for i in range(2):
+            r = self.eng.describe_stack_resource_metadata(
+                self.ctx, self.stack.identifier(), 'WebServer')
+            self.assertIn('metadata', r)
+
+        self.m.VerifyAll()
+
     @tools.stack_context('service_resources_describe_test_stack')
     def test_stack_resources_describe(self):
         self.m.StubOutWithMock(parser.Stack, 'load')
@@ -3218,6 +3371,44 @@ class StackServiceTest(common.HeatTestCase):
         for key in rpc_api.WATCH_DATA_KEYS:
             self.assertIn(key, result[0])
 
+        # Filter and page through the datapoints
+        other = {'watch_rule_id': watch.id,
+                 'data': {u'Namespace': u'system/other',
+                          u'ServiceFailure': {
+                              u'Units': u'Counter', u'Value': 1}}}
+        watch_data_object.WatchData.create(self.ctx, other)
+        result = self.eng.show_watch_metric(self.ctx,
+                                            metric_namespace=u'system/linux',
+                                            metric_name=u'ServiceFailure')
+        self.assertEqual(2, len(result))
+        result = self.eng.show_watch_metric(self.ctx,
+                                            metric_namespace=u'system/other')
+        self.assertEqual(1, len(result))
+        result = self.eng.show_watch_metric(self.ctx,
+                                            metric_name=u'Nonexistent')
+        self.assertEqual([], result)
+
+        first = self.eng.show_watch_metric(self.ctx, limit=2)
+        self.assertEqual(2, len(first))
+        rest = self.eng.show_watch_metric(
+            self.ctx, limit=2, marker=first[-1][rpc_api.WATCH_DATA_ID])
+        self.assertEqual(1, len(rest))
+        self.assertEqual(u'system/other',
+                         rest[0][rpc_api.WATCH_DATA_NAMESPACE])
+
+        # Datapoints which cannot be formatted do not shorten a page
+        malformed = {'watch_rule_id': watch.id,
+                     'data': {u'Namespace': u'system/other',
+                              u'A': {u'Units': u'Counter', u'Value': 1},
+                              u'B': {u'Units': u'Counter', u'Value': 1}}}
+        watch_data_object.WatchData.create(self.ctx, malformed)
+        watch_data_object.WatchData.create(self.ctx, other)
+        rest = self.eng.show_watch_metric(
+            self.ctx, limit=2, marker=first[-1][rpc_api.WATCH_DATA_ID])
+        self.assertEqual(2, len(rest))
+        self.assertEqual([], self.eng.show_watch_metric(
+            self.ctx, limit=2, marker=rest[-1][rpc_api.WATCH_DATA_ID]))
+
     @tools.stack_context('service_show_watch_state_test_stack')
     def test_set_watch_state(self):
         # Insert dummy watch rule into the DB
@@ -3655,20 +3846,35 @@ class StackServiceTest(common.HeatTestCase):
                 return_value=mock.Mock())
     @mock.patch.object(parser.Stack, 'load')
     @mock.patch.object(context, 'get_admin_context')
+    @mock.patch.object(stack_lock_object.StackLock, 'get_engine_ids')
+    @mock.patch.object(liveness.EngineLivenessRegistry, 'engines_alive')
     def test_engine_reset_stack_status(
             self,
+            mock_engines_alive,
+            mock_get_engine_ids,
             mock_admin_context,
             mock_stack_load,
             mock_stacklock,
             mock_get_all,
             mock_thread):
         mock_admin_context.return_value = self.ctx
+        thread_ctx = utils.dummy_context()
+        self.patchobject(self.ctx, 'copy_with_new_session',
+                         return_value=thread_ctx)
 
         db_stack = mock.MagicMock()
         db_stack.id = 'foo'
         db_stack.status = 'IN_PROGRESS'
         db_stack.status_reason = None
-        mock_get_all.return_value = [db_stack]
+        live_stack = mock.MagicMock()
+        live_stack.id = 'bar'
+        unlocked_stack = mock.MagicMock()
+        unlocked_stack.id = 'baz'
+        mock_get_all.return_value = [db_stack, live_stack, unlocked_stack]
+        mock_get_engine_ids.return_value = {'foo': 'old-engine',
+                                            'bar': 'live-engine'}
+        mock_engines_alive.return_value = {'old-engine': False,
+                                           'live-engine': True}
 
         fake_stack = mock.MagicMock()
         fake_stack.action = 'CREATE'
@@ -3678,10 +3884,12 @@ class StackServiceTest(common.HeatTestCase):
         mock_stack_load.return_value = fake_stack
 
         fake_lock = mock.MagicMock()
-        fake_lock.get_engine_id.return_value = 'old-engine'
         fake_lock.acquire.return_value = None
         mock_stacklock.return_value = fake_lock
 
+        def run_now(stack_id, func, *args):
+            return func(*args)
+        mock_thread.start.side_effect = run_now
         self.eng.thread_group_mgr = mock_thread
 
         self.eng.reset_stack_status()
@@ -3691,14 +3899,45 @@ class StackServiceTest(common.HeatTestCase):
         mock_get_all.assert_called_once_with(self.ctx,
                                              filters=filters,
                                              tenant_safe=False)
-        mock_stack_load.assert_call_once_with(self.ctx,
-                                              stack=db_stack,
-                                              use_stored_context=True)
-        mock_thread.start_with_acquired_lock.assert_call_once_with(
-            fake_stack, fake_stack.state_set, fake_stack.action,
-            parser.Stack.FAILED, 'Engine went down during stack CREATE'
+        self.assertEqual(set(['foo', 'bar', 'baz']),
+                         set(mock_get_engine_ids.call_args[0][0]))
+        mock_engines_alive.assert_called_once_with(
+            self.ctx, set(['old-engine', 'live-engine']))
+        self.assertEqual(1, mock_thread.start.call_count)
+        self.assertEqual('foo', mock_thread.start.call_args[0][0])
+        # The thread resetting the stack has a database session of its own
+        self.ctx.copy_with_new_session.assert_called_once_with()
+        mock_stacklock.assert_called_once_with(thread_ctx, 'foo',
+                                               self.eng.engine_id)
+        fake_lock.acquire.assert_called_once_with(retry=False)
+        mock_stack_load.assert_called_once_with(thread_ctx,
+                                                stack=db_stack,
+                                                use_stored_context=True)
+        mock_thread.start_with_acquired_lock.assert_called_once_with(
+            fake_stack, fake_lock, fake_stack.state_set, fake_stack.action,
+            fake_stack.FAILED, 'Engine went down during stack CREATE'
         )
 
+    @mock.patch('heat.engine.service.ThreadGroupManager',
+                return_value=mock.Mock())
+    @mock.patch.object(stack_object.Stack, 'get_all')
+    @mock.patch.object(context, 'get_admin_context')
+    @mock.patch.object(stack_lock_object.StackLock, 'get_engine_ids')
+    def test_engine_reset_stack_status_none_in_progress(
+            self,
+            mock_get_engine_ids,
+            mock_admin_context,
+            mock_get_all,
+            mock_thread):
+        mock_admin_context.return_value = self.ctx
+        mock_get_all.return_value = []
+        self.eng.thread_group_mgr = mock_thread
+
+        self.eng.reset_stack_status()
+
+        self.assertFalse(mock_get_engine_ids.called)
+        self.assertFalse(mock_thread.start.called)
+
     @mock.patch('heat.common.messaging.get_rpc_server',
                 return_value=mock.Mock())
     @mock.patch('oslo_messaging.Target',
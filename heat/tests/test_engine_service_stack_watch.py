@@ -11,7 +11,11 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import datetime
+
 import mock
+from oslo_utils import timeutils
+import six
 
 from heat.engine import service_stack_watch
 from heat.rpc import api as rpc_api
@@ -112,3 +116,176 @@ class StackServiceWatcherTest(common.HeatTestCase):
         self.assertEqual([mock.call(stack_id, sw.periodic_watcher_task,
                                     sid=stack_id)],
                          tg.add_timer.call_args_list)
+
+    @mock.patch.object(service_stack_watch.stack_object.Stack,
+                       'get_owner_ids')
+    @mock.patch.object(service_stack_watch.watch_rule_object.WatchRule,
+                       'update_all_by_stack_ids')
+    @mock.patch.object(service_stack_watch.watch_rule_object.WatchRule,
+                       'get_active_stack_ids')
+    def test_start_watch_tasks(self, get_active_stack_ids,
+                               update_all_by_stack_ids, get_owner_ids):
+        # Stack 1 owns 2, which owns 3; 4 is a top-level stack
+        owners = {1: None, 2: 1, 3: 2, 4: None}
+        get_active_stack_ids.return_value = [3, 4]
+        get_owner_ids.side_effect = lambda cnxt, ids: dict(
+            (sid, owners[sid]) for sid in ids)
+        tg = mock.Mock()
+        sw = service_stack_watch.StackWatch(tg, 'host1')
+        sw.start_watch_tasks(self.ctx)
+
+        update_all_by_stack_ids.assert_called_once_with(
+            self.ctx, [3, 4], {'last_evaluated': mock.ANY})
+        self.assertEqual(3, get_owner_ids.call_count)
+        self.assertEqual(
+            sorted([mock.call(1, sw.periodic_watcher_task, sid=1),
+                    mock.call(4, sw.periodic_watcher_task, sid=4),
+                    mock.call(sw.SYNC_TASK_KEY, sw.sync_watch_tasks)]),
+            sorted(tg.add_timer.call_args_list))
+
+    @mock.patch.object(service_stack_watch.watch_rule_object.WatchRule,
+                       'update_all_by_stack_ids')
+    @mock.patch.object(service_stack_watch.watch_rule_object.WatchRule,
+                       'get_active_stack_ids')
+    def test_start_watch_tasks_no_watches(self, get_active_stack_ids,
+                                          update_all_by_stack_ids):
+        get_active_stack_ids.return_value = []
+        tg = mock.Mock()
+        sw = service_stack_watch.StackWatch(tg, 'host1')
+        sw.start_watch_tasks(self.ctx)
+
+        self.assertFalse(update_all_by_stack_ids.called)
+        tg.add_timer.assert_called_once_with(sw.SYNC_TASK_KEY,
+                                             sw.sync_watch_tasks)
+
+    @mock.patch.object(service_stack_watch.StackWatch, 'owns_stack')
+    @mock.patch.object(service_stack_watch.stack_object.Stack,
+                       'get_owner_ids')
+    @mock.patch.object(service_stack_watch.watch_rule_object.WatchRule,
+                       'get_active_stack_ids')
+    def test_sync_watch_tasks_ownership_moves(self, get_active_stack_ids,
+                                              get_owner_ids, owns_stack):
+        get_active_stack_ids.return_value = [1, 4, 5]
+        get_owner_ids.side_effect = lambda cnxt, ids: dict(
+            (sid, None) for sid in ids)
+        owned = set([1, 4])
+        owns_stack.side_effect = lambda cnxt, sid: sid in owned
+        tg = mock.Mock()
+        sw = service_stack_watch.StackWatch(tg, 'host1')
+
+        sw.sync_watch_tasks(self.ctx)
+        self.assertEqual(
+            sorted([mock.call(1, sw.periodic_watcher_task, sid=1),
+                    mock.call(4, sw.periodic_watcher_task, sid=4)]),
+            sorted(tg.add_timer.call_args_list))
+
+        # Another engine joins and takes over stack 1, this one is assigned
+        # stack 5
+        tg.reset_mock()
+        owned = set([4, 5])
+        sw.sync_watch_tasks(self.ctx)
+        tg.stop_timers.assert_called_once_with(1)
+        tg.add_timer.assert_called_once_with(5, sw.periodic_watcher_task,
+                                             sid=5)
+
+        # Stack 4 is deleted
+        tg.reset_mock()
+        get_active_stack_ids.return_value = [1, 5]
+        sw.sync_watch_tasks(self.ctx)
+        tg.stop_timers.assert_called_once_with(4)
+        self.assertFalse(tg.add_timer.called)
+
+    @mock.patch.object(service_stack_watch.StackWatch, 'owns_stack',
+                       autospec=True)
+    @mock.patch.object(service_stack_watch.stack_object.Stack,
+                       'get_owner_ids')
+    @mock.patch.object(service_stack_watch.watch_rule_object.WatchRule,
+                       'get_active_stack_ids')
+    @mock.patch.object(service_stack_watch.stack_object.Stack,
+                       'get_all_by_owner_id')
+    @mock.patch.object(service_stack_watch.watch_rule_object.WatchRule,
+                       'get_all_by_stack')
+    @mock.patch.object(service_stack_watch.watch_rule_object.WatchRule,
+                       'update_by_id')
+    def test_stack_created_by_engine_not_owning_it(
+            self, watch_rule_update, watch_rule_get_all_by_stack,
+            stack_get_all_by_owner_id, get_active_stack_ids, get_owner_ids,
+            owns_stack):
+        stack_id = 86
+        wr1 = mock.Mock()
+        wr1.id = 4
+        wr1.state = rpc_api.WATCH_STATE_NODATA
+        watch_rule_get_all_by_stack.return_value = [wr1]
+        stack_get_all_by_owner_id.return_value = []
+        get_active_stack_ids.return_value = [stack_id]
+        get_owner_ids.return_value = {stack_id: None}
+
+        creator = service_stack_watch.StackWatch(mock.Mock(), 'host1')
+        owner = service_stack_watch.StackWatch(mock.Mock(), 'host2')
+        owns_stack.side_effect = lambda sw, cnxt, sid: sw.host == 'host2'
+
+        creator.start_watch_task(stack_id, self.ctx)
+        self.assertFalse(creator.thread_group_mgr.add_timer.called)
+
+        # The owning engine picks the stack up on its next sync
+        owner.sync_watch_tasks(self.ctx)
+        owner.thread_group_mgr.add_timer.assert_called_once_with(
+            stack_id, owner.periodic_watcher_task, sid=stack_id)
+
+    def _service(self, host, age=0, binary='heat-engine'):
+        return {'host': host, 'binary': binary, 'created_at': None,
+                'updated_at': timeutils.utcnow() - datetime.timedelta(
+                    seconds=age)}
+
+    @mock.patch.object(service_stack_watch.service_objects.Service,
+                       'get_all')
+    def test_owns_stack_partitions_live_engines(self, service_get_all):
+        service_get_all.return_value = [
+            self._service('host1'), self._service('host2'),
+            self._service('host3', age=3600),
+            self._service('host4', binary='heat-api')]
+        watches = [service_stack_watch.StackWatch(mock.Mock(), host)
+                   for host in ('host1', 'host2')]
+
+        stack_ids = ['stack-%d' % i for i in six.moves.xrange(100)]
+        owned = [[sid for sid in stack_ids if sw.owns_stack(self.ctx, sid)]
+                 for sw in watches]
+
+        # Every stack is owned by exactly one of the live engines
+        self.assertEqual(sorted(stack_ids), sorted(owned[0] + owned[1]))
+        self.assertTrue(owned[0])
+        self.assertTrue(owned[1])
+        self.assertEqual(set(['host1', 'host2']), watches[0]._ring.members)
+
+        # The membership is cached for a periodic interval
+        self.assertEqual(2, service_get_all.call_count)
+
+    @mock.patch.object(service_stack_watch.StackWatch, 'check_stack_watches')
+    @mock.patch.object(service_stack_watch.StackWatch, 'owns_stack')
+    def test_periodic_watcher_task_not_owned(self, owns_stack,
+                                             check_stack_watches):
+        owns_stack.return_value = False
+        sw = service_stack_watch.StackWatch(mock.Mock(), 'host1')
+        sw.periodic_watcher_task(sid=5)
+        self.assertFalse(check_stack_watches.called)
+
+        owns_stack.return_value = True
+        sw.periodic_watcher_task(sid=5)
+        check_stack_watches.assert_called_once_with(5)
+
+
+class HashRingTest(common.HeatTestCase):
+
+    def test_empty(self):
+        self.assertIsNone(service_stack_watch.HashRing([]).get_member('a'))
+
+    def test_keys_move_only_from_removed_member(self):
+        keys = ['key-%d' % i for i in six.moves.xrange(1000)]
+        ring = service_stack_watch.HashRing(['a', 'b', 'c'])
+        before = dict((k, ring.get_member(k)) for k in keys)
+        self.assertEqual(set(['a', 'b', 'c']), set(before.values()))
+
+        ring = service_stack_watch.HashRing(['a', 'b'])
+        for k in keys:
+            if before[k] != 'c':
+                self.assertEqual(before[k], ring.get_member(k))
@@ -747,6 +747,66 @@ class ResourceRegistryTest(common.HeatTestCase):
         self.assertEqual('pre-create',
                          resources['nested']['res']['hooks'])
 
+    def test_lookup_memoized(self):
+        registry = environment.ResourceRegistry(None, {})
+        registry.load({'OS::Fruit::Apple': 'apples.yaml',
+                       'OS::Veg::*': 'OS::Fruit::*'})
+        self.patchobject(registry, 'iterable_by',
+                         wraps=registry.iterable_by)
+
+        info = registry.get_resource_info('OS::Fruit::Apple',
+                                          resource_name='a')
+        self.assertEqual('apples.yaml', info.value)
+        self.assertIs(info, registry.get_resource_info('OS::Fruit::Apple',
+                                                       resource_name='b'))
+        self.assertEqual(1, registry.iterable_by.call_count)
+
+        # The wildcard mapping is resolved once, and the lookup of the type
+        # it maps to is already memoized
+        self.assertIs(info, registry.get_resource_info('OS::Veg::Apple'))
+        self.assertIs(info, registry.get_resource_info('OS::Veg::Apple'))
+        self.assertEqual(2, registry.iterable_by.call_count)
+
+    def test_lookup_resource_name_override(self):
+        registry = environment.ResourceRegistry(None, {})
+        registry.load({'OS::Fruit': 'apples.yaml',
+                       'resources': {'pear': {'OS::Fruit': 'pears.yaml'}}})
+
+        self.assertEqual('apples.yaml', registry.get_resource_info(
+            'OS::Fruit', resource_name='apple').value)
+        self.assertEqual('pears.yaml', registry.get_resource_info(
+            'OS::Fruit', resource_name='pear').value)
+        self.assertEqual('apples.yaml', registry.get_resource_info(
+            'OS::Fruit').value)
+
+    def test_lookup_invalidated_on_change(self):
+        registry = environment.ResourceRegistry(None, {})
+        registry.load({'OS::Fruit::Apple': 'apples.yaml'})
+        self.assertEqual('apples.yaml',
+                         registry.get_resource_info('OS::Fruit::Apple').value)
+        self.assertIsNone(registry.get_resource_info('OS::Veg::Apple'))
+
+        registry.load({'OS::Fruit::Apple': 'pears.yaml'})
+        self.assertEqual('pears.yaml',
+                         registry.get_resource_info('OS::Fruit::Apple').value)
+
+        registry.load({'OS::Veg::*': 'OS::Fruit::*'})
+        self.assertEqual('pears.yaml',
+                         registry.get_resource_info('OS::Veg::Apple').value)
+
+        registry.remove_item(registry.get_resource_info('OS::Fruit::Apple'))
+        self.assertIsNone(registry.get_resource_info('OS::Fruit::Apple'))
+        self.assertIsNone(registry.get_resource_info('OS::Veg::Apple'))
+
+    def test_lookup_invalidated_on_global_change(self):
+        global_registry = environment.ResourceRegistry(None, {})
+        registry = environment.ResourceRegistry(global_registry, {})
+        self.assertIsNone(registry.get_resource_info('OS::Fruit'))
+
+        global_registry.load({'OS::Fruit': 'apples.yaml'})
+        self.assertEqual('apples.yaml',
+                         registry.get_resource_info('OS::Fruit').value)
+
 
 class HookMatchTest(common.HeatTestCase):
 
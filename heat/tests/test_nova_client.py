@@ -13,6 +13,8 @@
 """Tests for :module:'heat.engine.resources.nova_utls'."""
 
 import collections
+import email
+import gzip
 import uuid
 
 import mock
@@ -22,6 +24,7 @@ import six
 
 from heat.common import exception
 from heat.engine.clients.os import nova
+from heat.engine.clients import status_poller
 from heat.tests import common
 from heat.tests.nova import fakes as fakes_nova
 from heat.tests import utils
@@ -205,6 +208,94 @@ class NovaUtilsRefreshServerTests(NovaClientPluginTestCase):
         server.get.assert_called_once_with()
 
 
+class NovaBulkRefreshServerTests(NovaClientPluginTestCase):
+
+    def setUp(self):
+        super(NovaBulkRefreshServerTests, self).setUp()
+        cfg.CONF.set_override('bulk_status_poll_interval', 1)
+
+    def _server(self, server_id, status):
+        server = mock.MagicMock()
+        server.id = server_id
+        server._info = {'id': server_id, 'status': status}
+        return server
+
+    def test_refresh_from_listing(self):
+        servers = [self._server('1', 'BUILD'), self._server('2', 'BUILD')]
+        self.nova_client.servers.list.return_value = [
+            self._server('1', 'ACTIVE'), self._server('2', 'ERROR')]
+
+        for server in servers + servers[:1]:
+            self.nova_plugin.refresh_server(server)
+
+        self.nova_client.servers.list.assert_called_once_with(detailed=True)
+        servers[0].get.assert_called_once_with()
+        self.assertFalse(servers[1].get.called)
+        servers[0]._add_details.assert_called_once_with(
+            {'id': '1', 'status': 'ACTIVE'})
+        servers[1]._add_details.assert_called_once_with(
+            {'id': '2', 'status': 'ERROR'})
+
+    def test_refresh_single_server(self):
+        server = self._server('1', 'BUILD')
+
+        self.nova_plugin.refresh_server(server)
+
+        self.assertFalse(self.nova_client.servers.list.called)
+        server.get.assert_called_once_with()
+
+    def test_refresh_not_listed(self):
+        server = self._server('1', 'BUILD')
+        self.nova_client.servers.list.return_value = []
+
+        self.nova_plugin.refresh_server(self._server('2', 'BUILD'))
+        self.nova_plugin.refresh_server(server)
+
+        self.nova_client.servers.list.assert_called_once_with(detailed=True)
+        server.get.assert_called_once_with()
+
+    def test_refresh_listing_overlimit(self):
+        server = self._server('1', 'BUILD')
+        self.nova_client.servers.list.side_effect = (
+            nova_exceptions.OverLimit(413, "limit reached"))
+
+        self.nova_plugin.refresh_server(self._server('2', 'BUILD'))
+        self.assertIsNone(self.nova_plugin.refresh_server(server))
+        self.assertFalse(server.get.called)
+
+    def test_check_resize_ignores_earlier_listing(self):
+        self.patchobject(status_poller.time, 'time', return_value=1000.0)
+        server = self._server('1', 'ACTIVE')
+        server.status = 'ACTIVE'
+        server._add_details.side_effect = lambda info: setattr(
+            server, 'status', info['status'])
+        server.get.side_effect = lambda: setattr(server, 'status',
+                                                 'VERIFY_RESIZE')
+        other = self._server('2', 'BUILD')
+        self.nova_client.servers.list.return_value = [
+            self._server('1', 'ACTIVE'), other]
+
+        self.nova_plugin.refresh_server(server)
+        self.nova_plugin.refresh_server(other)
+        checker = self.nova_plugin.check_resize(server, 'm1.small', '2')
+
+        # The server is fetched individually rather than listed again
+        # within the interval
+        self.assertRaises(StopIteration, next, checker)
+        server.confirm_resize.assert_called_once_with()
+        server.get.assert_called_once_with()
+        self.nova_client.servers.list.assert_called_once_with(detailed=True)
+
+    def test_refresh_disabled(self):
+        cfg.CONF.set_override('bulk_status_poll_interval', 0)
+        server = self._server('1', 'BUILD')
+
+        self.nova_plugin.refresh_server(server)
+
+        self.assertFalse(self.nova_client.servers.list.called)
+        server.get.assert_called_once_with()
+
+
 class NovaUtilsUserdataTests(NovaClientPluginTestCase):
 
     def test_build_userdata(self):
@@ -247,11 +338,89 @@ class NovaUtilsUserdataTests(NovaClientPluginTestCase):
         cnf.instance_user = 'config_instance_user'
         cnf.heat_metadata_server_url = 'http://server.test:123'
         cnf.heat_watch_server_url = 'http://server.test:345'
+        cnf.instance_connection_is_secure = False
+        cnf.instance_connection_https_validate_certificates = False
+        cnf.compress_userdata = False
         data = self.nova_plugin.build_userdata(
             None, instance_user="custominstanceuser")
         self.assertNotIn('config_instance_user', data)
         self.assertIn("custominstanceuser", data)
 
+    def _userdata_parts(self, data):
+        msg = email.message_from_string(data)
+        self.assertTrue(msg.is_multipart())
+        return [(part.get_filename(), part.get_content_type(),
+                 part.get_payload()) for part in msg.get_payload()]
+
+    def test_build_userdata_parts(self):
+        cfg.CONF.set_override('heat_metadata_server_url',
+                              'http://server.test:123')
+        cfg.CONF.set_override('heat_watch_server_url',
+                              'http://server.test:345')
+        data = self.nova_plugin.build_userdata({'foo': 'bar'},
+                                               'echo hello')
+        parts = self._userdata_parts(data)
+        self.assertEqual(['cloud-config', 'boothook.sh', 'part-handler.py',
+                          'cfn-userdata', 'loguserdata.py', 'cfn-init-data',
+                          'cfn-watch-server', 'cfn-metadata-server',
+                          'cfn-boto-cfg'],
+                         [filename for filename, ctype, payload in parts])
+        self.assertEqual(('cfn-userdata', 'text/x-cfninitdata',
+                          'echo hello'), parts[3])
+        self.assertEqual(('cfn-init-data', 'text/x-cfninitdata',
+                          '{"foo": "bar"}'), parts[5])
+        self.assertEqual(('cfn-watch-server', 'text/x-cfninitdata',
+                          'http://server.test:345'), parts[6])
+
+    def test_build_userdata_software_config_parts(self):
+        data = self.nova_plugin.build_userdata(
+            None, 'echo hello', user_data_format='SOFTWARE_CONFIG')
+        parts = self._userdata_parts(data)
+        self.assertEqual(['cloud-config', 'boothook.sh', 'part-handler.py',
+                          'userdata', 'cfn-watch-server'],
+                         [filename for filename, ctype, payload in parts])
+        self.assertEqual(('userdata', 'text/x-shellscript', 'echo hello'),
+                         parts[3])
+
+    def test_build_userdata_skeleton_cached(self):
+        get_data = self.patchobject(nova.pkgutil, 'get_data',
+                                    return_value='$add_custom_user')
+        first = self._userdata_parts(
+            self.nova_plugin.build_userdata({}, 'one',
+                                            instance_user='user1'))
+        second = self._userdata_parts(
+            self.nova_plugin.build_userdata({}, 'two',
+                                            instance_user='user1'))
+        self.assertEqual(4, get_data.call_count)
+        self.assertEqual('one', first[3][2])
+        self.assertEqual('two', second[3][2])
+        self.assertEqual(first[:3], second[:3])
+        self.assertEqual(first[4:], second[4:])
+
+        self.nova_plugin.build_userdata({}, 'one', instance_user='user2')
+        self.assertEqual(8, get_data.call_count)
+
+        cfg.CONF.set_override('heat_watch_server_url',
+                              'http://server.test:678')
+        data = self.nova_plugin.build_userdata({}, 'one',
+                                               instance_user='user2')
+        self.assertEqual(12, get_data.call_count)
+        self.assertIn('http://server.test:678', data)
+
+    def test_build_userdata_compressed(self):
+        expected = self._userdata_parts(
+            self.nova_plugin.build_userdata({}, 'echo hello'))
+        cfg.CONF.set_override('compress_userdata', True)
+        data = self.nova_plugin.build_userdata({}, 'echo hello')
+        with gzip.GzipFile(fileobj=six.BytesIO(data)) as gz:
+            uncompressed = gz.read().decode('utf-8')
+        self.assertEqual(expected, self._userdata_parts(uncompressed))
+
+    def test_build_userdata_raw_not_compressed(self):
+        cfg.CONF.set_override('compress_userdata', True)
+        self.assertEqual('echo hello', self.nova_plugin.build_userdata(
+            {}, 'echo hello', user_data_format='RAW'))
+
 
 class NovaUtilsMetadataTests(NovaClientPluginTestCase):
 
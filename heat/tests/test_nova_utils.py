@@ -20,6 +20,7 @@ from novaclient import exceptions as nova_exceptions
 import six
 
 from heat.common import exception
+from heat.engine.clients.os import nova
 from heat.engine import nova_utils
 from heat.engine import scheduler
 from heat.tests import common
@@ -175,8 +176,8 @@ class NovaUtilsUserdataTests(common.HeatTestCase):
         """Tests the build_userdata function."""
         resource = self.m.CreateMockAnything()
         resource.metadata_get().AndReturn({})
-        self.m.StubOutWithMock(nova_utils.cfg, 'CONF')
-        cnf = nova_utils.cfg.CONF
+        self.m.StubOutWithMock(nova.cfg, 'CONF')
+        cnf = nova.cfg.CONF
         cnf.heat_metadata_server_url = 'http://server.test:123'
         cnf.heat_watch_server_url = 'http://server.test:345'
         cnf.instance_connection_is_secure = False
@@ -197,11 +198,13 @@ class NovaUtilsUserdataTests(common.HeatTestCase):
         """Don't add a custom instance user when not requested."""
         resource = self.m.CreateMockAnything()
         resource.metadata_get().AndReturn({})
-        self.m.StubOutWithMock(nova_utils.cfg, 'CONF')
-        cnf = nova_utils.cfg.CONF
+        self.m.StubOutWithMock(nova.cfg, 'CONF')
+        cnf = nova.cfg.CONF
         cnf.instance_user = 'config_instance_user'
         cnf.heat_metadata_server_url = 'http://server.test:123'
         cnf.heat_watch_server_url = 'http://server.test:345'
+        cnf.instance_connection_is_secure = False
+        cnf.instance_connection_https_validate_certificates = False
         self.m.ReplayAll()
         data = nova_utils.build_userdata(resource, instance_user=None)
         self.assertNotIn('user: ', data)
@@ -213,11 +216,13 @@ class NovaUtilsUserdataTests(common.HeatTestCase):
         """Add the custom instance user when requested."""
         resource = self.m.CreateMockAnything()
         resource.metadata_get().AndReturn(None)
-        self.m.StubOutWithMock(nova_utils.cfg, 'CONF')
-        cnf = nova_utils.cfg.CONF
+        self.m.StubOutWithMock(nova.cfg, 'CONF')
+        cnf = nova.cfg.CONF
         cnf.instance_user = 'config_instance_user'
         cnf.heat_metadata_server_url = 'http://server.test:123'
         cnf.heat_watch_server_url = 'http://server.test:345'
+        cnf.instance_connection_is_secure = False
+        cnf.instance_connection_https_validate_certificates = False
         self.m.ReplayAll()
         data = nova_utils.build_userdata(resource,
                                          instance_user="custominstanceuser")
@@ -581,6 +581,67 @@ class ProviderTemplateTest(common.HeatTestCase):
         self.assertTrue(hasattr(cls, "attributes_schema"))
         self.m.VerifyAll()
 
+    def test_get_template_resource_class_cached(self):
+        test_templ_name = 'file:///etc/heatr/frodo.yaml'
+        minimal_temp = json.dumps({'HeatTemplateFormatVersion': '2012-12-12',
+                                   'Parameters': {'Foo': {'Type': 'String'}},
+                                   'Resources': {}})
+        self.m.StubOutWithMock(urlfetch, "get")
+        urlfetch.get(test_templ_name,
+                     allowed_schemes=('file',)).MultipleTimes().AndReturn(
+                         minimal_temp)
+        self.m.ReplayAll()
+
+        env_str = {'resource_registry': {'resources': {'fred': {
+            "OS::ResourceType": test_templ_name}}}}
+        env = environment.Environment(env_str)
+        cls = env.get_class('OS::ResourceType', 'fred')
+        info = env.get_resource_info('OS::ResourceType', 'fred')
+        self.assertIs(cls, info.get_class())
+
+        # another environment with the same template shares the class
+        same_env = environment.Environment(env_str)
+        self.assertIs(cls, same_env.get_class('OS::ResourceType', 'fred'))
+
+        # parameter defaults make the property optional, and so get a class
+        # of their own without affecting the shared one
+        env_str['parameter_defaults'] = {'Foo': 'bar'}
+        other_env = environment.Environment(env_str)
+        other_cls = other_env.get_class('OS::ResourceType', 'fred')
+        self.assertIsNot(cls, other_cls)
+        self.assertFalse(other_cls.properties_schema['Foo'].required)
+        self.assertIsNone(other_cls.properties_schema['Foo'].default)
+        self.assertTrue(cls.properties_schema['Foo'].required)
+        self.assertIs(cls, env.get_class('OS::ResourceType', 'fred'))
+        self.m.VerifyAll()
+
+    def test_provider_template_parsed_once(self):
+        provider = {
+            'HeatTemplateFormatVersion': '2012-12-12',
+            'Parameters': {'Foo': {'Type': 'String'}},
+            'Outputs': {'Bar': {'Value': 'baz'}},
+        }
+        files = {'test_resource.template': json.dumps(provider)}
+        env = environment.Environment()
+        env.load({'resource_registry':
+                  {'DummyResource': 'test_resource.template'}})
+        stack = parser.Stack(utils.dummy_context(), 'test_stack',
+                             template.Template(empty_template, files=files,
+                                               env=env))
+        defn = rsrc_defn.ResourceDefinition('test_t_res', 'DummyResource',
+                                            {'Foo': 'bar'})
+
+        parse = self.patchobject(template_format, 'parse',
+                                 wraps=template_format.parse)
+        res1 = template_resource.TemplateResource('r1', defn, stack)
+        res2 = template_resource.TemplateResource('r2', defn, stack)
+        self.assertEqual(1, parse.call_count)
+
+        self.assertIs(res1.properties_schema, res2.properties_schema)
+        self.assertIs(res1.attributes_schema, res2.attributes_schema)
+        self.assertEqual(res1.child_template(), res2.child_template())
+        self.assertIsNot(res1.child_template(), res2.child_template())
+
     def test_template_as_resource(self):
         """
         Test that the resulting resource has the right prop and attrib schema.
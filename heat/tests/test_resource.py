@@ -15,10 +15,12 @@ import itertools
 import json
 import os
 import sys
+import time
 import uuid
 
 import mock
 from oslo_config import cfg
+from oslo_log import log as logging
 import six
 
 from heat.common import exception
@@ -46,6 +48,8 @@ from heat.tests import utils
 import neutronclient.common.exceptions as neutron_exp
 
 
+LOG = logging.getLogger(__name__)
+
 empty_template = {"HeatTemplateFormatVersion": "2012-12-12"}
 
 
@@ -73,6 +77,27 @@ class ResourceTest(common.HeatTestCase):
         cls = resources.global_env().get_class('GenericResourceType')
         self.assertEqual(generic_rsrc.GenericResource, cls)
 
+    def test_instantiate_many_resources(self):
+        # Each instantiation looks up its class in the registry; after the
+        # first, lookups must be served from the memoized index.
+        stack = parser.Stack(utils.dummy_context(), 'test_stack',
+                             template.Template(empty_template, env=self.env))
+        tmpl = rsrc_defn.ResourceDefinition('test_resource',
+                                            'OS::Test::GenericResource')
+        registry = stack.env.registry
+        self.patchobject(registry, '_find_resource_info',
+                         wraps=registry._find_resource_info)
+
+        start = time.time()
+        for i in six.moves.xrange(10000):
+            res = resource.Resource('r%d' % i, tmpl, stack)
+            self.assertIsInstance(res, generic_rsrc.GenericResource)
+        LOG.info('Instantiated 10000 resources in %.2fs',
+                 time.time() - start)
+
+        # One lookup for the mapped type and one for its target
+        self.assertEqual(2, registry._find_resource_info.call_count)
+
     def test_get_class_noexist(self):
         self.assertRaises(exception.ResourceTypeNotFound,
                           resources.global_env().get_class,
@@ -365,6 +390,23 @@ class ResourceTest(common.HeatTestCase):
         self.assertEqual(res.COMPLETE, db_res.status)
         self.assertEqual('test_update', db_res.status_reason)
 
+    def test_store_or_update_bumps_metadata_version(self):
+        tmpl = rsrc_defn.ResourceDefinition('test_resource', 'Foo',
+                                            metadata={'foo': 'bar'})
+        res = generic_rsrc.GenericResource('test_res_md', tmpl, self.stack)
+        res._store()
+        db_res = resource_objects.Resource.get_obj(res.context, res.id)
+        version = db_res.rsrc_metadata_version or 0
+
+        res._store_or_update(res.CREATE, res.IN_PROGRESS, 'test_store')
+        db_res.refresh()
+        self.assertEqual({'foo': 'bar'}, db_res.rsrc_metadata)
+        self.assertEqual(version + 1, db_res.rsrc_metadata_version)
+
+        res._store_or_update(res.CREATE, res.COMPLETE, 'test_update')
+        db_res.refresh()
+        self.assertEqual(version + 1, db_res.rsrc_metadata_version)
+
     def test_parsed_template(self):
         join_func = cfn_funcs.Join(None,
                                    'Fn::Join', [' ', ['bar', 'baz', 'quux']])
@@ -762,6 +804,78 @@ class ResourceTest(common.HeatTestCase):
 
         self.m.VerifyAll()
 
+    def test_definition_digest_stored(self):
+        tmpl = rsrc_defn.ResourceDefinition('test_resource',
+                                            'GenericResourceType',
+                                            {'Foo': 'abc'})
+        res = generic_rsrc.ResourceWithProps('test_resource', tmpl, self.stack)
+        scheduler.TaskRunner(res.create)()
+
+        digest = res.definition_digest()
+        self.assertEqual(tmpl.freeze().digest(), digest)
+        rs = resource_objects.Resource.get_obj(self.stack.context, res.id)
+        self.assertEqual(digest, rs.definition_digest)
+
+    def test_update_unchanged_digest(self):
+        tmpl = rsrc_defn.ResourceDefinition('test_resource',
+                                            'GenericResourceType',
+                                            {'Foo': 'abc'})
+        res = generic_rsrc.ResourceWithProps('test_resource', tmpl, self.stack)
+        res.update_allowed_properties = ('Foo',)
+        scheduler.TaskRunner(res.create)()
+
+        utmpl = rsrc_defn.ResourceDefinition('test_resource',
+                                             'GenericResourceType',
+                                             {'Foo': 'abc'})
+        self.patchobject(generic_rsrc.ResourceWithProps, 'handle_update')
+        mock_props = self.patchobject(properties.Properties, '__eq__')
+        scheduler.TaskRunner(res.update, utmpl)()
+
+        self.assertEqual((res.CREATE, res.COMPLETE), res.state)
+        self.assertFalse(generic_rsrc.ResourceWithProps.handle_update.called)
+        self.assertFalse(mock_props.called)
+
+    def test_update_changed_digest(self):
+        tmpl = rsrc_defn.ResourceDefinition('test_resource',
+                                            'GenericResourceType',
+                                            {'Foo': 'abc'})
+        res = generic_rsrc.ResourceWithProps('test_resource', tmpl, self.stack)
+        res.update_allowed_properties = ('Foo',)
+        scheduler.TaskRunner(res.create)()
+        digest = res.definition_digest()
+
+        utmpl = rsrc_defn.ResourceDefinition('test_resource',
+                                             'GenericResourceType',
+                                             {'Foo': 'xyz'})
+        self.patchobject(generic_rsrc.ResourceWithProps, 'handle_update')
+        scheduler.TaskRunner(res.update, utmpl)()
+
+        self.assertEqual((res.UPDATE, res.COMPLETE), res.state)
+        self.assertTrue(generic_rsrc.ResourceWithProps.handle_update.called)
+        self.assertNotEqual(digest, res.definition_digest())
+        self.assertEqual(utmpl.freeze().digest(), res.definition_digest())
+
+    def test_update_unchanged_metadata_function(self):
+        join = cfn_funcs.Join(None, 'Fn::Join', ['a', ['b', 'r']])
+        tmpl = rsrc_defn.ResourceDefinition('test_resource',
+                                            'GenericResourceType',
+                                            {'Foo': 'abc'},
+                                            metadata={'Baz': join})
+        res = generic_rsrc.ResourceWithProps('test_resource', tmpl, self.stack)
+        scheduler.TaskRunner(res.create)()
+
+        # The stored digest holds the Metadata in template form, so it does
+        # not match and the definitions are compared in full
+        self.assertNotEqual(tmpl.freeze().digest(), res.definition_digest())
+        self.patchobject(generic_rsrc.ResourceWithProps, 'handle_update')
+        mock_props = self.patchobject(properties.Properties, '__eq__',
+                                      return_value=True)
+        scheduler.TaskRunner(res.update, tmpl)()
+
+        self.assertEqual((res.CREATE, res.COMPLETE), res.state)
+        self.assertFalse(generic_rsrc.ResourceWithProps.handle_update.called)
+        self.assertTrue(mock_props.called)
+
     def test_update_replace_with_resource_name(self):
         tmpl = rsrc_defn.ResourceDefinition('test_resource',
                                             'GenericResourceType',
@@ -218,6 +218,12 @@ class EngineRpcAPITestCase(common.HeatTestCase):
                               resource_name='LogicalResourceId',
                               with_attr=None)
 
+    def test_describe_stack_resource_metadata(self):
+        self._test_engine_api('describe_stack_resource_metadata', 'call',
+                              stack_identity=self.identity,
+                              resource_name='LogicalResourceId',
+                              metadata_version=None)
+
     def test_find_physical_resource(self):
         self._test_engine_api('find_physical_resource', 'call',
                               physical_resource_id=u'404d-a85b-5315293e67de')
@@ -268,7 +274,8 @@ class EngineRpcAPITestCase(common.HeatTestCase):
 
     def test_show_watch_metric(self):
         self._test_engine_api('show_watch_metric', 'call',
-                              metric_namespace=None, metric_name=None)
+                              metric_namespace=None, metric_name=None,
+                              limit=None, marker=None, version='1.10')
 
     def test_set_watch_state(self):
         self._test_engine_api('set_watch_state', 'call',
@@ -175,6 +175,38 @@ class ResourceDefinitionTest(common.HeatTestCase):
         self.assertNotEqual(rd1, rd2)
         self.assertNotEqual(hash(rd1), hash(rd2))
 
+    def test_digest_equal(self):
+        rd1 = self.make_me_one_with_everything().freeze()
+        rd2 = rsrc_defn.ResourceDefinition(
+            'other', 'SomeType',
+            properties={'Blarg': 'wibble', 'Foo': 'bar'},
+            metadata={'Baz': 'quux'},
+            depends=['other_resource'],
+            deletion_policy='Retain',
+            update_policy={'SomePolicy': {}}).freeze()
+        self.assertEqual(rd1.digest(), rd2.digest())
+        self.assertEqual(64, len(rd1.digest()))
+
+    def test_digest_properties(self):
+        rd = self.make_me_one_with_everything()
+        self.assertNotEqual(rd.freeze().digest(),
+                            rd.freeze(properties={'Foo': 'baz'}).digest())
+
+    def test_digest_unresolved(self):
+        rd = self.make_me_one_with_everything()
+        self.assertNotEqual(rd.freeze().digest(), rd.digest())
+        self.assertEqual(rd.digest(), rd.digest())
+
+    def test_digest_resolved_properties(self):
+        rd = rsrc_defn.ResourceDefinition(
+            'rsrc', 'SomeType',
+            properties={'Foo': cfn_funcs.Join(None,
+                                              'Fn::Join',
+                                              ['a', ['b', 'r']])},
+            metadata={'Baz': 'quux'})
+        self.assertEqual(rd.freeze().digest(),
+                         rd.digest(properties={'Foo': 'bar'}))
+
 
 class ResourceDefinitionSnippetTest(common.HeatTestCase):
     def test_type(self):
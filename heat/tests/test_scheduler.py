@@ -14,6 +14,7 @@
 import contextlib
 
 import eventlet
+import mock
 
 from heat.engine import dependencies
 from heat.engine import scheduler
@@ -892,6 +893,123 @@ class TaskTest(common.HeatTestCase):
         self.assertTrue(runner.done())
 
 
+class WakeTimeTest(common.HeatTestCase):
+
+    def setUp(self):
+        super(WakeTimeTest, self).setUp()
+        scheduler.ENABLE_SLEEP = True
+        scheduler.reset_lag_stats()
+        self.addCleanup(scheduler.reset_lag_stats)
+        self.now = 1000.0
+        self.patchobject(scheduler, '_now', side_effect=lambda: self.now)
+
+    @staticmethod
+    def polling_task(delays, steps):
+        def task():
+            for delay in delays:
+                steps.append(delay)
+                yield delay
+        return task
+
+    def advance(self, wait_time):
+        self.now += wait_time or 0
+
+    def test_sleep_until_declared_wake_time(self):
+        steps = []
+        sleep = self.patchobject(scheduler.TaskRunner, '_sleep',
+                                 side_effect=self.advance)
+
+        runner = scheduler.TaskRunner(self.polling_task([0.25, 0.5], steps))
+        runner()
+
+        self.assertEqual([0.25, 0.5], steps)
+        self.assertEqual([mock.call(0), mock.call(0.25), mock.call(0.5)],
+                         sleep.call_args_list)
+
+    def test_undeclared_wake_time_uses_wait_time(self):
+        sleep = self.patchobject(scheduler.TaskRunner, '_sleep',
+                                 side_effect=self.advance)
+
+        scheduler.TaskRunner(DummyTask(2))(wait_time=3)
+
+        self.assertEqual([mock.call(0), mock.call(3)],
+                         sleep.call_args_list)
+
+    def test_step_not_due(self):
+        steps = []
+        runner = scheduler.TaskRunner(self.polling_task([5, 5], steps))
+        runner.start()
+        self.assertEqual([5], steps)
+        self.assertEqual(5, runner.wake_delay())
+
+        self.now += 2
+        self.assertFalse(runner.due())
+        self.assertFalse(runner.step())
+        self.assertEqual([5], steps)
+        self.assertEqual(3, runner.wake_delay())
+
+        self.now += 3
+        self.assertTrue(runner.due())
+        self.assertFalse(runner.step())
+        self.assertEqual([5, 5], steps)
+
+    def test_step_not_due_sleep_disabled(self):
+        scheduler.ENABLE_SLEEP = False
+        steps = []
+        runner = scheduler.TaskRunner(self.polling_task([5, 5], steps))
+        runner.start()
+
+        self.assertTrue(runner.due())
+        self.assertFalse(runner.step())
+        self.assertEqual([5, 5], steps)
+
+    def test_polling_group_earliest_wake_delay(self):
+        tg = scheduler.PollingTaskGroup([self.polling_task([2, 2], []),
+                                         self.polling_task([0.5, 0.5], [])])
+        task = tg()
+
+        self.assertEqual(0.5, next(task))
+
+    def test_dependency_group_earliest_wake_delay(self):
+        steps = []
+        deps = dependencies.Dependencies([('A', None), ('B', None)])
+        delays = {'A': [2, 2], 'B': [0.5, 0.5]}
+
+        def task(key):
+            return self.polling_task(delays[key], steps)()
+
+        tg = scheduler.DependencyTaskGroup(deps, task)()
+        self.assertEqual(0.5, next(tg))
+
+        self.now += 0.5
+        self.assertEqual(0.5, next(tg))
+        self.assertEqual([0.5, 0.5, 2], sorted(steps))
+
+    def test_group_wake_delay_undeclared(self):
+        tg = scheduler.PollingTaskGroup([self.polling_task([0.5, 0.5], []),
+                                         DummyTask()])
+        task = tg()
+
+        self.assertIsNone(next(task))
+
+    def test_lag_stats(self):
+        self.patchobject(eventlet, 'sleep')
+        self.patchobject(scheduler, '_now', side_effect=[10.0, 11.5])
+
+        scheduler.TaskRunner(DummyTask())._sleep(1)
+
+        stats = scheduler.get_lag_stats()
+        self.assertEqual(1, stats['sleeps'])
+        self.assertEqual(0.5, stats['max_lag'])
+        self.assertEqual(0.5, stats['mean_lag'])
+
+    def test_backoff_delays(self):
+        delays = scheduler.backoff_delays(initial=0.1, maximum=1.0)
+
+        self.assertEqual([0.1, 0.2, 0.4, 0.8, 1.0, 1.0],
+                         [next(delays) for i in range(6)])
+
+
 class TimeoutTest(common.HeatTestCase):
     def test_compare(self):
         task = scheduler.TaskRunner(DummyTask())
@@ -16,6 +16,7 @@ import copy
 import json
 import time
 
+import eventlet
 import mock
 import mox
 from oslo_config import cfg
@@ -27,7 +28,9 @@ from heat.common import template_format
 from heat.db import api as db_api
 from heat.engine.clients.os import keystone
 from heat.engine.clients.os import nova
+from heat.engine import constraints
 from heat.engine import environment
+from heat.engine import properties
 from heat.engine import resource
 from heat.engine import scheduler
 from heat.engine import stack
@@ -45,6 +48,14 @@ empty_template = template_format.parse('''{
 }''')
 
 
+class KeyPairUser(generic_rsrc.GenericResource):
+    properties_schema = {
+        'KeyName': properties.Schema(
+            properties.Schema.STRING,
+            constraints=[constraints.CustomConstraint('nova.keypair')])
+    }
+
+
 class StackTest(common.HeatTestCase):
     def setUp(self):
         super(StackTest, self).setUp()
@@ -1732,6 +1743,77 @@ class StackTest(common.HeatTestCase):
                                  template.Template(tmpl))
         self.assertIsNone(self.stack.validate())
 
+    def _keypair_user_template(self, count):
+        resource._register_class('KeyPairUserType', KeyPairUser)
+        tmpl = {
+            'HeatTemplateFormatVersion': '2012-12-12',
+            'Resources': dict(('R%02d' % i,
+                               {'Type': 'KeyPairUserType',
+                                'Properties': {'KeyName': 'key%d' % i}})
+                              for i in range(count))
+        }
+        return tmpl
+
+    def test_validate_resources_concurrently(self):
+        # Each keypair lookup against the backend takes 50ms
+        def get_keypair(key_name):
+            eventlet.sleep(0.05)
+
+        self.patchobject(nova.NovaClientPlugin, 'get_keypair',
+                         side_effect=get_keypair)
+        self.stack = stack.Stack(self.ctx, 'test_stack', template.Template(
+            self._keypair_user_template(20)))
+
+        def time_validate(concurrency):
+            cfg.CONF.set_override('resource_validation_concurrency',
+                                  concurrency)
+            start = time.time()
+            self.assertIsNone(self.stack.validate())
+            return time.time() - start
+
+        serial = time_validate(1)
+        concurrent = time_validate(10)
+        self.assertGreater(serial, 1.0)
+        self.assertLess(concurrent * 3, serial)
+
+    def test_validate_resources_own_db_sessions(self):
+        sessions = []
+
+        def validate(res):
+            sessions.append(res.context.session)
+            eventlet.sleep(0)
+
+        self.patchobject(KeyPairUser, 'validate', autospec=True,
+                         side_effect=validate)
+        self.stack = stack.Stack(self.ctx, 'test_stack', template.Template(
+            self._keypair_user_template(3)))
+
+        self.assertIsNone(self.stack.validate())
+        self.assertEqual(3, len(set(id(s) for s in sessions)))
+        self.assertNotIn(self.ctx.session, sessions)
+        for res in self.stack.values():
+            self.assertIs(self.ctx, res.context)
+
+    def test_validate_resources_first_error_in_order(self):
+        # The error of the resource that comes first in dependency order is
+        # reported, even though it is found last
+        def get_keypair(key_name):
+            if key_name == 'key0':
+                eventlet.sleep(0.1)
+            raise exception.UserKeyPairMissing(key_name=key_name)
+
+        self.patchobject(nova.NovaClientPlugin, 'get_keypair',
+                         side_effect=get_keypair)
+        tmpl = self._keypair_user_template(2)
+        tmpl['Resources']['R01']['DependsOn'] = 'R00'
+        self.stack = stack.Stack(self.ctx, 'test_stack',
+                                 template.Template(tmpl))
+
+        ex = self.assertRaises(exception.StackValidationFailed,
+                               self.stack.validate)
+        self.assertIn('key0', six.text_type(ex))
+        self.assertNotIn('key1', six.text_type(ex))
+
     def test_param_validate_value(self):
         tmpl = template_format.parse("""
         HeatTemplateFormatVersion: '2012-12-12'
@@ -15,7 +15,9 @@ import mock
 import oslo_messaging as messaging
 
 from heat.common import exception
+from heat.engine import liveness
 from heat.engine import stack_lock
+from heat.objects import service as service_objects
 from heat.objects import stack as stack_object
 from heat.objects import stack_lock as stack_lock_object
 from heat.tests import common
@@ -220,7 +222,9 @@ class StackLockTest(common.HeatTestCase):
     def test_engine_alive_ok(self):
         slock = stack_lock.StackLock(self.context, self.stack_id,
                                      self.engine_id)
-        mget_client = self.patchobject(stack_lock.rpc_messaging,
+        self.patchobject(service_objects.Service, 'get_all_by_engine_ids',
+                         return_value=[])
+        mget_client = self.patchobject(liveness.rpc_messaging,
                                        'get_rpc_client')
         mclient = mget_client.return_value
         mclient_ctx = mclient.prepare.return_value
@@ -233,7 +237,9 @@ class StackLockTest(common.HeatTestCase):
     def test_engine_alive_timeout(self):
         slock = stack_lock.StackLock(self.context, self.stack_id,
                                      self.engine_id)
-        mget_client = self.patchobject(stack_lock.rpc_messaging,
+        self.patchobject(service_objects.Service, 'get_all_by_engine_ids',
+                         return_value=[])
+        mget_client = self.patchobject(liveness.rpc_messaging,
                                        'get_rpc_client')
         mclient = mget_client.return_value
         mclient_ctx = mclient.prepare.return_value
@@ -20,6 +20,7 @@ import six
 
 from heat.common import exception
 from heat.common import template_format
+from heat.engine import local_engine
 from heat.engine import resource
 from heat.engine.resources import stack_resource
 from heat.engine import stack as parser
@@ -802,3 +803,90 @@ class WithTemplateTest(StackResourceBaseTest):
         rpcc.return_value.update_stack.assert_called_once_with(
             self.ctx, 'stack_identifier', self.empty_temp.t,
             child_env, {}, {'timeout_mins': self.timeout_mins})
+
+
+class InProcessWithTemplateTest(StackResourceBaseTest):
+
+    def setUp(self):
+        super(InProcessWithTemplateTest, self).setUp()
+        self.engine = mock.Mock()
+        self.engine.thread_group_mgr.thread_count.return_value = 0
+        local_engine.register(self.engine)
+        self.rpcc = mock.Mock()
+        self.parent_resource.rpc_client = self.rpcc
+        self.parent_resource.child_params = mock.Mock(return_value={})
+
+    def _check_context(self, cnxt):
+        self.assertIsNot(self.ctx, cnxt)
+        self.assertEqual(self.ctx.to_dict(), cnxt.to_dict())
+
+    def test_create_with_template(self):
+        self.engine.create_nested_stack.return_value = {
+            'stack_id': 'pancakes'}
+        self.parent_resource.create_with_template(self.empty_temp)
+
+        self.assertFalse(self.rpcc.return_value._create_stack.called)
+        self.assertEqual(1, self.engine.create_nested_stack.call_count)
+        args, kwargs = self.engine.create_nested_stack.call_args
+        cnxt, name, tmpl, api_args = args
+        self._check_context(cnxt)
+        self.assertEqual(self.parent_resource.physical_resource_name(), name)
+        self.assertIsInstance(tmpl, templatem.Template)
+        self.assertEqual(self.empty_temp.t, tmpl.t)
+        self.assertEqual({}, tmpl.env.params)
+        self.assertEqual({'disable_rollback': True,
+                          'adopt_stack_data': None,
+                          'timeout_mins': None}, api_args)
+        self.assertEqual({'owner_id': self.parent_stack.id,
+                          'nested_depth': 1,
+                          'user_creds_id': 'uc123',
+                          'stack_user_project_id': 'aprojectid',
+                          'parent_resource_name': 'test'}, kwargs)
+        self.assertEqual('pancakes', self.parent_resource.resource_id)
+
+    def test_create_with_template_adopt(self):
+        self.rpcc.return_value._create_stack.return_value = {
+            'stack_id': 'pancakes'}
+        self.parent_resource.create_with_template(
+            self.empty_temp, adopt_data={'template': 'foo',
+                                         'environment': 'eee'})
+
+        self.assertFalse(self.engine.create_nested_stack.called)
+        self.assertEqual(1, self.rpcc.return_value._create_stack.call_count)
+
+    def test_create_with_template_engine_busy(self):
+        self.engine.thread_group_mgr.thread_count.return_value = 10
+        cfg.CONF.set_override('max_in_process_stack_threads', 10)
+        self.rpcc.return_value._create_stack.return_value = {
+            'stack_id': 'pancakes'}
+        self.parent_resource.create_with_template(self.empty_temp)
+
+        self.assertFalse(self.engine.create_nested_stack.called)
+        self.assertEqual(1, self.rpcc.return_value._create_stack.call_count)
+
+    def test_create_with_template_error(self):
+        self.engine.create_nested_stack.side_effect = (
+            exception.InvalidResourceType(message='boom'))
+        ex = self.assertRaises(exception.InvalidResourceType,
+                               self.parent_resource.create_with_template,
+                               self.empty_temp)
+        self.assertEqual('boom', six.text_type(ex))
+
+    def test_update_with_template(self):
+        nested = mock.MagicMock()
+        nested.updated_time = 'now_time'
+        nested.state = ('CREATE', 'COMPLETE')
+        nested.identifier.return_value = 'stack_identifier'
+        self.parent_resource.nested = mock.MagicMock(return_value=nested)
+        self.parent_resource._nested = nested
+
+        self.parent_resource.update_with_template(self.empty_temp,
+                                                  timeout_mins=20)
+
+        self.assertFalse(self.rpcc.return_value.update_stack.called)
+        args, kwargs = self.engine.update_nested_stack.call_args
+        cnxt, identity, tmpl, api_args = args
+        self._check_context(cnxt)
+        self.assertEqual('stack_identifier', identity)
+        self.assertEqual(self.empty_temp.t, tmpl.t)
+        self.assertEqual({'timeout_mins': 20}, api_args)
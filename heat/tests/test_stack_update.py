@@ -21,6 +21,7 @@ from heat.engine import resource
 from heat.engine import scheduler
 from heat.engine import stack
 from heat.engine import template
+from heat.objects import stack as stack_object
 from heat.tests import common
 from heat.tests import generic_resource as generic_rsrc
 from heat.tests import utils
@@ -258,6 +259,79 @@ class StackUpdateTest(common.HeatTestCase):
         stored_props = loaded_stack['AResource']._stored_properties_data
         self.assertEqual({'Foo': 'xyz'}, stored_props)
 
+    def test_update_in_place_no_backup_stack(self):
+        tmpl = {'heat_template_version': '2013-05-23',
+                'resources': {'AResource': {
+                    'type': 'ResWithComplexPropsAndAttrs',
+                    'properties': {'an_int': 1}}}}
+
+        self.stack = stack.Stack(self.ctx, 'update_test_stack',
+                                 template.Template(tmpl))
+        self.stack.store()
+        self.stack.create()
+        self.assertEqual((stack.Stack.CREATE, stack.Stack.COMPLETE),
+                         self.stack.state)
+
+        tmpl2 = {'heat_template_version': '2013-05-23',
+                 'resources': {'AResource': {
+                     'type': 'ResWithComplexPropsAndAttrs',
+                     'properties': {'an_int': 2}}}}
+        updated_stack = stack.Stack(self.ctx, 'updated_stack',
+                                    template.Template(tmpl2))
+
+        mock_store = self.patchobject(stack_object.Stack, 'create',
+                                      wraps=stack_object.Stack.create)
+        mock_copy = self.patchobject(stack.copy, 'deepcopy',
+                                     wraps=copy.deepcopy)
+        self.stack.update(updated_stack)
+        self.assertEqual((stack.Stack.UPDATE, stack.Stack.COMPLETE),
+                         self.stack.state)
+        self.assertEqual(2, self.stack['AResource'].properties['an_int'])
+
+        # Updating in place neither stores a backup stack nor copies the
+        # template
+        self.assertFalse(mock_store.called)
+        self.assertFalse(any(isinstance(args[0], template.Template)
+                             for args, kwargs in mock_copy.call_args_list))
+        self.assertIsNone(self.stack._backup_stack(create_if_missing=False))
+
+    def test_update_replace_creates_backup_stack(self):
+        tmpl = {'HeatTemplateFormatVersion': '2012-12-12',
+                'Resources': {
+                    'AResource': {'Type': 'ResourceWithPropsType',
+                                  'Properties': {'Foo': 'abc'}},
+                    'BResource': {'Type': 'ResWithComplexPropsAndAttrs',
+                                  'Properties': {'an_int': 1}}}}
+
+        self.stack = stack.Stack(self.ctx, 'update_test_stack',
+                                 template.Template(tmpl))
+        self.stack.store()
+        self.stack.create()
+        self.assertEqual((stack.Stack.CREATE, stack.Stack.COMPLETE),
+                         self.stack.state)
+
+        tmpl2 = {'HeatTemplateFormatVersion': '2012-12-12',
+                 'Resources': {
+                     'AResource': {'Type': 'ResourceWithPropsType',
+                                   'Properties': {'Foo': 'xyz'}},
+                     'BResource': {'Type': 'ResWithComplexPropsAndAttrs',
+                                   'Properties': {'an_int': 2}}}}
+        updated_stack = stack.Stack(self.ctx, 'updated_stack',
+                                    template.Template(tmpl2))
+
+        mock_store = self.patchobject(stack_object.Stack, 'create',
+                                      wraps=stack_object.Stack.create)
+        self.stack.update(updated_stack)
+        self.assertEqual((stack.Stack.UPDATE, stack.Stack.COMPLETE),
+                         self.stack.state)
+        self.assertEqual('xyz', self.stack['AResource'].properties['Foo'])
+        self.assertEqual(2, self.stack['BResource'].properties['an_int'])
+
+        # The backup stack is created for the replacement, and deleted once
+        # the update is complete
+        self.assertEqual(1, mock_store.call_count)
+        self.assertIsNone(self.stack._backup_stack(create_if_missing=False))
+
     def test_update_modify_ok_replace_int(self):
         # create
         # ========
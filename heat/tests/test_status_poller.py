@@ -0,0 +1,150 @@
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import mock
+from oslo_config import cfg
+
+from heat.engine.clients import status_poller
+from heat.tests import common
+from heat.tests import utils
+
+
+class FakePoller(status_poller.BulkStatusPoller):
+    def __init__(self, interval):
+        super(FakePoller, self).__init__(interval)
+        self.list_mock = mock.Mock()
+
+    def _list(self, client):
+        return self.list_mock(client)
+
+
+def fake_item(item_id, status):
+    item = mock.Mock()
+    item.id = item_id
+    item.status = status
+    return item
+
+
+class BulkStatusPollerTest(common.HeatTestCase):
+    def setUp(self):
+        super(BulkStatusPollerTest, self).setUp()
+        self.now = 1000.0
+        self.patchobject(status_poller.time, 'time',
+                         side_effect=lambda: self.now)
+        self.poller = FakePoller(1)
+        self.client = mock.Mock()
+
+    def test_requests_share_listing(self):
+        self.poller.list_mock.return_value = [fake_item('a', 'BUILD'),
+                                              fake_item('b', 'BUILD')]
+
+        self.assertIsNone(self.poller.get(self.client, 'a'))
+        self.assertEqual('BUILD', self.poller.get(self.client, 'b').status)
+        self.assertEqual('BUILD', self.poller.get(self.client, 'a').status)
+        self.poller.list_mock.assert_called_once_with(self.client)
+
+    def test_single_waiter_not_listed(self):
+        self.assertIsNone(self.poller.get(self.client, 'a'))
+        self.now += 0.1
+        self.assertIsNone(self.poller.get(self.client, 'a'))
+        self.assertFalse(self.poller.list_mock.called)
+
+    def test_same_resource_gets_newer_listing(self):
+        self.poller.list_mock.side_effect = [[fake_item('a', 'BUILD')],
+                                             [fake_item('a', 'ACTIVE')]]
+
+        self.poller.get(self.client, 'b')
+        self.assertEqual('BUILD', self.poller.get(self.client, 'a').status)
+        # The listing is not repeated within the interval, so the resource
+        # has to be fetched individually meanwhile
+        self.now += 0.1
+        self.assertIsNone(self.poller.get(self.client, 'a'))
+        self.assertEqual(1, self.poller.list_mock.call_count)
+
+        self.now += 1
+        self.assertEqual('ACTIVE', self.poller.get(self.client, 'a').status)
+        self.assertEqual(2, self.poller.list_mock.call_count)
+
+    def test_listing_expires(self):
+        self.poller.list_mock.side_effect = [[fake_item('a', 'BUILD'),
+                                              fake_item('b', 'BUILD')],
+                                             [fake_item('a', 'ACTIVE')]]
+
+        self.poller.get(self.client, 'a')
+        self.poller.get(self.client, 'b')
+        self.now += 1
+        self.assertEqual('ACTIVE', self.poller.get(self.client, 'a').status)
+        self.assertEqual(2, self.poller.list_mock.call_count)
+
+    def test_changed_ignores_earlier_listing(self):
+        self.poller.list_mock.side_effect = [[fake_item('a', 'ACTIVE'),
+                                              fake_item('b', 'BUILD')],
+                                             [fake_item('a', 'RESIZE')]]
+
+        self.poller.get(self.client, 'a')
+        self.poller.get(self.client, 'b')
+        self.poller.changed('a')
+        self.assertIsNone(self.poller.get(self.client, 'a'))
+        self.assertEqual(1, self.poller.list_mock.call_count)
+
+        self.now += 1
+        self.assertEqual('RESIZE', self.poller.get(self.client, 'a').status)
+        self.assertEqual(2, self.poller.list_mock.call_count)
+
+    def test_missing_resource(self):
+        self.poller.list_mock.return_value = [fake_item('a', 'BUILD')]
+
+        self.poller.get(self.client, 'a')
+        self.assertIsNone(self.poller.get(self.client, 'b'))
+        self.poller.list_mock.assert_called_once_with(self.client)
+
+    def test_stats(self):
+        self.poller.list_mock.return_value = [fake_item('a', 'BUILD'),
+                                              fake_item('b', 'BUILD')]
+        for item_id in ('a', 'b', 'c', 'a'):
+            self.poller.get(self.client, item_id)
+
+        self.assertEqual({'requests': 4, 'list_calls': 1, 'misses': 2,
+                          'calls_saved': 1}, self.poller.stats())
+
+    def test_stats_logged_per_interval(self):
+        self.poller.list_mock.return_value = [fake_item('a', 'BUILD'),
+                                              fake_item('b', 'BUILD')]
+        mock_log = self.patchobject(status_poller.LOG, 'debug')
+        self.poller.get(self.client, 'a')
+        self.poller.get(self.client, 'b')
+        self.assertFalse(mock_log.called)
+
+        self.now += status_poller.STATS_LOG_INTERVAL
+        self.poller.get(self.client, 'a')
+        self.poller.get(self.client, 'b')
+        mock_log.assert_called_once_with(
+            'FakePoller answered 3 status requests with 2 listings and 1 '
+            'individual requests in the last 60 seconds, saving 0 API calls')
+
+
+class GetPollerTest(common.HeatTestCase):
+    def test_disabled(self):
+        ctx = utils.dummy_context()
+        self.assertIsNone(status_poller.get_poller(FakePoller, ctx))
+
+    def test_shared_per_tenant(self):
+        cfg.CONF.set_override('bulk_status_poll_interval', 2)
+        ctx = utils.dummy_context(tenant_id='tenant1')
+        poller = status_poller.get_poller(FakePoller, ctx)
+        self.assertIsInstance(poller, FakePoller)
+        self.assertEqual(2, poller.interval)
+        self.assertIs(poller, status_poller.get_poller(
+            FakePoller, utils.dummy_context(tenant_id='tenant1')))
+        self.assertIsNot(poller, status_poller.get_poller(
+            FakePoller, utils.dummy_context(tenant_id='tenant2')))
@@ -0,0 +1,191 @@
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from oslo_config import cfg
+
+from heat.engine import rsrc_defn
+from heat.engine import scheduler
+from heat.engine import stack
+from heat.engine import template
+from heat.engine import throttling
+from heat.tests import common
+from heat.tests import generic_resource as generic_rsrc
+from heat.tests import utils
+
+
+empty_template = {'HeatTemplateFormatVersion': '2012-12-12'}
+
+
+class ThrottledResource(generic_rsrc.GenericResource):
+    default_client_name = 'nova'
+
+    def handle_create(self):
+        return self.name
+
+    def check_create_complete(self, handler_data):
+        return self.name in self.completed
+
+
+class ThrottleTest(common.HeatTestCase):
+    def setUp(self):
+        super(ThrottleTest, self).setUp()
+        self.now = 1000.0
+        self.patchobject(throttling, '_now', side_effect=lambda: self.now)
+
+    def test_unlimited(self):
+        throttle = throttling.Throttle(0, 0)
+        for i in range(100):
+            self.assertEqual([], list(throttle.start_action()))
+            self.assertEqual([], list(throttle.call()))
+
+        stats = throttle.stats()
+        self.assertEqual(100, stats['in_progress'])
+        self.assertEqual(100, stats['actions'])
+        self.assertEqual(200, stats['calls'])
+        self.assertEqual(0, stats['waits'])
+
+    def test_calls_per_second(self):
+        throttle = throttling.Throttle(0, 2)
+        # A burst of one second's worth of calls is allowed
+        self.assertEqual([], list(throttle.call()))
+        self.assertEqual([], list(throttle.call()))
+
+        waiter = throttle.call()
+        self.assertEqual(0.5, next(waiter))
+        self.assertEqual(1, throttle.stats()['queue_depth'])
+        self.now += 0.25
+        self.assertEqual(0.25, next(waiter))
+        self.now += 0.25
+        self.assertRaises(StopIteration, next, waiter)
+
+        stats = throttle.stats()
+        self.assertEqual(0, stats['queue_depth'])
+        self.assertEqual(1, stats['max_queue_depth'])
+        self.assertEqual(1, stats['waits'])
+        self.assertEqual(0.5, stats['max_wait'])
+        self.assertEqual(0.5, stats['mean_wait'])
+        self.assertEqual(3, stats['calls'])
+
+    def test_max_in_progress(self):
+        throttle = throttling.Throttle(1, 0)
+        self.assertEqual([], list(throttle.start_action()))
+
+        waiter = throttle.start_action()
+        self.assertEqual(throttling.SLOT_POLL_INTERVAL, next(waiter))
+        self.now += 5
+        self.assertEqual(throttling.SLOT_POLL_INTERVAL, next(waiter))
+
+        throttle.end_action()
+        self.assertRaises(StopIteration, next, waiter)
+        stats = throttle.stats()
+        self.assertEqual(1, stats['in_progress'])
+        self.assertEqual(2, stats['actions'])
+        self.assertEqual(5, stats['max_wait'])
+
+    def test_cancelled_wait(self):
+        throttle = throttling.Throttle(1, 0)
+        self.assertEqual([], list(throttle.start_action()))
+
+        waiter = throttle.start_action()
+        next(waiter)
+        waiter.close()
+        stats = throttle.stats()
+        self.assertEqual(1, stats['in_progress'])
+        self.assertEqual(0, stats['queue_depth'])
+        self.assertEqual(0, stats['waits'])
+
+
+class GetThrottleTest(common.HeatTestCase):
+    def test_shared_per_client_and_tenant(self):
+        ctx = utils.dummy_context()
+        other_ctx = utils.dummy_context(tenant_id='other_tenant')
+
+        throttle = throttling.get_throttle('nova', ctx)
+        self.assertIs(throttle, throttling.get_throttle('nova', ctx))
+        self.assertIsNot(throttle, throttling.get_throttle('cinder', ctx))
+        self.assertIsNot(throttle, throttling.get_throttle('nova', other_ctx))
+        self.assertEqual(3, len(throttling.get_stats()))
+
+    def test_no_client(self):
+        cfg.CONF.set_override('max_actions_in_progress', 1, group='clients')
+        throttle = throttling.get_throttle(None, utils.dummy_context())
+        self.assertEqual(0, throttle.max_in_progress)
+        self.assertEqual({}, throttling.get_stats())
+
+    def test_client_options(self):
+        cfg.CONF.set_override('max_actions_in_progress', 10, group='clients')
+        cfg.CONF.set_override('max_calls_per_second', 5, group='clients')
+        cfg.CONF.set_override('max_actions_in_progress', 2,
+                              group='clients_nova')
+        ctx = utils.dummy_context()
+
+        nova = throttling.get_throttle('nova', ctx)
+        self.assertEqual(2, nova.max_in_progress)
+        self.assertEqual(5, nova.calls_per_second)
+        cinder = throttling.get_throttle('cinder', ctx)
+        self.assertEqual(10, cinder.max_in_progress)
+        unknown = throttling.get_throttle('unknown', ctx)
+        self.assertEqual(10, unknown.max_in_progress)
+
+
+class ThrottledActionTest(common.HeatTestCase):
+    def setUp(self):
+        super(ThrottledActionTest, self).setUp()
+        cfg.CONF.set_override('max_actions_in_progress', 1,
+                              group='clients_nova')
+        self.stack = stack.Stack(utils.dummy_context(), 'test_stack',
+                                 template.Template(empty_template))
+        ThrottledResource.completed = set()
+
+    def _resource(self, name):
+        definition = rsrc_defn.ResourceDefinition(name, 'ThrottledResource')
+        return ThrottledResource(name, definition, self.stack)
+
+    def test_actions_wait_for_slot(self):
+        first = self._resource('first')
+        second = self._resource('second')
+        self.patchobject(first, 'handle_create',
+                         wraps=first.handle_create)
+        self.patchobject(second, 'handle_create',
+                         wraps=second.handle_create)
+
+        first_task = scheduler.TaskRunner(first.action_handler_task,
+                                          first.CREATE)
+        second_task = scheduler.TaskRunner(second.action_handler_task,
+                                           second.CREATE)
+        first_task.start()
+        second_task.start()
+        self.assertTrue(first.handle_create.called)
+        self.assertFalse(second.handle_create.called)
+
+        first_task.step()
+        second_task.step()
+        self.assertFalse(second.handle_create.called)
+
+        ThrottledResource.completed.add('first')
+        self.assertTrue(first_task.step())
+        second_task.step()
+        self.assertTrue(second.handle_create.called)
+
+        stats = throttling.get_stats()[('nova', 'test_tenant_id', None)]
+        self.assertEqual(1, stats['in_progress'])
+        self.assertEqual(1, stats['waits'])
+
+    def test_slot_returned_on_cancel(self):
+        rsrc = self._resource('first')
+        task = scheduler.TaskRunner(rsrc.action_handler_task, rsrc.CREATE)
+        task.start()
+        task.cancel()
+
+        throttle = throttling.get_throttle('nova', self.stack.context)
+        self.assertEqual(0, throttle.in_progress)
@@ -13,18 +13,24 @@
 
 
 import datetime
+import time
 
 import mox
+from oslo_log import log as logging
 from oslo_utils import timeutils
+import six
 
 from heat.common import exception
 from heat.engine import stack
 from heat.engine import template
 from heat.engine import watchrule
+from heat.objects import watch_data as watch_data_object
 from heat.objects import watch_rule
 from heat.tests import common
 from heat.tests import utils
 
+LOG = logging.getLogger(__name__)
+
 
 class WatchData(object):
     def __init__(self, data, created_at):
@@ -37,6 +43,128 @@ class DummyAction(object):
     signal = "DummyAction"
 
 
+class DummyRule(object):
+    def __init__(self, rule, state='NORMAL'):
+        self.rule = rule
+        self.state = state
+
+
+def _dimension_rule(metric, **dimensions):
+    return {'MetricName': metric,
+            'Dimensions': [{'Name': k, 'Value': v}
+                           for k, v in dimensions.items()]}
+
+
+def _sample(metric, **dimensions):
+    return {'Namespace': 'system/linux',
+            metric: {'Unit': 'Percent', 'Value': 1,
+                     'Dimensions': [dimensions]}}
+
+
+class WatchRuleIndexTest(common.HeatTestCase):
+
+    def setUp(self):
+        super(WatchRuleIndexTest, self).setUp()
+        self.index = watchrule.WatchRuleIndex()
+
+    def test_candidates(self):
+        self.index.add(1, _dimension_rule('cpu'), 'NORMAL')
+        self.index.add(2, _dimension_rule('cpu', Group='g1'), 'NORMAL')
+        self.index.add(3, _dimension_rule('cpu', Group='g1', Host='h1'),
+                       'NORMAL')
+        self.index.add(4, _dimension_rule('cpu', Group='g2'), 'NORMAL')
+        self.index.add(5, _dimension_rule('mem', Group='g1'), 'NORMAL')
+
+        self.assertEqual(set([1, 2]),
+                         self.index.candidates(_sample('cpu', Group='g1')))
+        self.assertEqual(set([1, 2, 3]),
+                         self.index.candidates(_sample('cpu', Group='g1',
+                                                       Host='h1')))
+        self.assertEqual(set([1]),
+                         self.index.candidates(_sample('cpu', Host='h1')))
+        self.assertEqual(set([5]),
+                         self.index.candidates(_sample('mem', Group='g1')))
+        self.assertEqual(set(),
+                         self.index.candidates(_sample('disk', Group='g1')))
+
+    def test_update_and_remove(self):
+        self.index.add(1, _dimension_rule('cpu', Group='g1'), 'NORMAL')
+        self.index.add(1, _dimension_rule('cpu', Group='g2'), 'NORMAL')
+        self.assertEqual(set(),
+                         self.index.candidates(_sample('cpu', Group='g1')))
+        self.assertEqual(set([1]),
+                         self.index.candidates(_sample('cpu', Group='g2')))
+
+        self.index.add(1, _dimension_rule('cpu', Group='g2'), 'SUSPENDED')
+        self.assertEqual(0, len(self.index))
+
+        self.index.add(1, _dimension_rule('cpu', Group='g2'), 'NORMAL')
+        self.index.remove(1)
+        self.index.remove(1)
+        self.assertEqual(0, len(self.index))
+        self.assertEqual(set(),
+                         self.index.candidates(_sample('cpu', Group='g2')))
+
+    def test_ceilometer_controlled(self):
+        rule = {'meter_name': 'cpu_util',
+                'matching_metadata': {'metadata.user_metadata.groupname':
+                                      'g1'}}
+        self.index.add(1, rule, watchrule.WatchRule.CEILOMETER_CONTROLLED)
+        self.assertEqual(set([1]), self.index.candidates(
+            _sample('cpu_util', groupname='g1')))
+
+    def test_sync_overlap_and_rebuild(self):
+        ctx = utils.dummy_context()
+        changed_at = datetime.datetime(2015, 1, 1, 12, 0, 0)
+        summary = self.patchobject(watch_rule.WatchRule, 'get_all_summary')
+        summary.return_value = [(1, _dimension_rule('cpu'), 'NORMAL',
+                                 changed_at, None)]
+        self.index.sync(ctx)
+        summary.assert_called_once_with(ctx, updated_since=None)
+        self.assertEqual(1, len(self.index))
+
+        # Rules changed shortly before the last sync by an engine with a
+        # slower clock are still picked up
+        summary.return_value = []
+        self.index.sync(ctx)
+        summary.assert_called_with(
+            ctx, updated_since=changed_at - datetime.timedelta(
+                seconds=watchrule.INDEX_SYNC_OVERLAP))
+        self.assertEqual(1, len(self.index))
+
+        # Rebuilding drops rules deleted by other engines
+        self.patchobject(watchrule.timeutils, 'is_older_than',
+                         return_value=True)
+        self.index.sync(ctx)
+        summary.assert_called_with(ctx, updated_since=None)
+        self.assertEqual(0, len(self.index))
+
+    def test_candidates_50k_rules(self):
+        metrics = ('cpu', 'mem', 'disk', 'net', 'load')
+        for i in six.moves.xrange(50000):
+            self.index.add(i, _dimension_rule(metrics[i % len(metrics)],
+                                              Group='group%d' % (i // 10)),
+                           'NORMAL')
+        self.assertEqual(50000, len(self.index))
+
+        start = time.time()
+        for i in six.moves.xrange(1000):
+            matches = self.index.candidates(_sample('cpu', Group='group42'))
+        LOG.info('Matched 1000 samples against 50000 rules in %.3fs',
+                 time.time() - start)
+
+        # Compare with checking every rule in turn, as was done before
+        self.assertEqual(set([420, 425]), matches)
+        expected = set()
+        for i in six.moves.xrange(50000):
+            wr = DummyRule(_dimension_rule(metrics[i % len(metrics)],
+                                           Group='group%d' % (i // 10)))
+            if watchrule.rule_can_use_sample(wr,
+                                             _sample('cpu', Group='group42')):
+                expected.add(i)
+        self.assertEqual(expected, matches)
+
+
 class WatchRuleTest(common.HeatTestCase):
     stack_id = None
 
@@ -788,6 +916,110 @@ class WatchRuleTest(common.HeatTestCase):
                                            u'group_x'}]}}
         self.assertFalse(watchrule.rule_can_use_sample(self.wr, data))
 
+    def test_alarm_state_reads_watch_data_in_period(self):
+        rule = {u'EvaluationPeriods': u'1',
+                u'Period': u'300',
+                u'ComparisonOperator': u'GreaterThanThreshold',
+                u'Statistic': u'Sum',
+                u'Threshold': u'10',
+                u'MetricName': u'test_metric'}
+        now = timeutils.utcnow()
+        self.wr = watchrule.WatchRule(context=self.ctx,
+                                      watch_name='period_test',
+                                      stack_id=self.stack_id, rule=rule)
+        self.wr.store()
+        for value, age in (('8', 600), ('4', 200), ('3', 100)):
+            timeutils.set_time_override(now - datetime.timedelta(seconds=age))
+            self.wr.create_watch_data({u'test_metric': {u'Value': value}})
+        timeutils.set_time_override(now)
+        self.addCleanup(timeutils.clear_time_override)
+
+        self.patchobject(watch_data_object.WatchData,
+                         'get_all_by_watch_rule_id',
+                         wraps=watch_data_object.WatchData.
+                         get_all_by_watch_rule_id)
+        wr = watchrule.WatchRule(context=self.ctx, watch_name='period_test',
+                                 stack_id=self.stack_id, rule=rule,
+                                 wid=self.wr.id)
+
+        self.assertEqual('NORMAL', wr.get_alarm_state())
+        get_all = watch_data_object.WatchData.get_all_by_watch_rule_id
+        get_all.assert_called_once_with(
+            self.ctx, wr.id, since=now - datetime.timedelta(seconds=300))
+
+        wr.create_watch_data({u'test_metric': {u'Value': '5'}})
+        self.assertEqual('ALARM', wr.get_alarm_state())
+
+    def test_run_rule_expires_watch_data(self):
+        rule = {u'EvaluationPeriods': u'1',
+                u'Period': u'300',
+                u'ComparisonOperator': u'GreaterThanThreshold',
+                u'Statistic': u'SampleCount',
+                u'Threshold': u'2',
+                u'MetricName': u'test_metric'}
+        now = timeutils.utcnow()
+        self.wr = watchrule.WatchRule(context=self.ctx,
+                                      watch_name='expire_test',
+                                      stack_id=self.stack_id, rule=rule)
+        self.wr.store()
+        for age in (900, 600, 100):
+            timeutils.set_time_override(now - datetime.timedelta(seconds=age))
+            self.wr.create_watch_data({u'test_metric': {u'Value': '1'}})
+        timeutils.set_time_override(now)
+        self.addCleanup(timeutils.clear_time_override)
+
+        wr = watchrule.WatchRule.load(self.ctx, watch_name='expire_test')
+        wr.now = now
+        self.assertEqual([], wr.run_rule())
+        self.assertEqual('NORMAL', wr.state)
+
+        obj_wr = watch_rule.WatchRule.get_by_name(self.ctx, 'expire_test')
+        self.assertEqual(1, len(obj_wr.watch_data))
+
+    def test_rule_index_matching_rules(self):
+        rule = {u'EvaluationPeriods': u'1',
+                u'Period': u'300',
+                u'ComparisonOperator': u'GreaterThanThreshold',
+                u'Statistic': u'SampleCount',
+                u'Threshold': u'2',
+                u'Dimensions': [{u'Name': 'AutoScalingGroupName',
+                                 u'Value': 'group_x'}],
+                u'MetricName': u'CreateDataMetric'}
+        wr = watchrule.WatchRule(context=self.ctx, watch_name='index_x',
+                                 stack_id=self.stack_id, rule=rule)
+        wr.store()
+        index = watchrule.rule_index()
+        sample = {u'CreateDataMetric': {
+            "Unit": "Counter", "Value": "1",
+            "Dimensions": [{u'AutoScalingGroupName': u'group_x'}]}}
+        self.assertEqual(['index_x'],
+                         [r.name for r in index.matching_rules(self.ctx,
+                                                               sample)])
+
+        # Rules stored by another engine are picked up by the next sync
+        rule_y = dict(rule, Dimensions=[{u'Name': 'AutoScalingGroupName',
+                                         u'Value': 'group_y'}])
+        watch_rule.WatchRule.create(self.ctx, {'name': 'index_y',
+                                               'rule': rule_y,
+                                               'state': 'NORMAL',
+                                               'stack_id': self.stack_id})
+        sample_y = {u'CreateDataMetric': {
+            "Unit": "Counter", "Value": "1",
+            "Dimensions": [{u'AutoScalingGroupName': u'group_y'}]}}
+        self.assertEqual(['index_y'],
+                         [r.name for r in index.matching_rules(self.ctx,
+                                                               sample_y)])
+
+        # Rules deleted elsewhere are dropped when they fail to load
+        watch_rule.WatchRule.delete(self.ctx, wr.id)
+        self.assertEqual([], index.matching_rules(self.ctx, sample))
+        self.assertEqual(1, len(index))
+
+        wr_y = watchrule.WatchRule.load(self.ctx, watch_name='index_y')
+        wr_y.state_set(watchrule.WatchRule.SUSPENDED)
+        self.assertEqual([], index.matching_rules(self.ctx, sample_y))
+        self.assertEqual(0, len(index))
+
     def test_destroy(self):
         rule = {'EvaluationPeriods': '1',
                 'MetricName': 'test_metric',
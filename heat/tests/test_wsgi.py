@@ -16,6 +16,7 @@
 
 
 import json
+import zlib
 
 from oslo_config import cfg
 import six
@@ -24,6 +25,7 @@ import webob
 
 from heat.api.aws import exception as aws_exception
 from heat.common import exception
+from heat.common import serializers
 from heat.common import wsgi
 from heat.tests import common
 
@@ -227,6 +229,64 @@ class ResourceTest(common.HeatTestCase):
         self.m.VerifyAll()
 
 
+class ResourceCompressionTest(common.HeatTestCase):
+
+    class Controller(object):
+        def __init__(self, result):
+            self.result = result
+
+        def index(self, req):
+            return self.result
+
+    def _call(self, result, accept_encoding=None):
+        env = {'wsgiorg.routing_args': [None, {'action': 'index'}]}
+        request = wsgi.Request.blank('/tests', environ=env)
+        if accept_encoding is not None:
+            request.headers['Accept-Encoding'] = accept_encoding
+        resource = wsgi.Resource(self.Controller(result),
+                                 wsgi.JSONRequestDeserializer(),
+                                 serializers.JSONResponseSerializer())
+        return resource(request)
+
+    def _large_result(self):
+        return {'items': [{'id': i, 'name': 'item-%d' % i}
+                          for i in range(500)]}
+
+    def test_compressed(self):
+        cfg.CONF.set_override('compress_api_responses', True)
+        result = self._large_result()
+        response = self._call(result, accept_encoding='gzip, deflate')
+
+        self.assertEqual('gzip', response.headers['Content-Encoding'])
+        self.assertIn('Accept-Encoding', response.headers['Vary'])
+        body = zlib.decompress(b''.join(response.app_iter),
+                               16 + zlib.MAX_WBITS)
+        self.assertEqual(result, json.loads(body.decode('utf-8')))
+
+    def test_not_accepted(self):
+        cfg.CONF.set_override('compress_api_responses', True)
+        result = self._large_result()
+        response = self._call(result, accept_encoding='identity')
+
+        self.assertNotIn('Content-Encoding', response.headers)
+        self.assertIn('Accept-Encoding', response.headers['Vary'])
+        self.assertEqual(result, json.loads(response.body.decode('utf-8')))
+
+    def test_small_response_not_compressed(self):
+        cfg.CONF.set_override('compress_api_responses', True)
+        response = self._call({'key': 'value'}, accept_encoding='gzip')
+
+        self.assertNotIn('Content-Encoding', response.headers)
+        self.assertEqual('{"key": "value"}', response.body)
+
+    def test_disabled(self):
+        result = self._large_result()
+        response = self._call(result, accept_encoding='gzip')
+
+        self.assertNotIn('Content-Encoding', response.headers)
+        self.assertEqual(result, json.loads(response.body.decode('utf-8')))
+
+
 class ResourceExceptionHandlingTest(common.HeatTestCase):
     scenarios = [
         ('client_exceptions', dict(